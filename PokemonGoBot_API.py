@@ -19,6 +19,8 @@ class PokemonGoBotAPI:
         self.session_token = None
         self.gui_callback = gui_callback
         self.logger = logging.getLogger(__name__)
+        # Keep-alive connections to the bot API, reused by every call
+        self.session = requests.Session()
         
         # API endpoints
         self.endpoints = {
@@ -66,13 +68,13 @@ class PokemonGoBotAPI:
             
             # Make request
             if method.upper() == 'GET':
-                response = requests.get(url, headers=headers, params=params, timeout=10)
+                response = self.session.get(url, headers=headers, params=params, timeout=10)
             elif method.upper() == 'POST':
-                response = requests.post(url, headers=headers, json=data, timeout=10)
+                response = self.session.post(url, headers=headers, json=data, timeout=10)
             elif method.upper() == 'PUT':
-                response = requests.put(url, headers=headers, json=data, timeout=10)
+                response = self.session.put(url, headers=headers, json=data, timeout=10)
             elif method.upper() == 'DELETE':
-                response = requests.delete(url, headers=headers, timeout=10)
+                response = self.session.delete(url, headers=headers, timeout=10)
             else:
                 raise ValueError(f"Unsupported HTTP method: {method}")
             
@@ -109,7 +111,7 @@ class PokemonGoBotAPI:
             self._log("🔐 Authenticating with PokemonGoBot API...")
             
             # Send password as raw text
-            response = requests.post(
+            response = self.session.post(
                 self.base_url + self.endpoints['auth'],
                 data=self.password,
                 headers={'Content-Type': 'text/plain'},
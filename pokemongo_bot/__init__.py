@@ -26,19 +26,23 @@ import calendar
 from geopy.geocoders import GoogleV3
 from pgoapi import PGoApi
 from pgoapi.utilities import f2i, get_cell_ids
-from s2sphere import Cell, CellId, LatLng
 
 from . import cell_workers
 from .base_task import BaseTask
 from .plugin_loader import PluginLoader
 from .api_wrapper import ApiWrapper
-from .cell_workers.utils import distance
+from .cell_workers.utils import coordinates, distances_from
+from .cluster_engine import ClusterEngine
 from .event_manager import EventManager
 from .human_behaviour import sleep
 from .item_list import Item
+from .log_store import LogStore
+from .map_cell_store import MapCellStore
 from .metrics import Metrics
 from .sleep_schedule import SleepSchedule
+from .web_state_writer import write_json
 from pokemongo_bot.event_handlers import SocketIoHandler, LoggingHandler, SocialHandler, CaptchaHandler
+from pokemongo_bot.event_dispatcher import AsyncHandler
 from pokemongo_bot.socketio_server.runner import SocketIoRunner
 from pokemongo_bot.websocket_remote_control import WebsocketRemoteControl
 from pokemongo_bot.base_dir import _base_dir
@@ -104,7 +108,13 @@ class PokemonGoBot(object):
 
     def __init__(self, db, config):
 
-        self.database = db
+        # A Datastore, or the sqlite connection of one
+        if hasattr(db, 'get_log_store'):
+            self.log_store = db.get_log_store()
+            self.database = db.get_connection()
+        else:
+            self.log_store = LogStore(db)
+            self.database = db
 
         self.config = config
         super(PokemonGoBot, self).__init__()
@@ -117,6 +127,8 @@ class PokemonGoBot(object):
         # @var Metrics
         self.metrics = Metrics(self)
         self.latest_inventory = None
+        self.map_cell_store = MapCellStore()
+        self.cluster_engine = ClusterEngine()
         self.cell = None
         self.recent_forts = [None] * config.forts_max_circle_size
         self.tick_count = 0
@@ -226,6 +238,11 @@ class PokemonGoBot(object):
 
         # @var EventManager
         self.event_manager = EventManager(bot, self.config.walker_limit_output, *handlers)
+        if getattr(self.config, 'event_handlers_async', False):
+            self.event_manager.dispatch_async(
+                max_queue=getattr(self.config, 'event_queue_size', AsyncHandler.MAX_QUEUE),
+                overflow=getattr(self.config, 'event_queue_overflow', AsyncHandler.DROP_OLDEST)
+            )
         self._register_events()
         if self.config.show_events:
             self.event_manager.event_report()
@@ -858,52 +875,21 @@ class PokemonGoBot(object):
         # Check if session token has expired
         self.check_session(self.position)
 
-        for worker in self.workers:
-            if worker.work() == WorkerResult.RUNNING:
-                return
+        try:
+            for worker in self.workers:
+                if worker.work() == WorkerResult.RUNNING:
+                    return
+        finally:
+            # Subrequests queued during the tick but never waited on
+            self.api.flush_requests(unclaimed=True)
 
     def get_meta_cell(self):
         location = self.position[0:2]
-        cells = self.find_close_cells(*location)
-
-        # Combine all cells into a single dict of the items we care about.
-        forts = []
-        wild_pokemons = []
-        catchable_pokemons = []
-        nearby_pokemons = []
-        for cell in cells:
-            if "forts" in cell and len(cell["forts"]):
-                forts += cell["forts"]
-            if "wild_pokemons" in cell and len(cell["wild_pokemons"]):
-                wild_pokemons += cell["wild_pokemons"]
-            if "catchable_pokemons" in cell and len(cell["catchable_pokemons"]):
-                catchable_pokemons += cell["catchable_pokemons"]
-            if "nearby_pokemons" in cell and len(cell["nearby_pokemons"]):
-                latlng = LatLng.from_point(Cell(CellId(cell["s2_cell_id"])).get_center())
-
-                for p in cell["nearby_pokemons"]:
-                    p["latitude"] = latlng.lat().degrees
-                    p["longitude"] = latlng.lng().degrees
-                    p["s2_cell_id"] = cell["s2_cell_id"]
-
-                nearby_pokemons += cell["nearby_pokemons"]
-
-        # If there are forts present in the cells sent from the server or we don't yet have any cell data, return all data retrieved
-        if len(forts) > 1 or not self.cell:
-            return {
-                "forts": forts,
-                "wild_pokemons": wild_pokemons,
-                "catchable_pokemons": catchable_pokemons,
-                "nearby_pokemons": nearby_pokemons
-            }
-        # If there are no forts present in the data from the server, keep our existing fort data and only update the pokemon cells.
-        else:
-            return {
-                "forts": self.cell["forts"],
-                "wild_pokemons": wild_pokemons,
-                "catchable_pokemons": catchable_pokemons,
-                "nearby_pokemons": nearby_pokemons
-            }
+        self._update_map_cells(*location)
+
+        # Combined forts and pokemons of all known cells. Forts of cells the
+        # server did not resend are kept by the store.
+        return self.map_cell_store.views()
 
     def update_web_location(self, cells=[], lat=None, lng=None, alt=None):
         # we can call the function with no arguments and still get the position
@@ -923,36 +909,26 @@ class PokemonGoBot(object):
             location = self.position[0:2]
             cells = self.find_close_cells(*location)
 
+        # Files are written in the background, unchanged ones are skipped
         user_data_cells = os.path.join(_base_dir, 'data', 'cells-%s.json' % self.config.username)
-        try:
-            with open(user_data_cells, 'w') as outfile:
-                json.dump(cells, outfile)
-        except IOError as e:
-            self.logger.info('[x] Error while opening location file: %s' % e)
+        write_json(user_data_cells, cells)
 
         user_web_location = os.path.join(
             _base_dir, 'web', 'location-%s.json' % self.config.username
         )
         # alt is unused atm but makes using *location easier
-        try:
-            with open(user_web_location, 'w') as outfile:
-                json.dump({
-                    'lat': lat,
-                    'lng': lng,
-                    'alt': alt,
-                    'cells': cells
-                }, outfile)
-        except IOError as e:
-            self.logger.info('[x] Error while opening location file: %s' % e)
+        write_json(user_web_location, {
+            'lat': lat,
+            'lng': lng,
+            'alt': alt,
+            'cells': cells
+        })
 
         user_data_lastlocation = os.path.join(
             _base_dir, 'data', 'last-location-%s.json' % self.config.username
         )
-        try:
-            with open(user_data_lastlocation, 'w') as outfile:
-                json.dump({'lat': lat, 'lng': lng, 'alt': alt, 'start_position': self.start_position}, outfile)
-        except IOError as e:
-            self.logger.info('[x] Error while opening location file: %s' % e)
+        write_json(user_data_lastlocation,
+                   {'lat': lat, 'lng': lng, 'alt': alt, 'start_position': self.start_position})
     def emit_forts_event(self,response_dict):
         map_objects = response_dict.get(
             'responses', {}
@@ -975,26 +951,26 @@ class PokemonGoBot(object):
                         )
 
     def find_close_cells(self, lat, lng):
+        self._update_map_cells(lat, lng)
+
+        map_cells = self.map_cell_store.cells()
+        with_forts = [cell for cell in map_cells if cell.get('forts', [])]
+        lats, lngs = coordinates([cell['forts'][0] for cell in with_forts])
+        dists = dict(zip(map(id, with_forts), distances_from(lat, lng, lats, lngs)))
+        map_cells.sort(key=lambda x: dists.get(id(x), 1e6))
+        return map_cells
+
+    def _update_map_cells(self, lat, lng):
         cellid = get_cell_ids(lat, lng)
-        timestamp = [0, ] * len(cellid)
-        response_dict = self.get_map_objects(lat, lng, timestamp, cellid)
+        timestamp = self.map_cell_store.since_timestamps(cellid)
+        response_dict = self.get_map_objects(lat, lng, timestamp, cellid) or {}
         map_objects = response_dict.get(
             'responses', {}
         ).get('GET_MAP_OBJECTS', {})
         status = map_objects.get('status', None)
 
-        map_cells = []
         if status and status == 1:
-            map_cells = map_objects['map_cells']
-            position = (lat, lng, 0)
-            map_cells.sort(
-                key=lambda x: distance(
-                    lat,
-                    lng,
-                    x['forts'][0]['latitude'],
-                    x['forts'][0]['longitude']) if x.get('forts', []) else 1e6
-            )
-        return map_cells
+            self.map_cell_store.merge(map_objects['map_cells'], cellid)
 
     def check_session(self, position):
         # Check session expiry
@@ -1085,15 +1061,7 @@ class PokemonGoBot(object):
                 if retry == 3:
                     sys.exit()
 
-        with self.database as conn:
-            c = conn.cursor()
-            c.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='login'")
-
-        result = c.fetchone()
-
-        if result[0] == 1:
-            conn.execute('''INSERT INTO login (timestamp, message) VALUES (?, ?)''', (time.time(), 'LOGIN_SUCCESS'))
-        else:
+        if not self.log_store.log('login', timestamp=time.time(), message='LOGIN_SUCCESS'):
             self.event_manager.emit(
                 'login_failed',
                 sender=self,
@@ -1734,50 +1702,18 @@ class PokemonGoBot(object):
                     '{}'.format(player_stats.poke_stop_visits))
 
     def get_forts(self, order_by_distance=False):
-        forts = [fort
-                 for fort in self.cell['forts']
-                 if 'latitude' in fort and 'longitude' in fort]
-        # Need to filter out disabled forts!
-        forts = filter(lambda x: x["enabled"] is True, forts)
-        forts = filter(lambda x: 'closed' not in fort, forts)
-        
+        # Enabled forts only, kept by the map cell store until the fort set changes
         if order_by_distance:
-            forts.sort(key=lambda x: distance(
-                self.position[0],
-                self.position[1],
-                x['latitude'],
-                x['longitude']
-            ))
+            return self.map_cell_store.fort_index().nearest(*self.position[0:2])
 
-        return forts
+        return self.map_cell_store.forts()
 
-        if order_by_distance:
-            forts.sort(key=lambda x: distance(
-                self.position[0],
-                self.position[1],
-                x['latitude'],
-                x['longitude']
-            ))
-
-        return forts
-    
     def get_gyms(self, order_by_distance=False):
-        forts = [fort
-                 for fort in self.cell['forts']
-                 if 'latitude' in fort and 'type' not in fort]
-        # Need to filter out disabled gyms!
-        forts = filter(lambda x: x["enabled"] is True, forts)
-        forts = filter(lambda x: 'closed' not in fort, forts)
-
+        # Enabled gyms only, kept by the map cell store until the fort set changes
         if order_by_distance:
-            forts.sort(key=lambda x: distance(
-                self.position[0],
-                self.position[1],
-                x['latitude'],
-                x['longitude']
-            ))
-
-        return forts
+            return self.map_cell_store.gym_index().nearest(*self.position[0:2])
+
+        return self.map_cell_store.gyms()
 
     def get_map_objects(self, lat, lng, timestamp, cellid):
         if time.time() - self.last_time_map_object < self.config.map_object_cache_time:
@@ -6,6 +6,7 @@ import hashlib
 import os
 import urllib
 import sys
+import threading
 from pgoapi.exceptions import (ServerSideRequestThrottlingException,
                                NotLoggedInException, ServerBusyOrOfflineException,
                                NoPlayerPositionSetException, HashingOfflineException,
@@ -16,6 +17,7 @@ from pgoapi.pgoapi import RpcApi
 from pgoapi.protos.pogoprotos.networking.requests.request_type_pb2 import RequestType
 from pgoapi.utilities import get_time
 from .human_behaviour import sleep, gps_noise_rng
+from .rate_limiter import RateLimiter, backoff
 from pokemongo_bot.base_dir import _base_dir
 from geopy.geocoders import GoogleV3
 
@@ -23,8 +25,43 @@ class PermaBannedException(Exception):
     pass
 
 
+class BatchedResponse(object):
+    """
+    Pending response of a subrequest queued with ApiWrapper.queue_request().
+
+    result() sends every queued subrequest if this one was not sent yet, and
+    returns the response in the shape ApiRequest.call() gives for a request
+    holding only this subrequest.
+    """
+
+    def __init__(self, api, method, kwargs):
+        self.api = api
+        self.method = method
+        self.kwargs = kwargs
+        self._done = False
+        self._result = None
+        self._error = None
+
+    def done(self):
+        return self._done
+
+    def result(self):
+        if not self._done:
+            self.api.flush_requests()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def _resolve(self, result=None, error=None):
+        self._result = result
+        self._error = error
+        self._done = True
+
+
 class ApiWrapper(PGoApi, object):
     DEVICE_ID = None
+    # Subrequests sent together in one envelope at most
+    MAX_BATCH_SIZE = 5
 
     def __init__(self, config=None):
         self.config = config
@@ -53,6 +90,15 @@ class ApiWrapper(PGoApi, object):
 
         self.useVanillaRequest = False
 
+        self._batch_lock = threading.RLock()
+        self._pending_requests = []
+
+        # One schedule for every request of this account
+        self.rate_limiter = RateLimiter(
+            rate=getattr(self.config, 'api_requests_per_second', RateLimiter.DEFAULT_RATE),
+            budgets=getattr(self.config, 'api_rate_limits', None)
+        )
+
     def gen_device_id(self):
         if self.config is None or self.config.username is None:
             ApiWrapper.DEVICE_ID = "3d65919ca1c2fc3a8e2bd7cc3f974c34"
@@ -93,6 +139,70 @@ class ApiWrapper(PGoApi, object):
             self._position_alt
         )
     
+    def queue_request(self, method, **kwargs):
+        """
+        Queues a subrequest to be sent with the other ones of this tick.
+        Nothing is sent until a result is needed or flush_requests() is
+        called, so independent lookups share one envelope and one throttle
+        slot. Only subrequests of different types share an envelope, like
+        the inventory and player refresh: queueing many of one type, such
+        as fort_details, still takes one envelope each.
+        :param method: The subrequest method, as called on a request.
+        :type method: str
+        :return: The pending response.
+        :rtype: BatchedResponse
+        """
+        response = BatchedResponse(self, method, kwargs)
+        with self._batch_lock:
+            self._pending_requests.append(response)
+        return response
+
+    def flush_requests(self, unclaimed=False):
+        """
+        Sends every queued subrequest. Responses are keyed by request type,
+        so an envelope holds one subrequest of each type at most; further
+        ones of a type go in the following envelopes, in queue order.
+        :param unclaimed: Set when nobody will wait on the queued responses,
+        so their errors are logged instead of only kept for result().
+        :type unclaimed: bool
+        """
+        with self._batch_lock:
+            pending, self._pending_requests = self._pending_requests, []
+
+            for envelope in self._envelopes(pending):
+                request = self.create_request()
+                for response in envelope:
+                    getattr(request, response.method)(**response.kwargs)
+
+                try:
+                    result = request.call()
+                except Exception as e:
+                    for response in envelope:
+                        response._resolve(error=e)
+                    if unclaimed:
+                        self.logger.warning('Unclaimed %s failed: %r',
+                                            ', '.join(r.method for r in envelope), e)
+                    continue
+
+                for response in envelope:
+                    method = response.method.upper()
+                    single = dict(result)
+                    single['responses'] = {method: result['responses'].get(method, {})}
+                    response._resolve(single)
+
+    def _envelopes(self, pending):
+        envelopes = []
+        for response in pending:
+            method = response.method.upper()
+            for envelope in envelopes:
+                if len(envelope) < self.MAX_BATCH_SIZE and \
+                        all(r.method.upper() != method for r in envelope):
+                    envelope.append(response)
+                    break
+            else:
+                envelopes.append([response])
+        return envelopes
+
     def get_component(self, location, component_type):
         for component in location.raw['address_components']:
             if component_type in component['types']:
@@ -190,7 +300,7 @@ class ApiRequest(PGoApiRequest):
         self.logger = logging.getLogger(__name__)
         self.request_callers = []
         self.last_api_request_time = None
-        self.requests_per_seconds = 2
+        self.rate_limiter = getattr(args[0], 'rate_limiter', None) or RateLimiter()
 
     def can_call(self):
         if not self._req_method_list:
@@ -258,8 +368,9 @@ class ApiRequest(PGoApiRequest):
         try_cnt = 0
         throttling_retry = 0
         unexpected_response_retry = 0
+        hashing_retry = 0
         while True:
-            request_timestamp = self.throttle_sleep()
+            request_timestamp = self.throttle_sleep(request_callers)
             # self._call internally clear this field, so save it
             self._req_method_list = [req_method for req_method in api_req_method_list]
             should_throttle_retry = False
@@ -278,25 +389,29 @@ class ApiRequest(PGoApiRequest):
                 should_unexpected_response_retry = True
 
             if hashing_offline:
-                self.logger.warning('Hashing server issue, retrying in 5 Secs...')
-                sleep(5)
+                hashing_retry += 1
+                delay = backoff(hashing_retry, base=5, cap=60)
+                self.logger.warning('Hashing server issue, retrying in {:.0f} Secs...'.format(delay))
+                sleep(delay)
                 continue
 
             if should_throttle_retry:
                 throttling_retry += 1
                 if throttling_retry >= max_retry:
                     raise ServerSideRequestThrottlingException('Server throttled too many times')
-                sleep(1)  # huge sleep ?
+                # Hold back every request of the account, not only this one
+                self.rate_limiter.throttled()
+                sleep(backoff(throttling_retry, base=1, cap=30))
                 continue  # skip response checking
 
             if should_unexpected_response_retry:
                 unexpected_response_retry += 1
+                delay = backoff(unexpected_response_retry, base=2, cap=30)
                 if unexpected_response_retry >= 5:
                     self.logger.warning(
-                        'Server is not responding correctly to our requests.  Waiting for 30 seconds to reconnect.')
-                    sleep(30)
-                else:
-                    sleep(2)
+                        'Server is not responding correctly to our requests.  '
+                        'Waiting for {:.0f} seconds to reconnect.'.format(delay))
+                sleep(delay)
                 continue
 
             if not self.is_response_valid(result, request_callers):
@@ -306,7 +421,7 @@ class ApiRequest(PGoApiRequest):
                         'Server seems to be busy or offline - try again - {}/{}'.format(try_cnt, max_retry))
                 if try_cnt >= max_retry:
                     raise ServerBusyOrOfflineException()
-                sleep(1)
+                sleep(backoff(try_cnt, base=1, cap=15))
             else:
                 break
 
@@ -318,14 +433,7 @@ class ApiRequest(PGoApiRequest):
             self.request_callers.append(func)
         return PGoApiRequest.__getattr__(self, func)
 
-    def throttle_sleep(self):
-        now_milliseconds = time.time() * 1000
-        required_delay_between_requests = 1000 / self.requests_per_seconds
-
-        difference = now_milliseconds - (self.last_api_request_time if self.last_api_request_time else 0)
-
-        if self.last_api_request_time != None and difference < required_delay_between_requests:
-            sleep_time = required_delay_between_requests - difference
-            time.sleep(sleep_time / 1000)
-
-        return now_milliseconds
+    def throttle_sleep(self, request_callers=()):
+        # Waits for a token of the account wide rate limiter
+        self.rate_limiter.acquire(request_callers)
+        return time.time() * 1000
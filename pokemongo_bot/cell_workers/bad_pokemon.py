@@ -89,14 +89,7 @@ class BadPokemon(BaseTask):
                     if self.config_transfer:
                         inventory.pokemons().remove(pokemon.unique_id)
 
-                        with self.bot.database as db:
-                            cursor = db.cursor()
-                            cursor.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='transfer_log'")
-
-                            db_result = cursor.fetchone()
-
-                            if db_result[0] == 1:
-                                db.execute("INSERT INTO transfer_log (pokemon, iv, cp) VALUES (?, ?, ?)", (pokemon.name, pokemon.iv, pokemon.cp))
+                        self.bot.log_store.log('transfer_log', pokemon=pokemon.name, iv=pokemon.iv, cp=pokemon.cp)
 
         else:
             for pokemon in pokemons:
@@ -126,14 +119,7 @@ class BadPokemon(BaseTask):
                 if self.config_transfer and (not self.bot.config.test):
                     inventory.pokemons().remove(pokemon.unique_id)
 
-                    with self.bot.database as db:
-                        cursor = db.cursor()
-                        cursor.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='transfer_log'")
-
-                        db_result = cursor.fetchone()
-
-                        if db_result[0] == 1:
-                            db.execute("INSERT INTO transfer_log (pokemon, iv, cp) VALUES (?, ?, ?)", (pokemon.name, pokemon.iv, pokemon.cp))
+                    self.bot.log_store.log('transfer_log', pokemon=pokemon.name, iv=pokemon.iv, cp=pokemon.cp)
                     if not skip_delay:
                         action_delay(self.config_action_wait_min, self.config_action_wait_max)
 
@@ -1,12 +1,11 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
-import math
 import time
-from geopy.distance import great_circle
 
 from pokemongo_bot.base_task import BaseTask
-from pokemongo_bot.cell_workers.utils import coord2merc, merc2coord
+from pokemongo_bot.cell_workers.utils import coordinates, distances_from
+from pokemongo_bot.cluster_engine import camp_clusters, cluster_key
 from pokemongo_bot.constants import Constants
 from pokemongo_bot.walkers.polyline_walker import PolylineWalker
 from pokemongo_bot.worker_result import WorkerResult
@@ -96,7 +95,7 @@ class CampFort(BaseTask):
                 self.clusters = self.get_clusters(forts.values())
             # self.logger.info("Forts: {}".format(len(forts)))
             # self.logger.info("Checking {} clusters for availiblity....".format(len(self.clusters)))
-            available_clusters = self.get_available_clusters(forts)
+            available_clusters = self.get_available_clusters(self.clusters, forts)
 
             if len(available_clusters) > 0:
                 self.cluster = available_clusters[0]
@@ -114,9 +113,11 @@ class CampFort(BaseTask):
 
         # We can check if the cluster is still the best
         elif self.no_recheck_cluster_until < now:
-            self.clusters = self.get_clusters(forts.values())
-            available_clusters = self.get_available_clusters(forts)
+            # Keep the clusters of the current destination until there is a better one
+            clusters = self.get_clusters(forts.values())
+            available_clusters = self.get_available_clusters(clusters, forts)
             if len(available_clusters) > 0:
+                self.clusters = clusters
                 if self.cluster is not available_clusters[0]:
                     self.cluster = available_clusters[0]
                     self.stay_until = 0
@@ -124,8 +125,7 @@ class CampFort(BaseTask):
                                     formatted='Better destination found at {distance:.2f} meters: {size} forts, {lured} lured'.format(**self.cluster))
             self.no_recheck_cluster_until = now + NO_BALLS_MOVING_TIME
 
-        self.update_cluster_distance(self.cluster)
-        self.update_cluster_lured(self.cluster, forts)
+        self.clusters.update(self.bot.position, forts)
 
         if self.stay_until >= now:
             if self.no_log_until < now:
@@ -164,124 +164,21 @@ class CampFort(BaseTask):
         radius = self.config_max_distance + Constants.MAX_DISTANCE_FORT_IS_REACHABLE
 
         forts = [f for f in self.bot.cell["forts"] if ("latitude" in f) and ("type" in f)]
-        forts = [f for f in forts if self.get_distance(self.bot.start_position, f) <= radius]
+        lats, lngs = coordinates(forts)
+        dists = distances_from(self.bot.start_position[0], self.bot.start_position[1], lats, lngs)
+        forts = [f for f, d in zip(forts, dists) if d <= radius]
 
         return {f["id"]: f for f in forts}
 
-    def get_available_clusters(self, forts):
-        for cluster in self.clusters:
-            self.update_cluster_distance(cluster)
-            self.update_cluster_lured(cluster, forts)
+    def get_available_clusters(self, clusters, forts):
+        clusters.update(self.bot.position, forts)
 
-        available_clusters = [c for c in self.clusters if c["lured"] >= self.config_min_lured_forts_count]
+        available_clusters = [c for c in clusters.best() if c["lured"] >= self.config_min_lured_forts_count]
         available_clusters = [c for c in available_clusters if c["size"] >= self.config_min_forts_count]
-        available_clusters.sort(key=lambda c: self.get_cluster_key(c), reverse=True)
+        available_clusters.sort(key=cluster_key, reverse=True)
 
         return available_clusters
 
     def get_clusters(self, forts):
-        clusters = []
-        points = self.get_all_snap_points(forts)
-
-        for c1, c2, fort1, fort2 in points:
-            cluster_1 = self.get_cluster(forts, c1)
-            cluster_2 = self.get_cluster(forts, c2)
-
-            self.update_cluster_distance(cluster_1)
-            self.update_cluster_distance(cluster_2)
-
-            key_1 = self.get_cluster_key(cluster_1)
-            key_2 = self.get_cluster_key(cluster_2)
-
-            radius = Constants.MAX_DISTANCE_FORT_IS_REACHABLE
-
-            if key_1 >= key_2:
-                cluster = cluster_1
-
-                while True:
-                    new_circle, _ = self.get_enclosing_circles(fort1, fort2, radius - 1)
-
-                    if not new_circle:
-                        break
-
-                    new_cluster = self.get_cluster(cluster["forts"], new_circle)
-
-                    if len(new_cluster["forts"]) < len(cluster["forts"]):
-                        break
-
-                    cluster = new_cluster
-                    radius -= 1
-            else:
-                cluster = cluster_2
-
-                while True:
-                    _, new_circle = self.get_enclosing_circles(fort1, fort2, radius - 1)
-
-                    if not new_circle:
-                        break
-
-                    new_cluster = self.get_cluster(cluster["forts"], new_circle)
-
-                    if len(new_cluster["forts"]) < len(cluster["forts"]):
-                        break
-
-                    cluster = new_cluster
-                    radius -= 1
-
-            clusters.append(cluster)
-
-        return clusters
-
-    def get_all_snap_points(self, forts):
-        points = []
-        radius = Constants.MAX_DISTANCE_FORT_IS_REACHABLE
-
-        for i in range(0, len(forts)):
-            for j in range(i + 1, len(forts)):
-                c1, c2 = self.get_enclosing_circles(forts[i], forts[j], radius)
-
-                if c1 and c2:
-                    points.append((c1, c2, forts[i], forts[j]))
-
-        return points
-
-    def get_enclosing_circles(self, fort1, fort2, radius):
-        x1, y1 = coord2merc(fort1["latitude"], fort1["longitude"])
-        x2, y2 = coord2merc(fort2["latitude"], fort2["longitude"])
-        dx = x2 - x1
-        dy = y2 - y1
-        d = math.sqrt(dx ** 2 + dy ** 2)
-
-        if (d == 0) or (d > 2 * radius):
-            return None, None
-
-        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
-        cd = math.sqrt(radius ** 2 - (d / 2) ** 2)
-
-        c1 = merc2coord((cx - cd * dy / d, cy + cd * dx / d)) + (radius,)
-        c2 = merc2coord((cx + cd * dy / d, cy - cd * dx / d)) + (radius,)
-
-        return c1, c2
-
-    def get_cluster(self, forts, circle):
-        forts_in_circle = [f for f in forts if self.get_distance(circle, f) <= circle[2]]
-
-        cluster = {"center": (circle[0], circle[1]),
-                   "distance": 0,
-                   "forts": forts_in_circle,
-                   "size": len(forts_in_circle),
-                   "lured": sum(1 for f in forts_in_circle if f.get("active_fort_modifier", None) is not None)}
-
-        return cluster
-
-    def get_cluster_key(self, cluster):
-        return (cluster["lured"], cluster["size"], -cluster["distance"])
-
-    def update_cluster_distance(self, cluster):
-        cluster["distance"] = great_circle(self.bot.position, cluster["center"]).meters
-
-    def update_cluster_lured(self, cluster, forts):
-        cluster["lured"] = sum(1 for f in cluster["forts"] if forts.get(f["id"], {}).get("active_fort_modifier", None) is not None)
-
-    def get_distance(self, location, fort):
-        return great_circle(location, (fort["latitude"], fort["longitude"])).meters
+        # Memoized per fort set in the bot's engine, only lures and distances get updated
+        return camp_clusters(Constants.MAX_DISTANCE_FORT_IS_REACHABLE, forts, self.bot.cluster_engine)
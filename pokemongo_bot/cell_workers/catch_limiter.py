@@ -51,23 +51,18 @@ class CatchLimiter(BaseTask):
         now = datetime.now()
 
         # check catch limits
-        with self.bot.database as conn:
-            c = conn.cursor()
-            c.execute(
-                "SELECT DISTINCT COUNT(encounter_id) FROM catch_log WHERE dated >= datetime('now','-1 day')")
-
-        result = c.fetchone()
+        caught_last_24_hour = self.bot.log_store.daily_count('catch_log')
 
         # check catch limits before catch
 
-        if result[0] >= self.daily_catch_limit:
+        if caught_last_24_hour >= self.daily_catch_limit:
             if hasattr(
                     self.bot,
                     "warned_about_catch_limit") and not self.bot.warned_about_catch_limit:
                 self.emit_event(
                     'catch_limit',
                     formatted='WARNING! You have reached (%s / %s) your daily catch limit. Disabling catching for an hour!' %
-                    (result[0],
+                    (caught_last_24_hour,
                      self.daily_catch_limit))
                 self.bot.warned_about_catch_limit = True
                 self.bot.catch_limit_reached = True
@@ -78,12 +73,12 @@ class CatchLimiter(BaseTask):
 
             return WorkerResult.SUCCESS
 
-        elif result[0] <= (self.daily_catch_limit - 20):
+        elif caught_last_24_hour <= (self.daily_catch_limit - 20):
             if self.bot.catch_limit_reached:
                 self.emit_event(
                     'catch_limit_off',
                     formatted="Resume time hasn't passed yet, but catch limit passing ({} / {}). Re-enabling catch tasks.".format(
-                        result[0],
+                        caught_last_24_hour,
                         self.daily_catch_limit))
                 self.bot.catch_disabled = False
                 self.bot.catch_limit_reached = False
@@ -92,11 +87,11 @@ class CatchLimiter(BaseTask):
 
         elif self.bot.catch_resume_at is not None and self.bot.catch_limit_reached:
             # Lets check if the resume time has passed and the limit is okay
-            if now >= self.bot.catch_resume_at and result[0] < self.daily_catch_limit:
+            if now >= self.bot.catch_resume_at and caught_last_24_hour < self.daily_catch_limit:
                 self.emit_event(
                     'catch_limit_off',
                     formatted="Resume time has passed and catch limit passing ({} / {}}). Re-enabling catch tasks.".format(
-                        result[0],
+                        caught_last_24_hour,
                         self.daily_catch_limit))
                 self.bot.catch_disabled = False
                 self.bot.catch_limit_reached = False
@@ -106,7 +101,7 @@ class CatchLimiter(BaseTask):
             if self.no_log_until <= now:
                 self.logger.info(
                     "All catch tasks disabled until %s beacuse we hit the daily catch limit (%s >= %s)" %
-                    (self.bot.catch_resume_at.strftime("%H:%M:%S"), result[0], self.daily_catch_limit))
+                    (self.bot.catch_resume_at.strftime("%H:%M:%S"), caught_last_24_hour, self.daily_catch_limit))
                 self.no_log_until = now + timedelta(minutes=2)
             return WorkerResult.SUCCESS
 
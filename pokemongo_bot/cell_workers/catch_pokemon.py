@@ -15,6 +15,7 @@ from .utils import fort_details, distance,  format_time
 from pokemongo_bot.base_dir import _base_dir
 from pokemongo_bot.constants import Constants
 from pokemongo_bot.inventory import Pokemons
+from pokemongo_bot.pokemon_rules import CatchRule, named_rules
 
 class CatchPokemon(BaseTask):
     SUPPORTED_TASK_API_VERSION = 1
@@ -23,6 +24,10 @@ class CatchPokemon(BaseTask):
         self.pokemon = []
         self.ignored_while_looking = []
 
+        # Compiled now so that mistakes show up on start, PokemonCatchWorker gets them from the cache
+        named_rules(self.bot.config.catch, CatchRule, default_logic='and')
+        named_rules(self.bot.config.vips, CatchRule, default_logic='or')
+
     def work(self):
         # make sure we have SOME balls
         if sum([inventory.items().get(ball.value).count for ball in
@@ -4,6 +4,7 @@ from pokemongo_bot.human_behaviour import sleep, action_delay
 from pokemongo_bot.inventory import Pokemon
 from pokemongo_bot.item_list import Item
 from pokemongo_bot.base_task import BaseTask
+from pokemongo_bot.pokemon_rules import EvolveRule
 import time
 
 class Counter(dict):
@@ -19,34 +20,16 @@ class EvolvePokemon(BaseTask):
         self.start_time = 0
         self.next_log_update = 0
         self.log_interval = self.config.get('log_interval', 120)
-        self.evolve_list = self.config.get('evolve_list', [])
-        self.donot_evolve_list = self.config.get('donot_evolve_list', [])
         self.min_evolve_speed = self.config.get('min_evolve_speed', 25)
         self.max_evolve_speed = self.config.get('max_evolve_speed', 30)
         self.first_evolve_by = self.config.get('first_evolve_by', 'cp')
-        self.evolve_above_cp = self.config.get('evolve_above_cp', 500)
-        self.evolve_above_iv = self.config.get('evolve_above_iv', 0.8)
-        self.cp_iv_logic = self.config.get('logic', 'or')
         self.use_lucky_egg = self.config.get('use_lucky_egg', False)
         self.min_pokemon_to_be_evolved = self.config.get('min_pokemon_to_be_evolved', 1)
+        self.evolve_rule = EvolveRule(self.config)
+        self.evolve_list = self.evolve_rule.evolve_list
         self._validate_config()
 
-        self.logic_to_function = {
-            'or': lambda pokemon: pokemon.cp >= self.evolve_above_cp or pokemon.iv >= self.evolve_above_iv,
-            'and': lambda pokemon: pokemon.cp >= self.evolve_above_cp and pokemon.iv >= self.evolve_above_iv
-        }
-
-        self.default_to_evolve = False
-        if (len(self.evolve_list) > 0) and self.evolve_list[0] == 'all':
-            self.default_to_evolve = True
-
     def _validate_config(self):
-        if isinstance(self.evolve_list, basestring):
-            self.evolve_list = [str(pokemon_name).lower().strip() for pokemon_name in self.evolve_list.split(',')]
-
-        if isinstance(self.donot_evolve_list, basestring):
-            self.donot_evolve_list = [str(pokemon_name).lower().strip() for pokemon_name in self.donot_evolve_list.split(',')]
-
         if 'evolve_speed' in self.config:
             self.logger.warning("evolve_speed is deprecated, instead please use 'min_evolve_speed' and 'max_evolved_speed'.")
 
@@ -153,14 +136,7 @@ class EvolvePokemon(BaseTask):
         return pokemons, pokemon_count
 
     def _should_evolve(self,pokemon):
-        to_evolve = self.default_to_evolve
-        if pokemon.unique_id > 0 and pokemon.has_next_evolution() and (self.logic_to_function[self.cp_iv_logic](pokemon)):
-            if (len(self.evolve_list) > 0) and (self.evolve_list[0] == 'all' or pokemon.name.lower() in self.evolve_list):
-                to_evolve = True
-            if (len(self.donot_evolve_list) > 0) and self.donot_evolve_list[0] != 'none' and pokemon.name.lower() in self.donot_evolve_list:
-                to_evolve = False
-            return to_evolve
-        return False
+        return self.evolve_rule.should_evolve(pokemon)
 
     def _execute_pokemon_evolve(self, pokemon, cache):
         if pokemon.name in cache:
@@ -203,23 +179,12 @@ class EvolvePokemon(BaseTask):
             sleep(0.7)
             evolve_result = False
 
-        with self.bot.database as conn:
-            c = conn.cursor()
-            c.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='evolve_log'")
-
-        result = c.fetchone()
-
-        while True:
-            if result[0] == 1:
-                conn.execute('''INSERT INTO evolve_log (pokemon, iv, cp) VALUES (?, ?, ?)''', (pokemon.name, pokemon.iv, pokemon.cp))
-                break
-            else:
-                self.emit_event(
-                    'evolve_log',
-                    sender=self,
-                    level='info',
-                    formatted="evolve_log table not found, skipping log"
-                )
-                break
+        if not self.bot.log_store.log('evolve_log', pokemon=pokemon.name, iv=pokemon.iv, cp=pokemon.cp):
+            self.emit_event(
+                'evolve_log',
+                sender=self,
+                level='info',
+                formatted="evolve_log table not found, skipping log"
+            )
 
         return evolve_result
@@ -1,6 +1,6 @@
 from pokemongo_bot.walkers.step_walker import StepWalker
 from pokemongo_bot.cell_workers.utils import distance
-from pokemongo_bot.cell_workers.utils import find_biggest_cluster
+from pokemongo_bot.cluster_engine import find_biggest_cluster
 from pokemongo_bot.base_task import BaseTask
 
 class FollowCluster(BaseTask):
@@ -24,12 +24,12 @@ class FollowCluster(BaseTask):
             lured_forts = [x for x in forts if 'active_fort_modifier' in x]
             if len(lured_forts) > 0:
                 log_lured_str = 'lured '
-                self.dest = find_biggest_cluster(self.radius, lured_forts, '9QM=')
+                self.dest = find_biggest_cluster(self.radius, lured_forts, '9QM=', self.bot.cluster_engine)
             else:
                 log_lure_avail_str = 'No lured pokestops in vicinity. Search for normal ones instead. '
-                self.dest = find_biggest_cluster(self.radius, forts)
+                self.dest = find_biggest_cluster(self.radius, forts, engine=self.bot.cluster_engine)
         else:
-            self.dest = find_biggest_cluster(self.radius, forts)
+            self.dest = find_biggest_cluster(self.radius, forts, engine=self.bot.cluster_engine)
 
         if self.dest is not None:
             lat = self.dest['latitude']
@@ -795,19 +795,16 @@ class GymPokemon(BaseTask):
         gyms = self.get_gyms(get_raids=raids)
 
         if self.bot.config.replicate_gps_xy_noise:
-            gyms = filter(lambda fort: distance(
-                self.bot.noised_position[0],
-                self.bot.noised_position[1],
-                fort['latitude'],
-                fort['longitude']
-            ) <= Constants.MAX_DISTANCE_FORT_IS_REACHABLE, self.gyms)
+            position = self.bot.noised_position
         else:
-            gyms = filter(lambda fort: distance(
-                self.bot.position[0],
-                self.bot.position[1],
-                fort['latitude'],
-                fort['longitude']
-            ) <= Constants.MAX_DISTANCE_FORT_IS_REACHABLE, self.gyms)
+            position = self.bot.position
+
+        in_range = set(fort['id'] for fort in self.bot.map_cell_store.gym_index().within(
+            position[0],
+            position[1],
+            Constants.MAX_DISTANCE_FORT_IS_REACHABLE
+        ))
+        gyms = filter(lambda fort: fort['id'] in in_range, self.gyms)
 
         return gyms
 
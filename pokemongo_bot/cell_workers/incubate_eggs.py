@@ -254,22 +254,14 @@ class IncubateEggs(BaseTask):
             inventory.player().exp += xp[i]
             self.bot.stardust += stardust[i]
 
-            with self.bot.database as conn:
-                c = conn.cursor()
-                c.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='eggs_hatched_log'")
-            result = c.fetchone()
-            while True:
-                if result[0] == 1:
-                    conn.execute('''INSERT INTO eggs_hatched_log (pokemon, cp, iv, pokemon_id) VALUES (?, ?, ?, ?)''', (pokemon.name, pokemon.cp, pokemon.iv, pokemon.pokemon_id))
-                    break
-                else:
-                    self.emit_event(
-                        'eggs_hatched_log',
-                        sender=self,
-                        level='info',
-                        formatted="eggs_hatched_log table not found, skipping log"
-                    )
-                    break
+            if not self.bot.log_store.log('eggs_hatched_log', pokemon=pokemon.name, cp=pokemon.cp, iv=pokemon.iv,
+                                          pokemon_id=pokemon.pokemon_id):
+                self.emit_event(
+                    'eggs_hatched_log',
+                    sender=self,
+                    level='info',
+                    formatted="eggs_hatched_log table not found, skipping log"
+                )
 
         self.bot.metrics.hatched_eggs(len(pokemon_list))
         return True
@@ -0,0 +1,18 @@
+from yoyo import step
+
+__depends__ = {'catch_log', 'pokestop_log', 'vanish_log'}
+
+step(
+    "CREATE INDEX IF NOT EXISTS catch_log_dated ON catch_log (dated)",
+    "DROP INDEX IF EXISTS catch_log_dated"
+)
+
+step(
+    "CREATE INDEX IF NOT EXISTS pokestop_log_dated ON pokestop_log (dated)",
+    "DROP INDEX IF EXISTS pokestop_log_dated"
+)
+
+step(
+    "CREATE INDEX IF NOT EXISTS vanish_log_dated ON vanish_log (dated)",
+    "DROP INDEX IF EXISTS vanish_log_dated"
+)
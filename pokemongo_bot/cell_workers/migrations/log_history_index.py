@@ -0,0 +1,73 @@
+from yoyo import step
+
+__depends__ = {'catch_log', 'eggs_hatched_log', 'evolve_log', 'transfer_log', 'vanish_log', 'log_dated_index', 'softban_log'}
+
+step(
+    "CREATE INDEX IF NOT EXISTS catch_log_cp ON catch_log (cp, iv, pokemon)",
+    "DROP INDEX IF EXISTS catch_log_cp"
+)
+
+step(
+    "CREATE INDEX IF NOT EXISTS catch_log_iv ON catch_log (iv, cp, pokemon)",
+    "DROP INDEX IF EXISTS catch_log_iv"
+)
+
+step(
+    "CREATE INDEX IF NOT EXISTS eggs_hatched_log_cp ON eggs_hatched_log (cp, iv, pokemon)",
+    "DROP INDEX IF EXISTS eggs_hatched_log_cp"
+)
+
+step(
+    "CREATE INDEX IF NOT EXISTS eggs_hatched_log_iv ON eggs_hatched_log (iv, cp, pokemon)",
+    "DROP INDEX IF EXISTS eggs_hatched_log_iv"
+)
+
+step(
+    "CREATE INDEX IF NOT EXISTS evolve_log_cp ON evolve_log (cp, iv, pokemon)",
+    "DROP INDEX IF EXISTS evolve_log_cp"
+)
+
+step(
+    "CREATE INDEX IF NOT EXISTS evolve_log_iv ON evolve_log (iv, cp, pokemon)",
+    "DROP INDEX IF EXISTS evolve_log_iv"
+)
+
+step(
+    "CREATE INDEX IF NOT EXISTS transfer_log_cp ON transfer_log (cp, iv, pokemon)",
+    "DROP INDEX IF EXISTS transfer_log_cp"
+)
+
+step(
+    "CREATE INDEX IF NOT EXISTS transfer_log_iv ON transfer_log (iv, cp, pokemon)",
+    "DROP INDEX IF EXISTS transfer_log_iv"
+)
+
+step(
+    "CREATE INDEX IF NOT EXISTS vanish_log_cp ON vanish_log (cp, iv, pokemon)",
+    "DROP INDEX IF EXISTS vanish_log_cp"
+)
+
+step(
+    "CREATE INDEX IF NOT EXISTS vanish_log_iv ON vanish_log (iv, cp, pokemon)",
+    "DROP INDEX IF EXISTS vanish_log_iv"
+)
+
+step(
+    "CREATE INDEX IF NOT EXISTS eggs_hatched_log_dated ON eggs_hatched_log (dated)",
+    "DROP INDEX IF EXISTS eggs_hatched_log_dated"
+)
+
+step(
+    "CREATE INDEX IF NOT EXISTS evolve_log_dated ON evolve_log (dated)",
+    "DROP INDEX IF EXISTS evolve_log_dated"
+)
+
+step(
+    "CREATE INDEX IF NOT EXISTS softban_log_dated ON softban_log (dated)",
+    "DROP INDEX IF EXISTS softban_log_dated"
+)
+
+step(
+    "CREATE INDEX IF NOT EXISTS transfer_log_dated ON transfer_log (dated)",
+    "DROP INDEX IF EXISTS transfer_log_dated"
+)
@@ -0,0 +1,31 @@
+from yoyo import step
+
+__depends__ = {'catch_log', 'eggs_hatched_log', 'evolve_log', 'pokestop_log', 'transfer_log', 'vanish_log',
+               'log_history_index'}
+
+step(
+    "CREATE TABLE IF NOT EXISTS log_rollup (metric text, period integer, start integer, key text, "
+    "count integer DEFAULT 0, total real DEFAULT 0, PRIMARY KEY (metric, period, start, key))",
+    "DROP TABLE IF EXISTS log_rollup"
+)
+
+# Rolls up the rows logged so far, as pokemongo_bot.log_analytics.ROLLUPS does for new ones
+ROLLUPS = [
+    ('catch', 'catch_log', "IFNULL(pokemon, '')", 'iv'),
+    ('catch_iv', 'catch_log', "IFNULL(CAST(iv * 10 AS INTEGER), '')", 'NULL'),
+    ('hatch', 'eggs_hatched_log', "IFNULL(pokemon, '')", 'iv'),
+    ('evolve', 'evolve_log', "IFNULL(pokemon, '')", 'iv'),
+    ('spin', 'pokestop_log', "''", 'CAST(exp AS REAL)'),
+    ('transfer', 'transfer_log', "IFNULL(pokemon, '')", 'iv'),
+    ('vanish', 'vanish_log', "IFNULL(pokemon, '')", 'iv'),
+]
+
+for period in (3600, 86400):
+    for metric, table, key, total in ROLLUPS:
+        step(
+            "INSERT OR IGNORE INTO log_rollup (metric, period, start, key, count, total) "
+            "SELECT '{metric}', {period}, CAST(strftime('%s', dated) AS INTEGER) / {period} * {period} AS bucket, "
+            "{key} AS rollup_key, COUNT(*), TOTAL({total}) FROM {table} "
+            "WHERE dated IS NOT NULL GROUP BY bucket, rollup_key".format(
+                metric=metric, period=period, key=key, total=total, table=table)
+        )
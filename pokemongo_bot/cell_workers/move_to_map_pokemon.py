@@ -61,7 +61,7 @@ import time
 import json
 import requests
 
-from pokemongo_bot import inventory
+from pokemongo_bot import http_client, inventory
 from pokemongo_bot.base_dir import _base_dir
 from pokemongo_bot.cell_workers.utils import distance, format_dist, format_time, fort_details
 from pokemongo_bot.walkers.walker_factory import walker_factory
@@ -169,9 +169,9 @@ class MoveToMapPokemon(BaseTask):
 
     def get_pokemon_from_url(self):
         try:
-            request = requests.get(self.config['address'])
+            request = http_client.get(self.config['address'], conditional=True)
             response = request.json()
-        except requests.exceptions.ConnectionError:
+        except requests.exceptions.RequestException:
             self._emit_failure('Could not get data from {}'.format(self.config['address']))
             return []
         except ValueError:
@@ -12,6 +12,7 @@ from pokemongo_bot import inventory
 from pokemongo_bot.base_task import BaseTask
 from pokemongo_bot.human_behaviour import sleep, action_delay
 from pokemongo_bot.inventory import Pokemon
+from pokemongo_bot.pokemon_rules import CatchRule, named_rules
 from pokemongo_bot.worker_result import WorkerResult
 from pokemongo_bot.base_dir import _base_dir
 from datetime import datetime, timedelta
@@ -37,13 +38,6 @@ ITEM_GOLDEN_RAZZ_BERRY = 706
 
 DEFAULT_UNSEEN_AS_VIP = True
 
-LOGIC_TO_FUNCTION = {
-    'or': lambda x, y, z: x or y or z,
-    'and': lambda x, y, z: x and y and z,
-    'orand': lambda x, y, z: x or y and z,
-    'andor': lambda x, y, z: x and y or z
-}
-
 DEBUG_ON = False
 
 class PokemonCatchWorker(BaseTask):
@@ -220,15 +214,11 @@ class PokemonCatchWorker(BaseTask):
             self.emit_event('vip_pokemon', formatted='This is a VIP pokemon. Catch!!!')
 
         # check catch limits before catch
-        with self.bot.database as conn:
-            c = conn.cursor()
-            c.execute("SELECT DISTINCT COUNT(encounter_id) FROM catch_log WHERE dated >= datetime('now','-1 day')")
-
-        result = c.fetchone()
+        caught_last_24_hour = self.bot.log_store.daily_count('catch_log')
 
 
         while True:
-            if result[0] < self.daily_catch_limit:
+            if caught_last_24_hour < self.daily_catch_limit:
             # catch that pokemon!
                 encounter_id = self.pokemon['encounter_id']
                 catch_rate_by_ball = [0] + response['capture_probability']['capture_probability']  # offset so item ids match indces
@@ -289,35 +279,25 @@ class PokemonCatchWorker(BaseTask):
     ############################################################################
 
     def _pokemon_matches_config(self, config, pokemon, default_logic='and'):
-        pokemon_config = config.get(pokemon.name, config.get('any'))
+        rule = named_rules(config, CatchRule, default_logic=default_logic).get(pokemon.name)
 
-        if not pokemon_config:
+        if not rule:
             return False
 
-
-        catch_results = {
-            'ncp': False,
-            'cp': False,
-            'iv': False,
-            'fa': True,
-            'ca': True
-        }
-
-        catch_logic = pokemon_config.get('logic', default_logic)
-
-        current_owned = [p for p in inventory.pokemons().all() if p.name == pokemon.name]
         candies = inventory.candies().get(pokemon.pokemon_id).quantity
-        threshold = pokemon_config.get('candy_threshold', -1)
-        if threshold > 0 and candies >= threshold: # Got enough candies
+        if rule.has_enough_candies(candies): # Got enough candies
             return False
 
-        if pokemon_config.get('never_catch', False):
+        if rule.never_catch:
             return False
 
-        if pokemon_config.get('always_catch', False):
+        if rule.always_catch:
             return True
 
-        if pokemon_config.get('only_catch_better_cp', False):
+        if rule.only_catch_better_cp or rule.only_catch_better_iv:
+            current_owned = [p for p in inventory.pokemons().all() if p.name == pokemon.name]
+
+        if rule.only_catch_better_cp:
             # If we don't have the Pokemon, this always returns true
             if len(current_owned) == 0:
                 return True
@@ -328,7 +308,7 @@ class PokemonCatchWorker(BaseTask):
             else:
                 return False
 
-        if pokemon_config.get('only_catch_better_iv', False):
+        if rule.only_catch_better_iv:
             # If we don't have the Pokemon, this always returns true
             if len(current_owned) == 0:
                 return True
@@ -346,74 +326,32 @@ class PokemonCatchWorker(BaseTask):
             else:
                 return False
 
-        if pokemon_config.get('catch_above_ncp',-1) >= 0:
-            if pokemon.cp_percent >= pokemon_config.get('catch_above_ncp'):
-                catch_results['ncp'] = True
-
-        if pokemon_config.get('catch_above_cp',-1) >= 0:
-            if pokemon.cp >= pokemon_config.get('catch_above_cp'):
-                catch_results['cp'] = True
-
-        if pokemon_config.get('catch_below_cp',-1) >= 0:
-            if pokemon.cp <= pokemon_config.get('catch_below_cp'):
-                catch_results['cp'] = True
-
-        if pokemon_config.get('catch_above_iv',-1) >= 0:
-            if pokemon.iv > pokemon_config.get('catch_above_iv', pokemon.iv):
-                catch_results['iv'] = True
+        catch_results = rule.results(pokemon)
+        ncp, cp, iv, fa, ca = catch_results
 
-        catch_results['fa'] = ( len(pokemon_config.get('fast_attack', [])) == 0 or unicode(pokemon.fast_attack) in map(lambda x: unicode(x), pokemon_config.get('fast_attack', [])))
-        catch_results['ca'] = ( len(pokemon_config.get('charged_attack', [])) == 0 or unicode(pokemon.charged_attack) in map(lambda x: unicode(x), pokemon_config.get('charged_attack', [])))
-
-        self.bot.logger.debug("Our comparison results: FA: {}, CA: {}, CP: {}, NCP: {}, IV: {}".format(catch_results['fa'], catch_results['ca'], catch_results['cp'],  catch_results['ncp'], catch_results['iv']))
+        self.bot.logger.debug("Our comparison results: FA: {}, CA: {}, CP: {}, NCP: {}, IV: {}".format(fa, ca, cp, ncp, iv))
 
         # check if encountered pokemon is our locked pokemon
         if self.bot.capture_locked and self.bot.capture_locked != pokemon.pokemon_id:
             self.bot.logger.debug("Pokemon locked!")
             return False
 
-        # build catch results
-        cr = {
-            'ncp': False,
-            'cp': False,
-            'iv': False
-        }
-        if catch_logic == 'and':
-            cr['ncp'] = True,
-            cr['cp'] = True,
-            cr['iv'] = True
-        elif catch_logic == 'andor':
-            cr['ncp'] = True,
-            cr['cp'] = True
-        elif catch_logic == 'orand':
-            cr['cp'] = True,
-            cr['iv'] = True
-
-        if pokemon_config.get('catch_above_ncp',-1) >= 0: cr['ncp'] = catch_results['ncp']
-        if pokemon_config.get('catch_above_cp',-1) >= 0: cr['cp'] = catch_results['cp']
-        if pokemon_config.get('catch_below_cp',-1) >= 0: cr['cp'] = catch_results['cp']
-        if pokemon_config.get('catch_above_iv',-1) >= 0: cr['iv'] = catch_results['iv']
-
         if DEBUG_ON:
             print "Debug information for match rules..."
-            print "catch_results ncp = {}".format(catch_results['ncp'])
-            print "catch_results cp = {}".format(catch_results['cp'])
-            print "catch_results iv = {}".format(catch_results['iv'])
-            print "cr = {}".format(cr)
-            print "catch_above_ncp = {}".format(pokemon_config.get('catch_above_ncp'))
-            print "catch_above_cp iv = {}".format(pokemon_config.get('catch_above_cp'))
-            print "catch_below_cp iv = {}".format(pokemon_config.get('catch_below_cp'))
-            print "catch_above_iv iv = {}".format(pokemon_config.get('catch_above_iv'))
+            print "catch_results ncp = {}".format(ncp)
+            print "catch_results cp = {}".format(cp)
+            print "catch_results iv = {}".format(iv)
+            print "catch_above_ncp = {}".format(rule.above_ncp)
+            print "catch_above_cp iv = {}".format(rule.above_cp)
+            print "catch_below_cp iv = {}".format(rule.below_cp)
+            print "catch_above_iv iv = {}".format(rule.above_iv)
             print "Pokemon {}".format(pokemon.name)
             print "pokemon ncp = {}".format(pokemon.cp_percent)
             print "pokemon cp = {}".format(pokemon.cp)
             print "pokemon iv = {}".format(pokemon.iv)
-            print "catch logic = {}".format(catch_logic)
+            print "catch logic = {}".format(rule.logic_name)
 
-        if LOGIC_TO_FUNCTION[catch_logic](*cr.values()):
-            return catch_results['fa'] and catch_results['ca']
-        else:
-            return False
+        return rule.matches(catch_results)
 
     def _should_catch_pokemon(self, pokemon):
         return self._pokemon_matches_config(self.bot.config.catch, pokemon)
@@ -480,18 +418,7 @@ class PokemonCatchWorker(BaseTask):
                     level='warning',
                     formatted='Failed to use berry. You may be softbanned.'
                 )
-                with self.bot.database as conn:
-                    c = conn.cursor()
-                    c.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='softban_log'")
-                result = c.fetchone()
-
-                while True:
-                    if result[0] == 1:
-                        source = str("PokemonCatchWorker")
-                        status = str("Possible Softban")
-                        conn.execute('''INSERT INTO softban_log (status, source) VALUES (?, ?)''', (status, source))
-                    break
-                else:
+                if not self.bot.log_store.log('softban_log', status='Possible Softban', source='PokemonCatchWorker'):
                     self.emit_event(
                         'softban_log',
                         sender=self,
@@ -695,23 +622,14 @@ class PokemonCatchWorker(BaseTask):
             # abandon if pokemon vanished
             elif catch_pokemon_status == CATCH_STATUS_VANISHED:
                 #insert into DB
-                with self.bot.database as conn:
-                    c = conn.cursor()
-                    c.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='vanish_log'")
-                result = c.fetchone()
-
-                while True:
-                    if result[0] == 1:
-                        conn.execute('''INSERT INTO vanish_log (pokemon, cp, iv, encounter_id, pokemon_id) VALUES (?, ?, ?, ?, ?)''', (pokemon.name, pokemon.cp, pokemon.iv, str(encounter_id), pokemon.pokemon_id))
-                    break
-                else:
+                if not self.bot.log_store.log('vanish_log', pokemon=pokemon.name, cp=pokemon.cp, iv=pokemon.iv,
+                                              encounter_id=str(encounter_id), pokemon_id=pokemon.pokemon_id):
                     self.emit_event(
                         'vanish_log',
                         sender=self,
                         level='info',
                         formatted="vanish_log table not found, skipping log"
                     )
-                    break
 
                 self.emit_event(
                     'pokemon_vanished',
@@ -725,12 +643,7 @@ class PokemonCatchWorker(BaseTask):
                     }
                 )
 
-                with self.bot.database as conn:
-                    c = conn.cursor()
-                    c.execute("SELECT DISTINCT COUNT(encounter_id) FROM vanish_log WHERE dated > (SELECT dated FROM catch_log WHERE dated IN (SELECT MAX(dated) FROM catch_log))")
-
-                result = c.fetchone()
-                self.consecutive_vanishes_so_far = result[0]
+                self.consecutive_vanishes_so_far = self.bot.log_store.count_since('vanish_log', 'catch_log')
 
                 if self.rest_completed == False and self.consecutive_vanishes_so_far >= self.consecutive_vanish_limit:
                     self.start_rest()
@@ -747,12 +660,7 @@ class PokemonCatchWorker(BaseTask):
 
                 awards = response_dict['responses']['CATCH_POKEMON']['capture_award']
                 exp_gain, candy_gain, stardust_gain = self.extract_award(awards)
-                with self.bot.database as conn:
-                    c = conn.cursor()
-                    c.execute(
-                        "SELECT DISTINCT COUNT(encounter_id) FROM catch_log WHERE dated >= datetime('now','-1 day')")
-
-                result = c.fetchone()
+                caught_last_24_hour = self.bot.log_store.daily_count('catch_log')
 
                 if is_vip:
                     self.emit_event(
@@ -771,7 +679,7 @@ class PokemonCatchWorker(BaseTask):
                             'latitude': str(self.pokemon['latitude']),
                             'longitude': str(self.pokemon['longitude']),
                             'pokemon_id': str(pokemon.pokemon_id),
-                            'caught_last_24_hour': str(result[0]),
+                            'caught_last_24_hour': str(caught_last_24_hour),
                             'daily_catch_limit': str(self.daily_catch_limit)
                         }
                     )
@@ -793,7 +701,7 @@ class PokemonCatchWorker(BaseTask):
                             'latitude': str(self.pokemon['latitude']),
                             'longitude': str(self.pokemon['longitude']),
                             'pokemon_id': str(pokemon.pokemon_id),
-                            'caught_last_24_hour': str(result[0]),
+                            'caught_last_24_hour': str(caught_last_24_hour),
                             'daily_catch_limit': str(self.daily_catch_limit)
                         }
                     )
@@ -819,23 +727,14 @@ class PokemonCatchWorker(BaseTask):
 
 
                 try:
-                    with self.bot.database as conn:
-                        c = conn.cursor()
-                        c.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='catch_log'")
-                    result = c.fetchone()
-
-                    while True:
-                        if result[0] == 1:
-                            conn.execute('''INSERT INTO catch_log (pokemon, cp, iv, encounter_id, pokemon_id) VALUES (?, ?, ?, ?, ?)''', (pokemon.name, pokemon.cp, pokemon.iv, str(encounter_id), pokemon.pokemon_id))
-                        break
-                    else:
+                    if not self.bot.log_store.log('catch_log', pokemon=pokemon.name, cp=pokemon.cp, iv=pokemon.iv,
+                                                  encounter_id=str(encounter_id), pokemon_id=pokemon.pokemon_id):
                         self.emit_event(
                             'catch_log',
                             sender=self,
                             level='info',
                             formatted="catch_log table not found, skipping log"
                         )
-                        break
                     user_data_caught = os.path.join(_base_dir, 'data', 'caught-%s.json' % self.bot.config.username)
                     with open(user_data_caught, 'ab') as outfile:
                         json.dump(OrderedDict({
@@ -3,6 +3,7 @@ from __future__ import unicode_literals
 
 import time
 from datetime import datetime, timedelta
+from math import sqrt
 from collections import Counter
 from collections import OrderedDict
 
@@ -16,7 +17,7 @@ from pokemongo_bot.item_list import Item
 from pokemongo_bot.walkers.polyline_walker import PolylineWalker
 from pokemongo_bot.walkers.step_walker import StepWalker
 from pokemongo_bot.worker_result import WorkerResult
-from .utils import fort_details, format_dist, distance
+from .utils import fort_details, format_dist, distance, coordinates, distances_from
 
 import random
 import sys
@@ -284,16 +285,7 @@ class PokemonHunter(BaseTask):
                     if self.no_rare_counts == 4: 
                         # Record in database once per run
                         try:
-                            with self.bot.database as conn:
-                                c = conn.cursor()
-                                c.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='shadowban_log'")
-                            result = c.fetchone()
-
-                            while True:
-                                if result[0] == 1:
-                                    conn.execute('''INSERT INTO shadowban_log (username) VALUES (?)''', (str(self.bot.config.username),))
-                                break
-                            else:
+                            if not self.bot.log_store.log('shadowban_log', username=str(self.bot.config.username)):
                                 self.emit_event(
                                     'shadowban_log',
                                     sender=self,
@@ -437,12 +429,9 @@ class PokemonHunter(BaseTask):
                         if round(pokemon["distance"], 2) >= round(self.destination["distance"], 2):
                             # further away!
                             break
-                        with self.bot.database as conn:
-                            c = conn.cursor()
-                            c.execute(
-                                "SELECT COUNT(pokemon) FROM catch_log where pokemon = '{}' and  datetime(dated, 'localtime') > Datetime('{}')".format(pokemon["name"], self.hunt_started_at.strftime("%Y-%m-%d %H:%M:%S")))
                         # Now check if there is 1 or more caught
-                        amount = c.fetchone()[0]
+                        amount = self.bot.log_store.fetchone(
+                            "SELECT COUNT(pokemon) FROM catch_log where pokemon = '{}' and  datetime(dated, 'localtime') > Datetime('{}')".format(pokemon["name"], self.hunt_started_at.strftime("%Y-%m-%d %H:%M:%S")))[0]
                         if amount > 0:
                             # We caught this pokemon recently, skip it
                             continue
@@ -658,23 +647,24 @@ class PokemonHunter(BaseTask):
     def get_nearby_pokemons(self):
         radius = self.config_max_distance
 
-        pokemons = [p for p in self.bot.cell["nearby_pokemons"] if self.get_distance(self.bot.start_position, p) <= radius]
+        nearby = self.bot.cell["nearby_pokemons"]
+        candidates = nearby + self.bot.cell.get('wild_pokemons', []) + self.bot.cell.get('catchable_pokemons', [])
+        lats, lngs = coordinates(candidates)
+        from_start = distances_from(self.bot.start_position[0], self.bot.start_position[1], lats, lngs)
+        from_here = distances_from(self.bot.position[0], self.bot.position[1], lats, lngs)
 
-        if 'wild_pokemons' in self.bot.cell:
-            for pokemon in self.bot.cell['wild_pokemons']:
-                if pokemon['encounter_id'] in map(lambda pokemon: pokemon['encounter_id'], pokemons):
-                    # Already added this Pokemon
-                    continue
-                if self.get_distance(self.bot.start_position, pokemon) <= radius:
-                    pokemons.append(pokemon)
-        
-        if 'catchable_pokemons' in self.bot.cell:
-            for pokemon in self.bot.cell['catchable_pokemons']:
-                if pokemon['encounter_id'] in map(lambda pokemon: pokemon['encounter_id'], pokemons):
-                    # Already added this Pokemon
-                    continue
-                if self.get_distance(self.bot.start_position, pokemon) <= radius:
-                    pokemons.append(pokemon)
+        pokemons = []
+        seen_encounters = set()
+
+        for i, pokemon in enumerate(candidates):
+            if from_start[i] > radius:
+                continue
+            if i >= len(nearby) and pokemon['encounter_id'] in seen_encounters:
+                # Already added this Pokemon
+                continue
+            pokemon["distance"] = float(from_here[i])
+            pokemons.append(pokemon)
+            seen_encounters.add(pokemon['encounter_id'])
 
         for pokemon in pokemons:
             if "pokemon_data" in pokemon:
@@ -686,8 +676,6 @@ class PokemonHunter(BaseTask):
                 # Skip this one!
                 continue
 
-            pokemon["distance"] = self.get_distance(self.bot.position, pokemon)
-            
             if "name" not in pokemon:
                 pokemon["name"] = inventory.pokemons().name_for(pokemon["pokemon_id"])
             if "pokemon_id" not in pokemon:
@@ -815,12 +803,9 @@ class PokemonHunter(BaseTask):
         if self.destination is None:
             return False
 
-        with self.bot.database as conn:
-            c = conn.cursor()
-            c.execute(
-                "SELECT COUNT(pokemon) FROM catch_log where pokemon = '{}' and  datetime(dated, 'localtime') > Datetime('{}')".format(self.destination["name"], self.hunt_started_at.strftime("%Y-%m-%d %H:%M:%S")))
         # Now check if there is 1 or more caught
-        amount = c.fetchone()[0]
+        amount = self.bot.log_store.fetchone(
+            "SELECT COUNT(pokemon) FROM catch_log where pokemon = '{}' and  datetime(dated, 'localtime') > Datetime('{}')".format(self.destination["name"], self.hunt_started_at.strftime("%Y-%m-%d %H:%M:%S")))[0]
         caught = amount > 0
         if caught:
             self.logger.info("We caught {} {}(s) since {}".format(amount, self.destination["name"], self.hunt_started_at.strftime("%Y-%m-%d %H:%M:%S")))
@@ -831,12 +816,9 @@ class PokemonHunter(BaseTask):
         if self.destination is None:
             return False
 
-        with self.bot.database as conn:
-            c = conn.cursor()
-            c.execute(
-                "SELECT COUNT(pokemon) FROM vanish_log where pokemon = '{}' and  datetime(dated, 'localtime') > Datetime('{}')".format(self.destination["name"], self.hunt_started_at.strftime("%Y-%m-%d %H:%M:%S")))
         # Now check if there is 1 or more caught
-        amount = c.fetchone()[0]
+        amount = self.bot.log_store.fetchone(
+            "SELECT COUNT(pokemon) FROM vanish_log where pokemon = '{}' and  datetime(dated, 'localtime') > Datetime('{}')".format(self.destination["name"], self.hunt_started_at.strftime("%Y-%m-%d %H:%M:%S")))[0]
         vanished = amount > 0
         if vanished:
             self.logger.info("We lost {} {}(s) since {}".format(amount, self.destination["name"], self.hunt_started_at.strftime("%Y-%m-%d %H:%M:%S")))
@@ -844,26 +826,28 @@ class PokemonHunter(BaseTask):
         return vanished
 
     def get_nearest_fort_on_the_way(self):
-        forts = self.bot.get_forts(order_by_distance=True)
+        ratio = float(self.config.get('max_extra_dist_fort', 20))
+        position = self.bot.position[0:2]
+        target = self.search_points[0]
+        dist_self_to_pokemon = distance(position[0], position[1], target[0], target[1])
+
+        # Forts with a small enough detour lie in an ellipse with foci at us and
+        # the target, which fits in a band of its semi-minor axis around the way.
+        max_total_dist = (1 + (ratio / 100)) * dist_self_to_pokemon
+        width = sqrt(max(max_total_dist ** 2 - dist_self_to_pokemon ** 2, 0)) / 2 * 1.05
+        forts = self.bot.map_cell_store.fort_index().along_segment(position, target, width)
 
         # Remove stops that are still on timeout
-        forts = filter(lambda x: x["id"] not in self.bot.fort_timeouts, forts)
-        i = 0
-        while i < len(forts):
-            ratio = float(self.config.get('max_extra_dist_fort', 20))
-            dist_self_to_fort = distance(self.bot.position[0], self.bot.position[1], forts[i]['latitude'],
-                                         forts[i]['longitude'])
-            # self.search_points[0][0], self.search_points[0][1]
-            dist_fort_to_pokemon = distance(self.search_points[0][0], self.search_points[0][1], forts[i]['latitude'],
-                                            forts[i]['longitude'])
+        forts = [f for f in forts if f["id"] not in self.bot.fort_timeouts]
+
+        nearest_fort = None
+        nearest_dist = None
+        for fort in forts:
+            dist_self_to_fort = distance(position[0], position[1], fort['latitude'], fort['longitude'])
+            dist_fort_to_pokemon = distance(target[0], target[1], fort['latitude'], fort['longitude'])
             total_dist = dist_self_to_fort + dist_fort_to_pokemon
-            dist_self_to_pokemon = distance(self.bot.position[0], self.bot.position[1], self.search_points[0][0], self.search_points[0][1])
-            if total_dist < (1 + (ratio / 100)) * dist_self_to_pokemon:
-                i += 1
-            else:
-                del forts[i]
-            # Return nearest fort if there are remaining
-        if len(forts):
-            return forts[0]
-        else:
-            return None
+            if total_dist < max_total_dist and (nearest_dist is None or dist_self_to_fort < nearest_dist):
+                nearest_fort = fort
+                nearest_dist = dist_self_to_fort
+
+        return nearest_fort
@@ -1,10 +1,8 @@
 from __future__ import unicode_literals
 
 # import datetime
-import difflib
 import itertools
 import json
-import math
 import os
 import time
 import datetime
@@ -12,8 +10,11 @@ import datetime
 from pokemongo_bot import inventory
 from pokemongo_bot.base_dir import _base_dir
 from pokemongo_bot.base_task import BaseTask
+from pokemongo_bot.evolution_planner import EvolutionCosts, EvolutionPlanner, UpgradeCosts
 from pokemongo_bot.human_behaviour import sleep, action_delay
 from pokemongo_bot.item_list import Item
+from pokemongo_bot.optimizer_engine import PokemonScorer, ScoreTable
+from pokemongo_bot.pokemon_rules import OptimizerRule
 from pokemongo_bot.tree_config_builder import ConfigException
 from pokemongo_bot.worker_result import WorkerResult
 
@@ -31,7 +32,6 @@ class PokemonOptimizer(BaseTask):
     def initialize(self):
         self.max_pokemon_storage = inventory.get_pokemon_inventory_size()
         self.last_pokemon_count = 0
-        self.pokemon_names = [p.name for p in inventory.pokemons().STATIC_DATA]
         self.evolution_map = {}
         self.debug = self.config.get('debug', False)
         self.ongoing_stardust_count = 0
@@ -112,6 +112,22 @@ class PokemonOptimizer(BaseTask):
             if pokemon.prev_evolutions_all:
                 self.config_groups["with_previous_evolution"].append(pokemon.name)
 
+        self.rules = self.compile_rules()
+
+        try:
+            upgrade_costs = UpgradeCosts(self.pokemon_upgrade_cost)
+        except ValueError:
+            self.logger.warning("Can not read the upgrade costs, Pokemon will not be upgraded")
+            upgrade_costs = None
+
+        self.evolution_costs = EvolutionCosts(inventory.Pokemons.STATIC_DATA)
+        self.planner = EvolutionPlanner(self.evolution_costs, upgrade_costs,
+                                        evolve_to_final=self.config_evolve_to_final,
+                                        use_evolution_items=self.config_use_evolution_items,
+                                        evolve_for_xp=bool(self.config_evolve_for_xp),
+                                        xp_whitelist=self.config_evolve_for_xp_whitelist,
+                                        xp_blacklist=self.config_evolve_for_xp_blacklist)
+
     def log(self, txt):
         if self.log_file.tell() >= 1024 * 1024:
              self.log_file.seek(0, 0)
@@ -149,97 +165,7 @@ class PokemonOptimizer(BaseTask):
             self.check_buddy()
             self.open_inventory()
 
-            keep_all = []
-            try_evolve_all = []
-            try_upgrade_all = []
-            buddy_all = []
-            favor_all = []
-
-            for rule in self.config_rules:
-                mode = rule.get("mode", "by_family")
-                names = rule.get("names", [])
-                check_top = rule.get("top", "all")
-                check_keep = rule.get("keep", True)
-                whitelist, blacklist = self.get_colorlist(names)
-
-                if check_top == "all" and names == [] and check_keep:
-                    self.logger.info("WARNING!! Will not transfer any Pokemon!!")
-                    self.logger.info(rule)
-                    self.logger.info("This rule is set to keep (`keep` is true) all Pokemon (no `top` and no `names` set!!)")
-                    self.logger.info("Are you sure you want this?")
-
-                if mode == "by_pokemon":
-                    for pokemon_id, pokemon_list in self.group_by_pokemon_id(inventory.pokemons().all()):
-                        name = inventory.pokemons().name_for(pokemon_id)
-
-                        if name in blacklist:
-                            continue
-
-                        if whitelist and (name not in whitelist):
-                            continue
-
-                        sorted_list = self.score_and_sort(pokemon_list, rule)
-
-                        if len(sorted_list) == 0:
-                            continue
-
-                        keep, try_evolve, try_upgrade, buddy, favor = self.get_best_pokemon_for_rule(sorted_list, rule)
-                        keep_all += keep
-                        try_evolve_all += try_evolve
-                        try_upgrade_all += try_upgrade
-                        buddy_all += buddy
-                        favor_all += favor
-                elif mode == "by_family":
-                    for family_id, pokemon_list in self.group_by_family_id(inventory.pokemons().all()):
-                        matching_names = self.get_family_names(family_id)
-
-                        if any(n in blacklist for n in matching_names):
-                            continue
-
-                        if whitelist and not any(n in whitelist for n in matching_names):
-                            continue
-
-                        sorted_list = self.score_and_sort(pokemon_list, rule)
-
-                        if len(sorted_list) == 0:
-                            continue
-
-                        if family_id == 133:  # "Eevee"
-                            keep, try_evolve, try_upgrade, buddy, favor = self.get_multi_best_pokemon_for_rule(sorted_list, rule, 3)
-                        else:
-                            keep, try_evolve, try_upgrade, buddy, favor = self.get_best_pokemon_for_rule(sorted_list, rule)
-
-                        keep_all += keep
-                        try_evolve_all += try_evolve
-                        try_upgrade_all += try_upgrade
-                        buddy_all += buddy
-                        favor_all += favor
-                elif mode == "overall":
-                    pokemon_list = []
-
-                    for pokemon in inventory.pokemons().all():
-                        name = pokemon.name
-
-                        if name in blacklist:
-                            continue
-
-                        if whitelist and (name not in whitelist):
-                            continue
-
-                        pokemon_list.append(pokemon)
-
-                    sorted_list = self.score_and_sort(pokemon_list, rule)
-
-                    if len(sorted_list) == 0:
-                        continue
-
-                    keep, try_evolve, try_upgrade, buddy, favor = self.get_best_pokemon_for_rule(sorted_list, rule)
-                    keep_all += keep
-                    try_evolve_all += try_evolve
-                    try_upgrade_all += try_upgrade
-                    buddy_all += buddy
-                    favor_all += favor
-
+            keep_all, try_evolve_all, try_upgrade_all, buddy_all, favor_all = self.apply_rules(inventory.pokemons().all())
 
             keep_all = self.unique_pokemon_list(keep_all)
             try_evolve_all = self.unique_pokemon_list(try_evolve_all)
@@ -250,8 +176,9 @@ class PokemonOptimizer(BaseTask):
             # Like a buddy
             if self.config_may_unfavor_pokemon:
                 unfavor = []
+                favored = set(p.unique_id for p in try_favor_all)
                 for pokemon in inventory.pokemons().all():
-                    if not pokemon in try_favor_all and pokemon.is_favorite:
+                    if pokemon.unique_id not in favored and pokemon.is_favorite:
                         unfavor.append(pokemon)
                 if len(unfavor) > 0:
                     self.logger.info("Marking %s Pokemon as no longer favorite", len(unfavor))
@@ -277,21 +204,7 @@ class PokemonOptimizer(BaseTask):
             if run_number == 1 and self.get_pokemon_slot_left() > self.config_min_slots_left:
                 return WorkerResult.SUCCESS
 
-            transfer_all = []
-            evolve_all = []
-            upgrade_all = []
-            xp_all = []
-            for family_id, pokemon_list in self.group_by_family_id(inventory.pokemons().all()):
-                keep = [p for p in keep_all if self.get_family_id(p) == family_id]
-                try_evolve = [p for p in try_evolve_all if self.get_family_id(p) == family_id]
-                try_upgrade = [p for p in try_upgrade_all if self.get_family_id(p) == family_id]
-
-                transfer, evolve, upgrade, xp = self.get_evolution_plan(family_id, pokemon_list, keep, try_evolve, try_upgrade)
-
-                transfer_all += transfer
-                evolve_all += evolve
-                upgrade_all += upgrade
-                xp_all += xp
+            transfer_all, evolve_all, upgrade_all, xp_all = self.get_evolution_plan(keep_all, try_evolve_all, try_upgrade_all)
 
             if not self.config_may_evolve_favorites:
                 self.logger.info("Removing favorites from evolve list.")
@@ -342,22 +255,7 @@ class PokemonOptimizer(BaseTask):
                                       "distance_needed": distance_needed})
 
     def open_inventory(self):
-        for pokemon in inventory.pokemons().all():
-            setattr(pokemon, "ncp", pokemon.cp_percent)
-            setattr(pokemon, "max_cp", pokemon.static.max_cp)
-            setattr(pokemon, "dps", pokemon.moveset.dps)
-            setattr(pokemon, "dps1", pokemon.fast_attack.dps)
-            setattr(pokemon, "dps2", pokemon.charged_attack.dps)
-            setattr(pokemon, "dps_attack", pokemon.moveset.dps_attack)
-            setattr(pokemon, "dps_defense", pokemon.moveset.dps_defense)
-            setattr(pokemon, "attack_perfection", pokemon.moveset.attack_perfection)
-            setattr(pokemon, "defense_perfection", pokemon.moveset.defense_perfection)
-            setattr(pokemon, "candy", pokemon.candy_quantity)
-
-            candy_to_evolution = max(pokemon.evolution_cost - pokemon.candy_quantity, 0)
-
-            setattr(pokemon, "candy_to_evolution", candy_to_evolution)
-
+        # Sort keys such as ncp, dps or candy are properties of the pokemons
         self.ongoing_stardust_count = self.bot.stardust
 
     def get_colorlist(self, names):
@@ -394,19 +292,38 @@ class PokemonOptimizer(BaseTask):
 
         return (whitelist, blacklist)
 
+    def compile_rules(self):
+        """
+        Compiles the rules of the config, with the names they apply to.
+        :return: (rule, whitelist, blacklist) for each rule.
+        :rtype: list
+        :raise: ConfigException: When a rule is not valid.
+        """
+        rules = []
+
+        for setting in self.config_rules:
+            rule = OptimizerRule(setting)
+            whitelist, blacklist = self.get_colorlist(rule.names)
+
+            if rule.keeps_all:
+                self.logger.info("WARNING!! Will not transfer any Pokemon!!")
+                self.logger.info(setting)
+                self.logger.info("This rule is set to keep (`keep` is true) all Pokemon (no `top` and no `names` set!!)")
+                self.logger.info("Are you sure you want this?")
+
+            rules.append((rule, set(whitelist), set(blacklist)))
+
+        return rules
+
     def get_family_names(self, family_id):
         ids = [family_id]
         ids += inventory.pokemons().data_for(family_id).next_evolutions_all[:]
         return [inventory.pokemons().name_for(x) for x in ids]
 
     def get_closest_name(self, name):
-        mapping = {ord(x): ord(y) for x, y in zip("\u2641\u2642.-", "fm  ")}
-        clean_names = {n.lower().translate(mapping): n for n in self.pokemon_names}
-        closest_names = difflib.get_close_matches(name.lower().translate(mapping), clean_names.keys(), 1)
-
-        if closest_names:
-            closest_name = clean_names[closest_names[0]]
+        closest_name = inventory.Pokemons.resolve_name(name)
 
+        if closest_name:
             if name != closest_name:
                 self.logger.warning("Unknown Pokemon name [%s]. Assuming it is [%s]", name, closest_name)
 
@@ -428,123 +345,22 @@ class PokemonOptimizer(BaseTask):
     def get_family_id(self, pokemon):
         return pokemon.first_evolution_id
 
-    def score_and_sort(self, pokemon_list, rule):
-        pokemon_list = list(pokemon_list)
-
-        if self.debug:
-            self.log("Pokemon %s" % pokemon_list)
-            self.log("Rule %s" % rule)
-
-        for pokemon in pokemon_list:
-            setattr(pokemon, "__score__", self.get_score(pokemon, rule))
-
-        keep = [p for p in pokemon_list if p.__score__[1] is True]
-        keep.sort(key=lambda p: p.__score__[0], reverse=True)
-
-        return keep
-
-    def get_score(self, pokemon, rule):
-        score = []
-
-        for a in rule.get("sort", []):
-            if a[0] == "-":
-                value = -getattr(pokemon, a[1:], 0)
-            else:
-                value = getattr(pokemon, a, 0)
-
-            score.append(value)
-
-        rule_keep = rule.get("keep", True)
-        rule_evolve = rule.get("evolve", True)
-        rule_upgrade = rule.get("upgrade", False)
-        rule_buddy = rule.get("buddy", False)
-        rule_favor = rule.get("favorite", False)
-
-        keep = rule_keep not in [False, {}]
-        keep &= self.satisfy_requirements(pokemon, rule_keep)
-
-        may_try_evolve = (hasattr(pokemon, "has_next_evolution") and pokemon.has_next_evolution())
-        may_try_evolve &= rule_evolve not in [False, {}]
-        may_try_evolve &= self.satisfy_requirements(pokemon, rule_evolve)
-
-        may_try_upgrade = rule_upgrade not in [False, {}]
-        may_try_upgrade &= self.satisfy_requirements(pokemon, rule_upgrade)
-
-        may_buddy = rule_buddy not in [False, {}]
-        may_buddy &= pokemon.in_fort is False
-        may_buddy &= self.satisfy_requirements(pokemon, may_buddy)
-
-        may_favor = rule_favor not in [False, {}]
-        may_favor &= self.satisfy_requirements(pokemon, may_favor)
-
-        if self.debug:
-            self.log("P:%s S:%s K:%s E:%s U:%s B:%s F:%s" % (pokemon, tuple(score), keep, may_try_evolve, may_try_upgrade, may_buddy, may_favor))
-
-        return tuple(score), keep, may_try_evolve, may_try_upgrade, may_buddy, may_favor
-
-    def satisfy_requirements(self, pokemon, req):
-        if type(req) is bool:
-            return req
-
-        satisfy = True
-
-        for a, v in req.items():
-            value = getattr(pokemon, a, 0)
-
-            if (type(v) is str) or (type(v) is unicode):
-                v = float(v)
-
-            if type(v) is list:
-                if type(v[0]) is list:
-                    satisfy_range = False
-
-                    for r in v:
-                        satisfy_range |= (value >= r[0]) and (value <= r[1])
-
-                    satisfy &= satisfy_range
-                else:
-                    satisfy &= (value >= v[0]) and (value <= v[1])
-            elif v < 0:
-                satisfy &= (value <= abs(v))
-            else:
-                satisfy &= (value >= v)
-
-        return satisfy
-
-    def get_best_pokemon_for_rule(self, pokemon_list, rule):
-        pokemon_list = list(pokemon_list)
-
-        if len(pokemon_list) == 0:
-            return ([], [], [], [])
-
-        top = max(rule.get("top", 0), 0)
-        index = int(math.ceil(top)) - 1
-
-        if 0 < top < 1:
-            worst = object()
-
-            for a in rule.get("sort", []):
-                best_attribute = getattr(pokemon_list[0], a)
-                setattr(worst, a, best_attribute * (1 - top))
-
-            setattr(worst, "__score__", self.get_score(worst, rule))
-        elif 0 <= index < len(pokemon_list):
-            worst = pokemon_list[index]
-        else:
-            worst = pokemon_list[-1]
-
-        return self.get_better_pokemon(pokemon_list, worst)
-
-    def get_multi_best_pokemon_for_rule(self, family_list, rule, nb_branch):
-        family_list = list(family_list)
-
-        if len(family_list) == 0:
-            return ([], [], [], [])
-
-        # Handle each group of senior independently
-        senior_pokemon_list = [p for p in family_list if not p.has_next_evolution()]
-        other_family_list = [p for p in family_list if p.has_next_evolution()]
-        senior_pids = set(p.pokemon_id for p in senior_pokemon_list)
+    def apply_rules(self, pokemon_list):
+        """
+        Applies every rule to the pokemons.
+        :return: The pokemons to keep, try to evolve, try to upgrade, make
+        buddy and make favorite, in rule order.
+        :rtype: tuple
+        """
+        scorer = None
+        if not self.debug:
+            try:
+                scorer = ScoreTable(pokemon_list, [rule for rule, _, _ in self.rules], self.config_evolve)
+            except TypeError:
+                # A rule reads something else than numbers
+                pass
+        if scorer is None:
+            scorer = PokemonScorer(pokemon_list, self.config_evolve, self.log if self.debug else None)
 
         keep_all = []
         try_evolve_all = []
@@ -552,34 +368,36 @@ class PokemonOptimizer(BaseTask):
         buddy_all = []
         favor_all = []
 
-        if not self.config_evolve:
-            # Player handle evolution manually = Fall-back to per Pokemon behavior
-            for _, pokemon_list in self.group_by_pokemon_id(family_list):
-                keep, try_evolve, try_upgrade, buddy, favor = self.get_best_pokemon_for_rule(pokemon_list, rule)
-                keep_all += keep
-                try_evolve_all += try_evolve
-                try_upgrade_all += try_upgrade
-                buddy_all += buddy
-                favor_all += favor
-        else:
-            for _, pokemon_list in self.group_by_pokemon_id(senior_pokemon_list):
-                keep, try_evolve, try_upgrade, buddy, favor = self.get_best_pokemon_for_rule(pokemon_list, rule)
-                keep_all += keep
-                try_evolve_all += try_evolve
-                try_upgrade_all += try_upgrade
-                buddy_all += buddy
-                favor_all += favor
+        for rule, whitelist, blacklist in self.rules:
+            mode = rule.mode
+
+            if mode == "by_pokemon":
+                def accept_pokemon_id(pokemon_id):
+                    name = inventory.pokemons().name_for(pokemon_id)
+                    return name not in blacklist and not (whitelist and (name not in whitelist))
+
+                rankings = scorer.groups(rule, "pokemon_id", accept_group=accept_pokemon_id)
+            elif mode == "by_family":
+                def accept_family_id(family_id):
+                    matching_names = self.get_family_names(family_id)
+                    if any(n in blacklist for n in matching_names):
+                        return False
+                    return not (whitelist and not any(n in whitelist for n in matching_names))
+
+                rankings = scorer.groups(rule, "first_evolution_id", accept_group=accept_family_id)
+            elif mode == "overall":
+                def accept_pokemon(pokemon):
+                    return pokemon.name not in blacklist and not (whitelist and (pokemon.name not in whitelist))
+
+                rankings = scorer.groups(rule, accept_pokemon=accept_pokemon)
 
-            if len(other_family_list) > 0:
-                if len(senior_pids) < nb_branch:
-                    # We did not get every combination yet = All other Pokemon are potentially good to keep
-                    worst = other_family_list[-1]
+            for group_id, ranking in rankings:
+                if mode == "by_family" and group_id == 133:  # "Eevee"
+                    best = scorer.multi_best(ranking, rule, 3)
                 else:
-                    best = keep_all + try_evolve_all + try_upgrade_all
-                    best.sort(key=lambda p: p.__score__[0], reverse=True)
-                    worst = best[-1]
+                    best = scorer.best(ranking, rule)
 
-                keep, try_evolve, try_upgrade, buddy, favor = self.get_better_pokemon(other_family_list, worst, 12)
+                keep, try_evolve, try_upgrade, buddy, favor = [scorer.pokemons(part) for part in best]
                 keep_all += keep
                 try_evolve_all += try_evolve
                 try_upgrade_all += try_upgrade
@@ -588,123 +406,39 @@ class PokemonOptimizer(BaseTask):
 
         return keep_all, try_evolve_all, try_upgrade_all, buddy_all, favor_all
 
-    def get_better_pokemon(self, pokemon_list, worst, limit=1000):
-        keep = [p for p in pokemon_list if p.__score__[0] >= worst.__score__[0]][:limit]
-        try_evolve = [p for p in keep if p.__score__[2] is True]
-        try_upgrade = [p for p in keep if (p.__score__[2] is False) and (p.__score__[3] is True)]
-        buddy = [p for p in keep if p.__score__[4] is True]
-        favor = [p for p in keep if p.__score__[5] is True]
-
-        return keep, try_evolve, try_upgrade, buddy, favor
-
-    def get_evolution_plan(self, family_id, family_list, keep, try_evolve, try_upgrade):
-        candies = inventory.candies().get(family_id).quantity
-        family_name = inventory.Pokemons().name_for(family_id)
-
-        # All the rest is crap, for now
-        crap = list(family_list)
-        crap = [p for p in crap if p not in keep]
-        crap = [p for p in crap if not p.in_fort and not p.is_favorite and not (p.unique_id == self.buddyid)]
-        crap.sort(key=lambda p: (p.iv, p.cp), reverse=True)
-
-        # We will gain a candy whether we choose to transfer or evolve these Pokemon
-        candies += len(crap)
-
-        evolve = []
-
-        for pokemon in try_evolve:
-            pokemon_id = pokemon.pokemon_id
-            needed_evolution_item = inventory.pokemons().evolution_item_for(pokemon_id)
-            if needed_evolution_item is not None:
-                if self.config_use_evolution_items:
-                    # We need a special Item to evolve this Pokemon!
-                    item = inventory.items().get(needed_evolution_item)
-                    needed = inventory.pokemons().evolution_items_needed_for(pokemon_id)
-                    if item.count < needed:
-                        self.logger.info("To evolve a {} we need {} of {}. We have {}".format(pokemon.name, needed, item.name, item.count))
-                        continue
-                else:
-                    # pass for this Pokemon
-                    continue
-
-            if self.config_evolve_to_final:
-                pokemon_id = pokemon.pokemon_id
-                while inventory.pokemons().has_next_evolution(pokemon_id):
-                    candies -= inventory.pokemons().evolution_cost_for(pokemon_id)
-                    pokemon_id = inventory.pokemons().next_evolution_ids_for(pokemon_id)[0]
-            else:
-                candies -= pokemon.evolution_cost
-
-            if candies < 0:
-                continue
-
-            if self.config_evolve_to_final:
-                pokemon_id = pokemon.pokemon_id
-
-                while inventory.pokemons().has_next_evolution(pokemon_id):
-                    candies += 1
-                    evolve.append(pokemon)
-                    pokemon_id = inventory.pokemons().next_evolution_ids_for(pokemon_id)[0]
-            else:
-                candies += 1
-                evolve.append(pokemon)
-
-        upgrade = []
+    def get_evolution_plan(self, keep, try_evolve, try_upgrade):
+        """
+        Plans every family, see EvolutionPlanner.
+        :return: The pokemons to transfer, evolve, upgrade and keep for xp.
+        :rtype: tuple
+        """
+        pokemons = inventory.pokemons().all()
+        candies = dict((family_id, inventory.candies().get(family_id).quantity)
+                       for family_id in set(self.get_family_id(p) for p in pokemons))
+        items = dict((item_id, inventory.items().get(item_id).count) for item_id in self.evolution_costs.evolution_items())
         upgrade_level = min(self.config_upgrade_level, inventory.player().level + 1.5, 40)
-        # Highest CP on top.
-        if len(try_upgrade) > 0:
-            try_upgrade.sort(key=lambda p: (p.cp), reverse=True)
-        for pokemon in try_upgrade:
-            # self.log("Considering %s for upgrade" % pokemon.name)
-            if pokemon.level >= upgrade_level:
-                # self.log("Pokemon already at target level. %s" % pokemon.level)
-                continue
 
-            full_upgrade_candy_cost = 0
-            full_upgrade_stardust_cost = 0
+        plans, self.ongoing_stardust_count = self.planner.plan_all(pokemons, keep, try_evolve, try_upgrade, candies,
+                                                                   self.ongoing_stardust_count, upgrade_level,
+                                                                   items, self.buddyid)
 
-            for i in range(int(pokemon.level * 2), int(upgrade_level * 2)):
-                upgrade_cost = self.pokemon_upgrade_cost[i - 2]
-                full_upgrade_candy_cost += upgrade_cost[0]
-                full_upgrade_stardust_cost += upgrade_cost[1]
+        transfer_all = []
+        evolve_all = []
+        upgrade_all = []
+        xp_all = []
 
-            candies -= full_upgrade_candy_cost
-            self.ongoing_stardust_count -= full_upgrade_stardust_cost
+        for family_id in sorted(plans):
+            plan = plans[family_id]
 
-            if (candies < 0) or (self.ongoing_stardust_count < 0):
-                # self.log("Not enough candy: %s" % candies)
-                # self.log("or stardust %s" % self.ongoing_stardust_count)
-                # We didn' t use the stardust, so refund it...
-                self.ongoing_stardust_count += full_upgrade_stardust_cost
-                continue
-            # self.log("Pokemon can be upgraded!!")
-            upgrade.append(pokemon)
-
-        if (not self.config_evolve_for_xp) or (family_name in self.config_evolve_for_xp_blacklist):
-            xp = []
-            transfer = crap
-        elif self.config_evolve_for_xp_whitelist and (family_name not in self.config_evolve_for_xp_whitelist):
-            xp = []
-            transfer = crap
-        else:
-            # Compute how many crap we should keep if we want to batch evolve them for xp
-            lowest_evolution_cost = inventory.pokemons().evolution_cost_for(family_id)
-
-            # transfer + keep_for_xp = len(crap)
-            # leftover_candies = candies - len(crap) + transfer * 1
-            # keep_for_xp = (leftover_candies - 1) / (lowest_evolution_cost - 1)
-            # keep_for_xp = (candies - len(crap) + transfer - 1) / (lowest_evolution_cost - 1)
-            # keep_for_xp = (candies - keep_for_xp - 1) / (lowest_evolution_cost - 1)
-
-            if (candies > 0) and lowest_evolution_cost:
-                keep_for_xp = int((candies - 1) / lowest_evolution_cost)
-            else:
-                keep_for_xp = 0
+            for pokemon, item_id, needed, owned in plan.missing_items:
+                self.logger.info("To evolve a {} we need {} of {}. We have {}".format(pokemon.name, needed, inventory.items().get(item_id).name, owned))
 
-            xp = [p for p in crap if p.has_next_evolution() and p.evolution_cost == lowest_evolution_cost][:keep_for_xp]
-            transfer = [p for p in crap if p not in xp]
+            transfer_all += plan.transfer
+            evolve_all += plan.evolve
+            upgrade_all += plan.upgrade
+            xp_all += plan.xp
 
-        return (transfer, evolve, upgrade, xp)
+        return transfer_all, evolve_all, upgrade_all, xp_all
 
     def unique_pokemon_list(self, pokemon_list):
         seen = set()
@@ -819,14 +553,7 @@ class PokemonOptimizer(BaseTask):
                     if self.config_transfer:
                         inventory.pokemons().remove(pokemon.unique_id)
 
-                        with self.bot.database as db:
-                            cursor = db.cursor()
-                            cursor.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='transfer_log'")
-
-                            db_result = cursor.fetchone()
-
-                            if db_result[0] == 1:
-                                db.execute("INSERT INTO transfer_log (pokemon, iv, cp) VALUES (?, ?, ?)", (pokemon.name, pokemon.iv, pokemon.cp))
+                        self.bot.log_store.log('transfer_log', pokemon=pokemon.name, iv=pokemon.iv, cp=pokemon.cp)
 
         else:
             for pokemon in pokemons:
@@ -856,14 +583,7 @@ class PokemonOptimizer(BaseTask):
                 if self.config_transfer and (not self.bot.config.test):
                     inventory.pokemons().remove(pokemon.unique_id)
 
-                    with self.bot.database as db:
-                        cursor = db.cursor()
-                        cursor.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='transfer_log'")
-
-                        db_result = cursor.fetchone()
-
-                        if db_result[0] == 1:
-                            db.execute("INSERT INTO transfer_log (pokemon, iv, cp) VALUES (?, ?, ?)", (pokemon.name, pokemon.iv, pokemon.cp))
+                    self.bot.log_store.log('transfer_log', pokemon=pokemon.name, iv=pokemon.iv, cp=pokemon.cp)
                     if not skip_delay:
                         action_delay(self.config_action_wait_min, self.config_action_wait_max)
 
@@ -963,14 +683,7 @@ class PokemonOptimizer(BaseTask):
             inventory.pokemons().remove(pokemon.unique_id)
             inventory.pokemons().add(new_pokemon)
 
-            with self.bot.database as db:
-                cursor = db.cursor()
-                cursor.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='evolve_log'")
-
-                db_result = cursor.fetchone()
-
-                if db_result[0] == 1:
-                    db.execute("INSERT INTO evolve_log (pokemon, iv, cp) VALUES (?, ?, ?)", (pokemon.name, pokemon.iv, pokemon.cp))
+            self.bot.log_store.log('evolve_log', pokemon=pokemon.name, iv=pokemon.iv, cp=pokemon.cp)
 
             sleep(self.config_evolve_time, 0.1)
         if transfer and not self.used_lucky_egg:
@@ -1020,11 +733,7 @@ class PokemonOptimizer(BaseTask):
                                   "stardust": self.bot.stardust})
 
             if self.config_upgrade and (not self.bot.config.test):
-                inventory.pokemons().remove(pokemon.unique_id)
-
-                new_pokemon = inventory.Pokemon(upgrade)
-                inventory.pokemons().add(new_pokemon)
-                pokemon = new_pokemon
+                pokemon.update(upgrade)
 
                 action_delay(self.config_action_wait_min, self.config_action_wait_max)
 
@@ -1,16 +1,19 @@
 from __future__ import unicode_literals
 
+import atexit
 import time
 from datetime import datetime, timedelta
 import json
 import requests
 import calendar
-import difflib
 import hashlib
+import threading
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
 from random import uniform
 from operator import itemgetter, methodcaller
 from itertools import izip
-from pokemongo_bot import inventory
+from pokemongo_bot import http_client, inventory
 from pokemongo_bot.item_list import Item
 from pokemongo_bot.base_task import BaseTask
 from pokemongo_bot.inventory import Pokemons
@@ -34,7 +37,7 @@ class SniperSource(object):
 
     def fetch_raw(self):
         some_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/52.0.2743.116 Safari/537.36'
-        response = requests.get(self.url, headers={'User-Agent': some_agent}, timeout=self.timeout)
+        response = http_client.get(self.url, headers={'User-Agent': some_agent}, timeout=self.timeout, conditional=True)
 
         results = response.json()
 
@@ -174,14 +177,42 @@ class SniperSource(object):
         if not name:
             return
 
-        pokemon_names = [p.name for p in inventory.pokemons().STATIC_DATA]
-        closest_names = difflib.get_close_matches(name, pokemon_names, 1)
+        return Pokemons.resolve_name(name) or name
 
-        if closest_names:
-            closest_name = closest_names[0]
-            return closest_name
+# Targets already handled, each forgotten once it expired
+class SniperCache(object):
+    # How long a target without expiration is remembered, in seconds
+    DEFAULT_TTL = 30 * 60
 
-        return name
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._expires_at = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, uniqueid):
+        with self._lock:
+            self._evict()
+            return uniqueid in self._expires_at
+
+    def __len__(self):
+        with self._lock:
+            self._evict()
+            return len(self._expires_at)
+
+    def add(self, uniqueid, expires_at=None):
+        with self._lock:
+            self._evict()
+            self._expires_at.pop(uniqueid, None)
+            self._expires_at[uniqueid] = expires_at or time.time() + self.DEFAULT_TTL
+
+            # Free space if full, oldest first
+            while len(self._expires_at) > self.max_size:
+                self._expires_at.popitem(last=False)
+
+    def _evict(self):
+        now = time.time()
+        for uniqueid in [u for u, expires_at in self._expires_at.items() if expires_at <= now]:
+            del self._expires_at[uniqueid]
 
 # Represents the JSON params mappings
 class SniperSourceMapping(object):
@@ -238,6 +269,10 @@ class Sniper(BaseTask):
     MIN_SECONDS_ALLOWED_FOR_REQUESTING_DATA = 10
     MIN_BALLS_FOR_CATCHING = 10
     MAX_CACHE_LIST_SIZE = 300
+    # Seconds a source may take on top of its own timeout
+    SOURCE_FETCH_MARGIN = 2
+    # Sources fetched at the same time, at most
+    MAX_FETCH_THREADS = 4
 
     def __init__(self, bot, config):
         super(Sniper, self).__init__(bot, config)
@@ -261,9 +296,10 @@ class Sniper(BaseTask):
         self.sources = [SniperSource(data) for data in self.config.get('sources', [])]
         self.no_snipe_until = None
         self.teleport_back_to_last_location = self.config.get('teleport_back_to_last_location', False) 
+        self._pool = None
 
-        if not hasattr(self.bot,"sniper_cache"):
-            self.bot.sniper_cache = []
+        if not isinstance(getattr(self.bot, "sniper_cache", None), SniperCache):
+            self.bot.sniper_cache = SniperCache(self.MAX_CACHE_LIST_SIZE)
 
         # Dont bother validating config if task is not even enabled
         if self.enabled:
@@ -464,7 +500,7 @@ class Sniper(BaseTask):
                     TelegramSnipe.ENABLED = False
 
                     # Save target and unlock heartbeat calls
-                    self._cache(uniqueid)
+                    self._cache(uniqueid, pokemon.get('expiration_timestamp_ms'))
                     self.bot.hb_locked = False
 
             return success
@@ -605,47 +641,64 @@ class Sniper(BaseTask):
             self.last_data_request_time = time.time()
 
             self._trace("Fetching pokemons from the sources...")
+            sources = []
             for source in self.sources:
+                if source.enabled:
+                    sources.append(source)
+                else:
+                    self._trace("Source '{}' is disabled".format(source.url))
+
+            # All sources at once, so the slowest one sets the pace instead of their sum
+            if sources and self._pool is None:
+                self._pool = ThreadPool(min(len(sources), self.MAX_FETCH_THREADS))
+                atexit.register(self.close)
+            fetches = [(source, self._pool.apply_async(source.fetch)) for source in sources]
+
+            for source, fetch in fetches:
                 try:
-                    if source.enabled:
-                        source_pokemons = source.fetch()
-                        self._trace("Source '{}' returned {} results".format(source.url, len(source_pokemons)))
+                    source_pokemons = fetch.get(source.timeout + self.SOURCE_FETCH_MARGIN)
+                    self._trace("Source '{}' returned {} results".format(source.url, len(source_pokemons)))
 
-                        # Merge lists, making sure to exclude repeated data. Use location as the hash key
-                        for source_pokemon in source_pokemons:
-                            hash_key = self._hash(source_pokemon)
+                    # Merge lists, making sure to exclude repeated data
+                    for source_pokemon in source_pokemons:
+                        hash_key = self._hash(source_pokemon)
 
-                            # Add if new
-                            if not results_hash_map.has_key(hash_key):
-                                results_hash_map[hash_key] = source_pokemon
-                    else:
-                        self._trace("Source '{}' is disabled".format(source.url))
+                        # Add if new
+                        if hash_key not in results_hash_map:
+                            results_hash_map[hash_key] = source_pokemon
                 except Exception as exception:
-                    self._error("Could not fetch data from '{}'. Details: {}. Skipping...".format(source.url, exception))
+                    self._error("Could not fetch data from '{}'. Details: {}. Skipping...".format(source.url, str(exception) or type(exception).__name__))
             self._trace("After merging, we've got {} results".format(len(results_hash_map.values())))
         else:
             self._trace("Not ready yet to retrieve data...")
 
         return self._parse_pokemons(results_hash_map.values())
 
+    def close(self):
+        """
+        Stops the threads fetching the sources, if any. They are started
+        again by the next fetch.
+        """
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.terminate()
+
     def _hash(self, pokemon):
-        # Use approximate location instead, because some IDs might be wrong. The first 4 decimal places is enough for this
-        return "{0:.4f};{1:.4f}".format(pokemon.get('latitude'), pokemon.get('longitude'))
+        # Use approximate location, the first 4 decimal places is enough for this. Sources
+        # differ a bit on the expiration, so compare it to the minute
+        return "{0};{1:.4f};{2:.4f};{3}".format(pokemon.get('pokemon_id'), pokemon.get('latitude'), pokemon.get('longitude'),
+                                                 int(pokemon.get('expiration_timestamp_ms', 0) // 60000))
 
     def _equals(self, pokemon_1, pokemon_2):
         return self._hash(pokemon_1) == self._hash(pokemon_2)
 
     def _is_cached(self, uniqueid):
-        if uniqueid in self.bot.sniper_cache:
-            return True
-        return False
-
-    def _cache(self, uniqueid):
-        if not self._is_cached(uniqueid):
-            # Free space if full and store it
-            if len(self.bot.sniper_cache) >= self.MAX_CACHE_LIST_SIZE:
-                self.bot.sniper_cache.pop(0)
-            self.bot.sniper_cache.append(uniqueid)
+        return uniqueid in self.bot.sniper_cache
+
+    def _cache(self, uniqueid, expiration_timestamp_ms=None):
+        # Remembered until the target expires
+        expires_at = expiration_timestamp_ms / 1000.0 if expiration_timestamp_ms else None
+        self.bot.sniper_cache.add(uniqueid, expires_at)
 
     def _build_unique_id(self, pokemon):
         # Build unique id for this pokemon from id, latitude, longitude and expiration
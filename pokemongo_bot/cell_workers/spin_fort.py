@@ -65,10 +65,7 @@ class SpinFort(BaseTask):
         current_level = inventory.player().level
         is_pokestop = False
 
-        with self.bot.database as conn:
-            c = conn.cursor()
-            c.execute("SELECT DISTINCT COUNT(pokestop) FROM pokestop_log WHERE dated >= datetime('now','-1 day')")
-        if c.fetchone()[0] >= self.config.get('daily_spin_limit', 2000):
+        if self.bot.log_store.daily_count('pokestop_log') >= self.config.get('daily_spin_limit', 2000):
            if self.exit_on_limit_reached:
                self.emit_event('spin_limit', formatted='WARNING! You have reached your daily spin limit')
                sys.exit(2)
@@ -210,20 +207,12 @@ class SpinFort(BaseTask):
                         formatted='Found nothing in pokestop {pokestop}.',
                         data={'pokestop': fort_name}
                     )
-                with self.bot.database as conn:
-                    c = conn.cursor()
-                    c.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='pokestop_log'")
-                result = c.fetchone()
-                while True:
-                    if result[0] == 1:
-                        conn.execute('''INSERT INTO pokestop_log (pokestop, exp, items) VALUES (?, ?, ?)''', (fort_name, str(experience_awarded), str(items_awarded)))
-                        break
-                    else:
-                        self.emit_event('pokestop_log',
-                                        sender=self,
-                                        level='info',
-                                        formatted="pokestop_log table not found, skipping log")
-                        break
+                if not self.bot.log_store.log('pokestop_log', pokestop=fort_name, exp=str(experience_awarded),
+                                              items=str(items_awarded)):
+                    self.emit_event('pokestop_log',
+                                    sender=self,
+                                    level='info',
+                                    formatted="pokestop_log table not found, skipping log")
                 pokestop_cooldown = spin_details.get(
                     'cooldown_complete_timestamp_ms')
                 self.bot.fort_timeouts.update({fort["id"]: pokestop_cooldown})
@@ -273,16 +262,7 @@ class SpinFort(BaseTask):
                         'softban',
                         formatted='Probably got softban.'
                     )
-                    with self.bot.database as conn:
-                        c = conn.cursor()
-                        c.execute("SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='softban_log'")
-                    result = c.fetchone()
-
-                    if result[0] == 1:
-                        source = str("SpinFort")
-                        status = str("Possible Softban")
-                        conn.execute('''INSERT INTO softban_log (status, source) VALUES (?, ?)''', (status, source))
-                    else:
+                    if not self.bot.log_store.log('softban_log', status='Possible Softban', source='SpinFort'):
                         self.emit_event('softban_log',
                                         sender=self,
                                         level='info',
@@ -299,7 +279,16 @@ class SpinFort(BaseTask):
         return WorkerResult.SUCCESS
 
     def get_forts_in_range(self):
-        forts = self.bot.get_forts(order_by_distance=True)
+        if self.bot.config.replicate_gps_xy_noise:
+            position = self.bot.noised_position
+        else:
+            position = self.bot.position
+
+        forts = self.bot.map_cell_store.fort_index().within(
+            position[0],
+            position[1],
+            Constants.MAX_DISTANCE_FORT_IS_REACHABLE
+        )
         forts = filter(lambda fort: fort["id"] not in self.bot.fort_timeouts, forts)
         if hasattr(self.bot, "camping_forts") and self.bot.camping_forts and self.try_to_keep_streak:
             if datetime.now() >= self.next_update:
@@ -310,21 +299,6 @@ class SpinFort(BaseTask):
             # Remove all forts which were spun in the last ticks to keep 10 stops streak
             forts = filter(lambda x: x["id"] not in self.streak_forts, forts)
 
-        if self.bot.config.replicate_gps_xy_noise:
-            forts = filter(lambda fort: distance(
-                self.bot.noised_position[0],
-                self.bot.noised_position[1],
-                fort['latitude'],
-                fort['longitude']
-            ) <= Constants.MAX_DISTANCE_FORT_IS_REACHABLE, forts)
-        else:
-            forts = filter(lambda fort: distance(
-                self.bot.position[0],
-                self.bot.position[1],
-                fort['latitude'],
-                fort['longitude']
-            ) <= Constants.MAX_DISTANCE_FORT_IS_REACHABLE, forts)
-
         return forts
 
     def get_items_awarded_from_fort_spinned(self, response_dict):
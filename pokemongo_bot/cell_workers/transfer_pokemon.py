@@ -5,6 +5,7 @@ from pokemongo_bot.base_task import BaseTask
 from pokemongo_bot.inventory import Attack
 from pokemongo_bot.inventory import Pokemon
 from pokemongo_bot.inventory import Pokemons
+from pokemongo_bot.pokemon_rules import NamedRules, ReleaseRule
 from operator import attrgetter
 from random import randrange
 
@@ -22,6 +23,11 @@ class TransferPokemon(BaseTask):
         self.buddy = self.bot.player_data.get('buddy_pokemon', {})
         self.buddyid = self._get_buddyid()
 
+        release = self.bot.config.release
+        default_logic = (release.get('any') or {}).get('logic', 'and')
+        self.release_rules = NamedRules(release, lambda rule: ReleaseRule(rule, default_logic), empty_is_missing=True)
+        self.default_release_rule = ReleaseRule({}, default_logic)
+
     def work(self):
         if not self._should_work():
             return
@@ -56,27 +62,21 @@ class TransferPokemon(BaseTask):
         return pokemon_groups
 
     def _release_pokemon_worst_in_group(self, group, pokemon_name):
-        keep_best, keep_best_cp, keep_best_iv, keep_best_ivcp = self._validate_keep_best_config(
-            pokemon_name)
-        # TODO continue list possible criteria
-        keep_best_possible_criteria = ['cp', 'iv', 'iv_attack', 'iv_defense', 'iv_stamina', 'ivcp',
-                                       'moveset.attack_perfection', 'moveset.defense_perfection', 'hp', 'hp_max']
-        keep_best_custom, keep_best_criteria, keep_amount = self._validate_keep_best_config_custom(
-            pokemon_name, keep_best_possible_criteria)
+        release_rule = self._get_release_rule_for(pokemon_name)
 
         best_pokemon_ids = set()
         order_criteria = 'none'
-        if keep_best:
-            if keep_best_ivcp > 0:
-                ivcp_limit = keep_best_ivcp
+        if release_rule.keep_best:
+            if release_rule.keep_best_ivcp > 0:
+                ivcp_limit = release_rule.keep_best_ivcp
                 best_ivcp_pokemons = sorted(group, key=lambda x: (
                     x.ivcp), reverse=True)[:ivcp_limit]
                 best_pokemon_ids = set(
                     pokemon.unique_id for pokemon in best_ivcp_pokemons)
                 order_criteria = 'ivcp'
 
-            if keep_best_cp > 0:
-                cp_limit = keep_best_cp
+            if release_rule.keep_best_cp > 0:
+                cp_limit = release_rule.keep_best_cp
                 best_cp_pokemons = sorted(group, key=lambda x: (
                     x.cp, x.iv), reverse=True)[:cp_limit]
                 best_pokemon_ids = set(
@@ -86,8 +86,8 @@ class TransferPokemon(BaseTask):
                 else:
                     order_criteria = 'cp'
 
-            if keep_best_iv > 0:
-                iv_limit = keep_best_iv
+            if release_rule.keep_best_iv > 0:
+                iv_limit = release_rule.keep_best_iv
                 best_iv_pokemons = sorted(group, key=lambda x: (
                     x.iv, x.cp), reverse=True)[:iv_limit]
                 best_pokemon_ids |= set(
@@ -97,18 +97,16 @@ class TransferPokemon(BaseTask):
                 else:
                     order_criteria = 'iv'
                     
-        elif keep_best_custom:
-            limit = keep_amount
-            # not sure if the u of unicode will stay, so make it go away
-            keep_best_criteria = [str(keep_best_criteria[x])
-                                  for x in range(len(keep_best_criteria))]
+        elif release_rule.keep_best_custom:
+            limit = release_rule.keep_amount
+            keep_best_criteria = release_rule.keep_best_criteria
             best_pokemons = sorted(group, key=attrgetter(
                 *keep_best_criteria), reverse=True)[:limit]
             best_pokemon_ids = set(
                 pokemon.unique_id for pokemon in best_pokemons)
             order_criteria = ' then '.join(keep_best_criteria)
 
-        if keep_best or keep_best_custom:
+        if release_rule.keep_best or release_rule.keep_best_custom:
             # remove best pokemons from all pokemons array
             all_pokemons = group
             best_pokemons = []
@@ -153,51 +151,19 @@ class TransferPokemon(BaseTask):
                     self.release_pokemon(pokemon)
 
     def should_release_pokemon(self, pokemon, keep_best_mode=False):
-        release_config = self._get_release_config_for(pokemon.name)
-
-        if (keep_best_mode
-                and 'never_release' not in release_config
-                and 'always_release' not in release_config
-                and 'release_below_cp' not in release_config
-                and 'release_below_iv' not in release_config
-                and 'release_below_ivcp' not in release_config):
+        release_rule = self._get_release_rule_for(pokemon.name)
+
+        if keep_best_mode and not release_rule.has_release_rules:
             return True
 
-        cp_iv_logic = release_config.get('logic')
-        if not cp_iv_logic:
-            cp_iv_logic = self._get_release_config_for(
-                'any').get('logic', 'and')
+        release = release_rule.release(pokemon)
 
-        if release_config.get('never_release', False):
-            return False
+        if release and not release_rule.always_release:
+            cp_iv_logic = release_rule.logic_name
+            release_cp = release_rule.below_cp
+            release_iv = release_rule.below_iv
+            release_ivcp = release_rule.below_ivcp
 
-        if release_config.get('always_release', False):
-            return True
-
-        release_cp = release_config.get('release_below_cp', 0)
-        release_iv = release_config.get('release_below_iv', 0)
-        release_ivcp = release_config.get('release_below_ivcp', 0)
-
-        release_results = {}
-        # Check if any rules supplied
-        if (release_cp == 0 and release_iv == 0 and release_ivcp == 0): # No rules supplied, assume all false
-            release_results = {'cp': False, 'iv': False, 'ivcp': False}
-        else: # One or more rules supplied, evaluate
-            if (cp_iv_logic == 'and'): # "and" logic assumes true if not provided
-                release_results['cp'] = (release_config.get('release_below_cp', -1) != 0) and (not release_cp or pokemon.cp < release_cp)
-                release_results['iv'] = (release_config.get('release_below_iv', -1) != 0) and (not release_iv or pokemon.iv < release_iv)
-                release_results['ivcp'] = (release_config.get('release_below_ivcp', -1) != 0) and (not release_ivcp or pokemon.ivcp < release_ivcp)
-            else: # "or" logic assumes false if not provided
-                release_results['cp'] = release_cp and pokemon.cp < release_cp
-                release_results['iv'] = release_iv and pokemon.iv < release_iv
-                release_results['ivcp'] = release_ivcp and pokemon.ivcp < release_ivcp
-            
-        logic_to_function = {
-            'or': lambda x, y, z: x or y or z,
-            'and': lambda x, y, z: x and y and z
-        }
-
-        if logic_to_function[cp_iv_logic](*release_results.values()):
             self.emit_event(
                 'future_pokemon_release',
                 formatted="*Releasing {}* CP: {}, IV: {}, IVCP: {:.2f} | based on rule: CP < {} {} IV < {} IVCP < {}".format(pokemon.name, pokemon.cp, pokemon.iv, pokemon.ivcp,
@@ -214,7 +180,7 @@ class TransferPokemon(BaseTask):
                 },
             )
 
-        return logic_to_function[cp_iv_logic](*release_results.values())
+        return release
 
     def release_pokemon(self, pokemon):
         """
@@ -254,96 +220,18 @@ class TransferPokemon(BaseTask):
                                               pokemon.iv, pokemon.ivcp,
                                               candy.quantity, candy.type)
         )
-        with self.bot.database as conn:
-            c = conn.cursor()
-            c.execute(
-                "SELECT COUNT(name) FROM sqlite_master WHERE type='table' AND name='transfer_log'")
-
-        result = c.fetchone()
-
-        while True:
-            if result[0] == 1:
-                conn.execute('''INSERT INTO transfer_log (pokemon, iv, cp) VALUES (?, ?, ?)''',
-                             (pokemon.name, pokemon.iv, pokemon.cp))
-                break
-            else:
-                self.emit_event(
-                    'transfer_log',
-                    sender=self,
-                    level='info',
-                    formatted="transfer_log table not found, skipping log"
-                )
-                break
+        if not self.bot.log_store.log('transfer_log', pokemon=pokemon.name, iv=pokemon.iv, cp=pokemon.cp):
+            self.emit_event(
+                'transfer_log',
+                sender=self,
+                level='info',
+                formatted="transfer_log table not found, skipping log"
+            )
         action_delay(self.transfer_wait_min, self.transfer_wait_max)
 
-    def _get_release_config_for(self, pokemon):
-        release_config = self.bot.config.release.get(pokemon)
-        if not release_config:
-            release_config = self.bot.config.release.get('any')
-        if not release_config:
-            release_config = {}
-        return release_config
-
-    def _validate_keep_best_config_custom(self, pokemon_name, keep_best_possible_custom):
-        keep_best = False
-
-        release_config = self._get_release_config_for(pokemon_name)
-        keep_best_custom = release_config.get('keep_best_custom', '')
-        keep_amount = release_config.get('amount', 0)
-
-        if keep_best_custom and keep_amount:
-            keep_best = True
-
-            keep_best_custom = keep_best_custom.replace(' ','').split(',')
-            for _str in keep_best_custom:
-                if _str not in keep_best_possible_custom:
-                    keep_best = False
-                    break
-
-            try:
-                keep_amount = int(keep_amount)
-            except ValueError:
-                keep_best = False
-
-            if keep_amount < 0:
-                keep_best = False
-
-        return keep_best, keep_best_custom, keep_amount
-
-    def _validate_keep_best_config(self, pokemon_name):
-        keep_best = False
-
-        release_config = self._get_release_config_for(pokemon_name)
-
-        keep_best_cp = release_config.get('keep_best_cp', 0)
-        keep_best_iv = release_config.get('keep_best_iv', 0)
-        keep_best_ivcp = release_config.get('keep_best_ivcp', 0)
-
-        if keep_best_cp or keep_best_iv or keep_best_ivcp:
-            keep_best = True
-            try:
-                keep_best_cp = int(keep_best_cp)
-            except ValueError:
-                keep_best_cp = 0
-
-            try:
-                keep_best_iv = int(keep_best_iv)
-            except ValueError:
-                keep_best_iv = 0
-
-            try:
-                keep_best_ivcp = int(keep_best_ivcp)
-            except ValueError:
-                keep_best_ivcp = 0
-                
-            if keep_best_cp < 0 or keep_best_iv < 0 or keep_best_ivcp < 0:
-                keep_best = False
+    def _get_release_rule_for(self, pokemon):
+        return self.release_rules.get(pokemon) or self.default_release_rule
 
-            if keep_best_cp == 0 and keep_best_iv == 0 and keep_best_ivcp == 0:
-                keep_best = False
-                
-        return keep_best, keep_best_cp, keep_best_iv, keep_best_ivcp
-        
     def _get_buddyid(self):
         if self.buddy and'id' in self.buddy:
             return self.buddy['id']
@@ -160,7 +160,8 @@ class UpdateLiveStats(BaseTask):
             return WorkerResult.SUCCESS
 
         player_stats = inventory.player().player_stats
-        line = self._get_stats_line(self._get_stats(player_stats))
+        stats = self._get_stats(player_stats)
+        line = self._get_stats_line(stats)
         # If line is empty, it couldn't be generated.
         if not line:
             return WorkerResult.SUCCESS
@@ -169,7 +170,7 @@ class UpdateLiveStats(BaseTask):
             self._update_title(line, _platform)
 
         if self.terminal_log:
-            self._log_on_terminal(line)
+            self._log_on_terminal(line, stats)
         return WorkerResult.SUCCESS
 
     def _should_display(self):
@@ -190,11 +191,13 @@ class UpdateLiveStats(BaseTask):
         """
         self.next_update = datetime.now() + timedelta(seconds=self.min_interval)
 
-    def _log_on_terminal(self, stats):
+    def _log_on_terminal(self, stats, stats_raw):
         """
         Logs the stats into the terminal using an event.
         :param stats: The stats to display.
         :type stats: string
+        :param stats_raw: The stats the line was made of.
+        :type stats_raw: dict
         :return: Nothing.
         :rtype: None
         """
@@ -203,7 +206,7 @@ class UpdateLiveStats(BaseTask):
             formatted="{stats}",
             data={
                 'stats': stats,
-                'stats_raw': self._get_stats(inventory.player().player_stats)
+                'stats_raw': stats_raw
             }
         )
         self._compute_next_update()
@@ -243,13 +246,12 @@ class UpdateLiveStats(BaseTask):
 
     def _get_stats(self, player_stats):
         """ Some data """
-        metrics = self.bot.metrics
-        metrics.capture_stats()
-        runtime = metrics.runtime()
+        metrics = self.bot.metrics.snapshot()
+        runtime = metrics.runtime
         login = self.bot.config.username
         player_data = self.bot.player_data
         username = player_data.get('username', '?')
-        distance_travelled = metrics.distance_travelled()
+        distance_travelled = metrics.distance_travelled
         current_level = int(player_stats.get('level', 0))
         prev_level_xp = int(self.xp_per_level[current_level - 1][2])
         next_level_xp = int(player_stats.get('next_level_xp', 0))
@@ -257,7 +259,7 @@ class UpdateLiveStats(BaseTask):
         current_level_xp = experience - prev_level_xp
         whole_level_xp = next_level_xp - prev_level_xp
         level_completion_percentage = int((current_level_xp * 100) / whole_level_xp)
-        experience_per_hour = int(metrics.xp_per_hour())
+        experience_per_hour = int(metrics.xp_per_hour)
         # Calculate est time to level
         remaining_xp = next_level_xp - current_level_xp
         # eample; 30_000 xp remaining 3000 xp/h => 10h till level
@@ -273,26 +275,26 @@ class UpdateLiveStats(BaseTask):
                 time_to_level = "%s hours %s minutes" % (hours, minutes)
         else:
             time_to_level = "Unknown"
-        xp_earned = metrics.xp_earned()
-        stops_visited = metrics.visits['latest'] - metrics.visits['start']
-        pokemon_encountered = metrics.num_encounters()
-        pokemon_caught = metrics.num_captures()
-        captures_per_hour = int(metrics.captures_per_hour())
+        xp_earned = metrics.xp_earned
+        stops_visited = metrics.visits
+        pokemon_encountered = metrics.encounters
+        pokemon_caught = metrics.captures
+        captures_per_hour = int(metrics.captures_per_hour)
         pokemon_released = metrics.releases
-        pokemon_evolved = metrics.num_evolutions()
-        pokemon_unseen = metrics.num_new_mons()
-        pokeballs_thrown = metrics.num_throws()
-        dust_per_hour = int(metrics.stardust_per_hour())
-        total_stardust = int(metrics.total_stardust())
-        stardust_earned = metrics.earned_dust()
-        highest_cp_pokemon = metrics.highest_cp['desc']
+        pokemon_evolved = metrics.evolutions
+        pokemon_unseen = metrics.new_mons
+        pokeballs_thrown = metrics.throws
+        dust_per_hour = int(metrics.stardust_per_hour)
+        total_stardust = int(metrics.total_stardust)
+        stardust_earned = metrics.earned_dust
+        highest_cp_pokemon = metrics.highest_cp
         if not highest_cp_pokemon:
             highest_cp_pokemon = "None"
-        most_perfect_pokemon = metrics.most_perfect['desc']
+        most_perfect_pokemon = metrics.most_perfect
         if not most_perfect_pokemon:
             most_perfect_pokemon = "None"
-        next_egg_hatching = metrics.next_hatching_km(0)
-        hatched_eggs = metrics.hatched_eggs(0)
+        next_egg_hatching = metrics.next_hatching_km
+        hatched_eggs = metrics.hatched_eggs
 
         # Create stats strings.
         available_stats = {
@@ -5,9 +5,7 @@ import struct
 from math import asin, atan, cos, exp, log, pi, sin, sqrt, tan
 
 from colorama import init
-from networkx.algorithms.clique import find_cliques
 
-import networkx as nx
 import numpy as np
 
 from datetime import datetime as dt, timedelta
@@ -35,11 +33,12 @@ def fort_details(bot, fort_id, latitude, longitude):
         else:
           """
           Lookup the fort details and cache the response for future use.
+          Details of several forts would not share an envelope, so this waits
+          right away; the queue still sends it with any other queued type.
           """
-          request = bot.api.create_request()
-          request.fort_details(fort_id=fort_id, latitude=latitude, longitude=longitude)
+          pending = bot.api.queue_request('fort_details', fort_id=fort_id, latitude=latitude, longitude=longitude)
           try:
-              response_dict = request.call()
+              response_dict = pending.result()
               FORT_CACHE[fort_id] = response_dict['responses']['FORT_DETAILS']
               first_call = True
           except Exception:
@@ -51,10 +50,9 @@ def fort_details(bot, fort_id, latitude, longitude):
         """
         Lookup the fort details and cache the response for future use.
         """
-        request = bot.api.create_request()
-        request.fort_details(fort_id=fort_id, latitude=latitude, longitude=longitude)
+        pending = bot.api.queue_request('fort_details', fort_id=fort_id, latitude=latitude, longitude=longitude)
         try:
-            response_dict = request.call()
+            response_dict = pending.result()
             FORT_CACHE[fort_id] = response_dict['responses']['FORT_DETAILS']
         except Exception:
             FORT_CACHE[fort_id] = dict()
@@ -94,6 +92,54 @@ def distance(lat1, lon1, lat2, lon2):
     return 12742 * asin(sqrt(a)) * 1000
 
 
+# Batch versions of distance() for hot loops. They evaluate the same formula
+# on float64 arrays and agree with distance() within DISTANCE_TOLERANCE meters
+# (checked in test/distance_test.py, timed by test/distance_benchmark.py).
+DISTANCE_TOLERANCE = 1e-6
+
+
+def coordinates(points):
+    """
+    Returns the latitudes and longitudes of dicts as two numpy arrays.
+    """
+    count = len(points)
+    lats = np.fromiter((p['latitude'] for p in points), dtype=np.float64, count=count)
+    lngs = np.fromiter((p['longitude'] for p in points), dtype=np.float64, count=count)
+    return lats, lngs
+
+
+def distances_from(lat, lng, lats, lngs):
+    """
+    Returns the distances in meters from lat/lng to every lats[i]/lngs[i].
+    """
+    p = 0.017453292519943295
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    a = 0.5 - np.cos((lats - lat) * p) / 2 + cos(lat * p) * \
+        np.cos(lats * p) * (1 - np.cos((lngs - lng) * p)) / 2
+    return 12742 * np.arcsin(np.sqrt(np.clip(a, 0, 1))) * 1000
+
+
+def pairwise_distances(lats1, lngs1, lats2=None, lngs2=None):
+    """
+    Returns the matrix of distances in meters between the points of the
+    first set (rows) and the second one (columns). Without a second set the
+    first one is compared with itself.
+    """
+    lats1 = np.asarray(lats1, dtype=np.float64)[:, np.newaxis]
+    lngs1 = np.asarray(lngs1, dtype=np.float64)[:, np.newaxis]
+    if lats2 is None:
+        lats2, lngs2 = lats1.T, lngs1.T
+    else:
+        lats2 = np.asarray(lats2, dtype=np.float64)[np.newaxis, :]
+        lngs2 = np.asarray(lngs2, dtype=np.float64)[np.newaxis, :]
+
+    p = 0.017453292519943295
+    a = 0.5 - np.cos((lats2 - lats1) * p) / 2 + np.cos(lats1 * p) * \
+        np.cos(lats2 * p) * (1 - np.cos((lngs2 - lngs1) * p)) / 2
+    return 12742 * np.arcsin(np.sqrt(np.clip(a, 0, 1))) * 1000
+
+
 def convert(distance, from_unit, to_unit):  # Converts units
     # Example of converting distance from meters to feet:
     # convert(100.0,"m","ft")
@@ -272,29 +318,3 @@ def deg2rad(deg):
 
 def rad2deg(rad):
     return rad * 180.0 / pi
-
-
-def find_biggest_cluster(radius, points, order=None):
-    graph = nx.Graph()
-    for point in points:
-            if order is '9QM=':
-                #is a lure module - 9QM=
-                now = int(time.time())
-                remaining = now - point['last_modified_timestamp_ms']
-                f = point['latitude'], point['longitude'], remaining
-            else:
-                f = point['latitude'], point['longitude'], 0
-            graph.add_node(f)
-            for node in graph.nodes():
-                if node != f and distance(f[0], f[1], node[0], node[1]) <= radius*2:
-                    graph.add_edge(f, node)
-    cliques = list(find_cliques(graph))
-    if len(cliques) > 0:
-        max_clique = max(list(find_cliques(graph)), key=lambda l: (len(l), sum(x[2] for x in l)))
-        merc_clique = [coord2merc(x[0], x[1]) for x in max_clique]
-        clique_x, clique_y = zip(*merc_clique)
-        best_point = np.mean(clique_x), np.mean(clique_y)
-        best_coord = merc2coord(best_point)
-        return {'latitude': best_coord[0], 'longitude': best_coord[1], 'num_points': len(max_clique)}
-    else:
-        return None
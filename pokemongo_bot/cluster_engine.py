@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import math
+
+import numpy as np
+
+from pokemongo_bot.cell_workers.utils import (coord2merc, merc2coord, coordinates, distances_from,
+                                              pairwise_distances)
+from pokemongo_bot.spatial_index import PROJECTION_MARGIN, SpatialIndex
+
+LURE_MODULE = '9QM='
+
+
+class ClusterEngine(object):
+    """
+    Cluster computations shared by FollowCluster and CampFort.
+
+    biggest_cluster() finds the biggest group of forts which can all be
+    reached from one spot: a set of points pairwise at most 2 * radius apart,
+    reported with the centroid of its members. Points are bucketed on a grid
+    of 2 * radius cells, so each point is only compared with its neighbours
+    and the search stays close to linear in the number of forts. For every
+    point the cluster is grown greedily from its neighbours, closest first,
+    and the biggest one wins.
+
+    camp_clusters() lists the spots from which several forts are in reach,
+    see CampClusters.
+
+    Results are cached per radius and fort set, so asking again on every tick
+    costs one pass over the forts until the set changes. The cached
+    CampClusters are updated in place, so every bot keeps its own engine.
+    """
+
+    CACHE_SIZE = 16
+
+    def __init__(self):
+        self._cache = {}
+
+    def biggest_cluster(self, radius, points, weights=None):
+        """
+        Returns the biggest cluster of points.
+        :param radius: The radius of the spot in meters.
+        :type radius: float
+        :param points: Dicts with a latitude and a longitude.
+        :type points: list
+        :param weights: Optional weight per point; ties between clusters of
+        the same size go to the heaviest one.
+        :type weights: list
+        :return: The cluster, as a dict with latitude, longitude, num_points
+        and the member points, or None without points.
+        :rtype: dict
+        """
+        if weights is None:
+            weights = [0] * len(points)
+
+        # Identical points count once
+        nodes = []
+        seen = set()
+        for point, weight in zip(points, weights):
+            node = (point['latitude'], point['longitude'], weight)
+            if node not in seen:
+                seen.add(node)
+                nodes.append(node)
+
+        return self._memoize(('biggest', radius, tuple(nodes)), self._find_biggest, radius, nodes, points)
+
+    def camp_clusters(self, radius, forts):
+        """
+        Returns the camping spots around forts.
+        :param radius: The distance in meters at which a fort is in reach.
+        :type radius: float
+        :param forts: The forts to camp at, with their id.
+        :type forts: list
+        :rtype: CampClusters
+        """
+        key = ('camp', radius, tuple((f['id'], f['latitude'], f['longitude']) for f in forts))
+        return self._memoize(key, CampClusters, radius, list(forts))
+
+    def _memoize(self, key, compute, *args):
+        if key not in self._cache:
+            if len(self._cache) >= self.CACHE_SIZE:
+                self._cache.clear()
+            self._cache[key] = compute(*args)
+
+        return self._cache[key]
+
+    def _find_biggest(self, radius, nodes, points):
+        if not nodes:
+            return None
+
+        reach = radius * 2
+        index = SpatialIndex(
+            [{'latitude': lat, 'longitude': lng, 'node': i} for i, (lat, lng, _) in enumerate(nodes)],
+            cell_size=reach
+        )
+
+        best = None
+        best_key = None
+        for seed, (lat, lng, _) in enumerate(nodes):
+            # Closest first, the seed itself included
+            neighbours = [p['node'] for p in index.within(lat, lng, reach)]
+            if best_key is not None and len(neighbours) < best_key[0]:
+                continue
+
+            members = self._grow(seed, neighbours, nodes, reach)
+            cluster_key = (len(members), sum(nodes[i][2] for i in members))
+            if best_key is None or cluster_key > best_key:
+                best, best_key = members, cluster_key
+
+        merc = [coord2merc(nodes[i][0], nodes[i][1]) for i in best]
+        xs, ys = zip(*merc)
+        lat, lng = merc2coord((np.mean(xs), np.mean(ys)))
+        positions = set((nodes[i][0], nodes[i][1]) for i in best)
+
+        return {
+            'latitude': lat,
+            'longitude': lng,
+            'num_points': len(best),
+            'points': [p for p in points if (p['latitude'], p['longitude']) in positions]
+        }
+
+    def _grow(self, seed, neighbours, nodes, reach):
+        neighbours = [seed] + [i for i in neighbours if i != seed]
+        lats = [nodes[i][0] for i in neighbours]
+        lngs = [nodes[i][1] for i in neighbours]
+        close = pairwise_distances(lats, lngs) <= reach
+
+        members = [0]
+        for j in range(1, len(neighbours)):
+            if close[j, members].all():
+                members.append(j)
+
+        return [neighbours[j] for j in members]
+
+
+class CampClusters(object):
+    """
+    Camping spots of one fort set.
+
+    Every pair of forts close enough to be reached together gives two
+    circles of the reach radius going through both forts. Each circle is
+    shrunk while it keeps all of its forts, and the forts inside are counted
+    with a spatial index instead of a scan over all forts.
+
+    The geometry only depends on the fort set. Lure counts and distances to
+    the player are kept per circle and only updated for the forts whose lure
+    changed, or when the player moved. Cluster dicts are the ones CampFort
+    expects: center, distance, forts, size and lured.
+    """
+
+    def __init__(self, radius, forts):
+        self.radius = radius
+        self.forts = forts
+        self.clusters = []
+        self._pairs = []
+        self._position = None
+        self._lured_ids = set()
+
+        index = SpatialIndex(forts, cell_size=radius * 2)
+        reach = radius * 2 * (1 + PROJECTION_MARGIN)
+        order = dict((f['id'], i) for i, f in enumerate(forts))
+
+        for i, fort1 in enumerate(forts):
+            for fort2 in index.within(fort1['latitude'], fort1['longitude'], reach):
+                if order[fort2['id']] <= i:
+                    continue
+
+                c1, c2 = enclosing_circles(fort1, fort2, radius)
+                if not c1 or not c2:
+                    continue
+
+                first = self._shrink(self._cluster(index.within(c1[0], c1[1], c1[2]), c1), fort1, fort2, 0)
+                second = self._shrink(self._cluster(index.within(c2[0], c2[1], c2[2]), c2), fort1, fort2, 1)
+
+                self._pairs.append((len(self.clusters), len(self.clusters) + 1))
+                self.clusters.extend([first, second])
+
+        members = {}
+        for c, cluster in enumerate(self.clusters):
+            for fort in cluster['forts']:
+                members.setdefault(fort['id'], []).append(c)
+        self._members = dict((fort_id, np.array(c, dtype=np.intp)) for fort_id, c in members.items())
+
+        self._lured = np.zeros(len(self.clusters), dtype=np.int64)
+        self._distances = np.zeros(len(self.clusters))
+        self._center_lats = np.array([c['center'][0] for c in self.clusters], dtype=np.float64)
+        self._center_lngs = np.array([c['center'][1] for c in self.clusters], dtype=np.float64)
+
+    def update(self, position, forts):
+        """
+        Brings lure counts and distances up to date.
+        :param position: The player position.
+        :param forts: The current forts by id, for their lure state.
+        :type forts: dict
+        """
+        lured_ids = set(fort_id for fort_id in self._members
+                        if forts.get(fort_id, {}).get('active_fort_modifier', None) is not None)
+
+        for fort_id in lured_ids - self._lured_ids:
+            np.add.at(self._lured, self._members[fort_id], 1)
+        for fort_id in self._lured_ids - lured_ids:
+            np.subtract.at(self._lured, self._members[fort_id], 1)
+        self._lured_ids = lured_ids
+
+        if tuple(position[0:2]) != self._position:
+            self._position = tuple(position[0:2])
+            self._distances = distances_from(self._position[0], self._position[1],
+                                             self._center_lats, self._center_lngs)
+
+        for cluster, lured, dist in zip(self.clusters, self._lured, self._distances):
+            cluster['lured'] = int(lured)
+            cluster['distance'] = float(dist)
+
+    def best(self):
+        """
+        Returns the better of the two circles of every pair of forts, for
+        the state of the last update().
+        :rtype: list
+        """
+        best = []
+        for first, second in self._pairs:
+            first, second = self.clusters[first], self.clusters[second]
+            best.append(first if cluster_key(first) >= cluster_key(second) else second)
+        return best
+
+    def _cluster(self, forts, circle):
+        return {"center": (circle[0], circle[1]),
+                "radius": circle[2],
+                "distance": 0,
+                "forts": forts,
+                "size": len(forts),
+                "lured": 0}
+
+    def _shrink(self, cluster, fort1, fort2, side):
+        # Tighten the circle while it still holds all of its forts
+        radius = self.radius
+
+        while True:
+            circle = enclosing_circles(fort1, fort2, radius - 1)[side]
+            if not circle:
+                break
+
+            lats, lngs = coordinates(cluster["forts"])
+            dists = distances_from(circle[0], circle[1], lats, lngs)
+            forts = [f for f, d in zip(cluster["forts"], dists) if d <= circle[2]]
+            if len(forts) < len(cluster["forts"]):
+                break
+
+            cluster = self._cluster(forts, circle)
+            radius -= 1
+
+        return cluster
+
+
+def cluster_key(cluster):
+    return (cluster["lured"], cluster["size"], -cluster["distance"])
+
+
+def enclosing_circles(fort1, fort2, radius):
+    """
+    Returns the two circles of radius going through both forts, as
+    (latitude, longitude, radius) tuples, or None, None when there are none.
+    """
+    x1, y1 = coord2merc(fort1["latitude"], fort1["longitude"])
+    x2, y2 = coord2merc(fort2["latitude"], fort2["longitude"])
+    dx = x2 - x1
+    dy = y2 - y1
+    d = math.sqrt(dx ** 2 + dy ** 2)
+
+    if (d == 0) or (d > 2 * radius):
+        return None, None
+
+    cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+    cd = math.sqrt(radius ** 2 - (d / 2) ** 2)
+
+    c1 = merc2coord((cx - cd * dy / d, cy + cd * dx / d)) + (radius,)
+    c2 = merc2coord((cx + cd * dy / d, cy - cd * dx / d)) + (radius,)
+
+    return c1, c2
+
+
+def find_biggest_cluster(radius, points, order=None, engine=None):
+    """
+    Returns the biggest cluster of points within radius, see ClusterEngine.
+    With order set to the lure module id, ties go to the forts lured first.
+    Results are only cached in the given engine, which should be the bot's.
+    """
+    if order == LURE_MODULE:
+        # Same order as the time since the lure was set, without the clock
+        weights = [-point['last_modified_timestamp_ms'] for point in points]
+    else:
+        weights = None
+
+    return (engine or ClusterEngine()).biggest_cluster(radius, points, weights)
+
+
+def camp_clusters(radius, forts, engine=None):
+    """
+    Returns the camping spots around forts, see CampClusters. Results are
+    only cached in the given engine, which should be the bot's.
+    """
+    return (engine or ClusterEngine()).camp_clusters(radius, forts)
@@ -17,6 +17,8 @@ except ImportError:
     warnings.warn('Please run `pip install -r requirements.txt` to ensure you have the latest required packages')
     sys.exit(-1)
 
+from pokemongo_bot.log_store import LogStore
+
 DEFAULT_DRIVER = 'sqlite'
 DEFAULT_CONN_STR = ':memory:'
 
@@ -29,6 +31,7 @@ class Datastore(object):
         conn_str = DEFAULT_CONN_STR if 'conn_str' not in kwargs else kwargs['conn_str']
 
         self.backend = get_backend('{driver}://{conn}'.format(driver=driver, conn=conn_str))
+        self.log_store = None
 
     def migrate(self, path=None):
         if path is None:
@@ -41,6 +44,8 @@ class Datastore(object):
         try:
             migrations = read_migrations(path)
             self.backend.apply_migrations(self.backend.to_apply(migrations))
+            if self.log_store is not None:
+                self.log_store.refresh()
         except (IOError, OSError):
             """
             If `migrations` directory is not present, then whatever is subclassing
@@ -49,3 +54,8 @@ class Datastore(object):
 
     def get_connection(self):
         return self.backend.connection
+
+    def get_log_store(self):
+        if self.log_store is None:
+            self.log_store = LogStore(self.get_connection())
+        return self.log_store
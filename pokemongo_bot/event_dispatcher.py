@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import logging
+import threading
+import time
+from collections import deque
+
+
+class AsyncHandler(object):
+    """
+    Runs an event handler on a worker thread of its own.
+
+    handle_event() puts the event in a bounded queue and returns, so a
+    handler doing network I/O no longer holds up the bot. When the queue
+    is full the overflow policy decides:
+
+        drop_oldest: the oldest queued event is dropped
+        drop_debug:  a queued debug event is dropped, or the new event
+                     when it is a debug one, else the oldest
+        block:       the bot waits until there is room
+
+    Each handler gets its own copy of the event data, as handlers run
+    concurrently and some add to it.
+    """
+
+    DROP_OLDEST = 'drop_oldest'
+    DROP_DEBUG = 'drop_debug'
+    BLOCK = 'block'
+    POLICIES = (DROP_OLDEST, DROP_DEBUG, BLOCK)
+
+    MAX_QUEUE = 100
+
+    def __init__(self, handler, max_queue=MAX_QUEUE, overflow=DROP_OLDEST):
+        if overflow not in self.POLICIES:
+            raise ValueError('Event queue overflow needs to be in: {}'.format(self.POLICIES))
+
+        self.handler = handler
+        self.max_queue = max(1, int(max_queue))
+        self.overflow = overflow
+        self.name = type(handler).__name__
+        self.logger = logging.getLogger(type(self).__name__)
+
+        self._cond = threading.Condition(threading.Lock())
+        self._queue = deque()
+        self._busy = False
+        self._stopped = False
+        self._thread = None
+
+        self._stats = {'queued': 0, 'handled': 0, 'dropped': 0, 'errors': 0,
+                       'total_latency': 0.0, 'max_latency': 0.0}
+
+    def wants(self, event, level):
+        wants = getattr(self.handler, 'wants', None)
+        return wants is None or wants(event, level)
+
+    def handle_event(self, event, sender, level, formatted_msg, data):
+        entry = (time.time(), (event, sender, level, formatted_msg, dict(data)))
+
+        with self._cond:
+            if self._stopped:
+                self._stats['dropped'] += 1
+                return
+
+            if len(self._queue) >= self.max_queue:
+                if self.overflow == self.BLOCK:
+                    while len(self._queue) >= self.max_queue:
+                        self._cond.wait()
+                elif not self._make_room(level):
+                    self._stats['dropped'] += 1
+                    return
+
+            self._queue.append(entry)
+            self._stats['queued'] += 1
+            self._start()
+            self._cond.notify_all()
+
+    def join(self, timeout=None):
+        """
+        Waits until every queued event was handled.
+        :return: Whether the queue is empty.
+        :rtype: bool
+        """
+        end = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._queue or self._busy:
+                remaining = None if end is None else end - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def stop(self):
+        """
+        Stops the worker thread, once it handled the events already queued.
+        Events it receives after that are dropped.
+        """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def stats(self):
+        """
+        Returns the queue metrics: depth, queued, handled, dropped, errors,
+        and the mean and max latency in seconds from emit to handled.
+        :rtype: dict
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats['depth'] = len(self._queue)
+        done = stats['handled'] + stats['errors']
+        stats['mean_latency'] = stats['total_latency'] / done if done else 0.0
+        return stats
+
+    def _make_room(self, level):
+        # Returns False when the new event is the one to drop
+        if self.overflow == self.DROP_DEBUG:
+            for i, (_, queued) in enumerate(self._queue):
+                if queued[2] == 'debug':
+                    del self._queue[i]
+                    self._stats['dropped'] += 1
+                    return True
+            if level == 'debug':
+                return False
+
+        self._queue.popleft()
+        self._stats['dropped'] += 1
+        return True
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='{}Worker'.format(self.name))
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._busy = False
+                    self._cond.notify_all()
+                    if self._stopped:
+                        return
+                    self._cond.wait()
+                queued_at, args = self._queue.popleft()
+                self._busy = True
+                self._cond.notify_all()
+
+            try:
+                self.handler.handle_event(*args)
+                result = 'handled'
+            except BaseException:
+                # SystemExit would only end this thread, not the bot, and
+                # leave the queue without a worker
+                self.logger.exception('[x] %s failed to handle %s', self.name, args[0])
+                result = 'errors'
+
+            latency = time.time() - queued_at
+            with self._cond:
+                self._stats[result] += 1
+                self._stats['total_latency'] += latency
+                self._stats['max_latency'] = max(self._stats['max_latency'], latency)
+
@@ -2,10 +2,12 @@
 from __future__ import print_function
 import time
 
-import requests
 import os
 import sys
 
+import requests
+
+from pokemongo_bot import http_client
 from pokemongo_bot.event_manager import EventHandler
 from pokemongo_bot.base_task import BaseTask
 from sys import platform as _platform
@@ -16,9 +18,16 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 
 SITE_KEY = '6LeeTScTAAAAADqvhqVMhPpr_vB9D364Ia-1dSgK'
+# 2captcha answers slower than the http client default
+TWOCAPTCHA_TIMEOUT = 30
+TWOCAPTCHA_MAX_POLL_ERRORS = 6
 
 
 class CaptchaHandler(EventHandler):
+    EVENTS = ('pokestop_searching_too_often', 'login_successful')
+    # Solving holds the bot until it is done, and failing exits it
+    SYNCHRONOUS = True
+
     def __init__(self, bot, captcha_solving):
         super(CaptchaHandler, self).__init__()
         self.bot = bot
@@ -114,25 +123,39 @@ class CaptchaHandler(EventHandler):
                 return
 
             self.bot.logger.info('Creating 2captcha session for {}.'.format(url))
-            response = requests.get('http://2captcha.com/in.php', params={
-                'key': self.bot.config.twocaptcha_token,
-                'method': 'userrecaptcha',
-                'googlekey': SITE_KEY,
-                'pageurl': url,
-            })
+            try:
+                response = http_client.get('http://2captcha.com/in.php', params={
+                    'key': self.bot.config.twocaptcha_token,
+                    'method': 'userrecaptcha',
+                    'googlekey': SITE_KEY,
+                    'pageurl': url,
+                }, timeout=TWOCAPTCHA_TIMEOUT)
+            except requests.exceptions.RequestException as e:
+                self.bot.logger.error('Failed to send captcha to 2captcha: {}'.format(e))
+                return
             result = response.text.split('|', 1)
             if result[0] != 'OK':
                 self.bot.logger.error('Failed to send captcha to 2captcha: {}'.format('|'.join(result)))
                 return
             captcha_id = result[1]
+            poll_errors = 0
 
             while True:
                 time.sleep(10)
-                response = requests.get('http://2captcha.com/res.php', params={
-                    'key': self.bot.config.twocaptcha_token,
-                    'action': 'get',
-                    'id': captcha_id
-                })
+                try:
+                    response = http_client.get('http://2captcha.com/res.php', params={
+                        'key': self.bot.config.twocaptcha_token,
+                        'action': 'get',
+                        'id': captcha_id
+                    }, timeout=TWOCAPTCHA_TIMEOUT)
+                except requests.exceptions.RequestException as e:
+                    poll_errors += 1
+                    if poll_errors >= TWOCAPTCHA_MAX_POLL_ERRORS:
+                        self.bot.logger.error('Could not get the captcha solution from 2captcha: {}'.format(e))
+                        return
+                    self.bot.logger.warning('Could not reach 2captcha, asking again: {}'.format(e))
+                    continue
+                poll_errors = 0
                 result = response.text.split('|', 1)
                 if result[0] == 'CAPCHA_NOT_READY':
                     self.bot.logger.info('2captcha reports captcha has not been solved yet.')
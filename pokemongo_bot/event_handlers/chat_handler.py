@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
+import heapq
 import re
 from pokemongo_bot import inventory
-from pokemongo_bot import metrics
 
 DEBUG_ON = False
 
@@ -9,7 +9,9 @@ class ChatHandler:
     def __init__(self, bot, pokemons):
         self.bot = bot
         self.pokemons = pokemons
-        self.metrics = metrics.Metrics(bot)
+        # The bot's own, every Metrics follows the inventory refreshes
+        self.metrics = bot.metrics
+        self.queries = bot.log_store.queries()
 
 
     def get_evolved(self, num, order):
@@ -21,11 +23,7 @@ class ChatHandler:
         if order not in ["cp", "iv", "dated"]:
             order = "iv"
 
-        with self.bot.database as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT pokemon, cp, iv FROM catch_log ORDER BY " + order + " DESC LIMIT " + str(num))
-            evolved = cur.fetchall()
-            return evolved
+        return self.queries.history('evolve_log', order, num)
 
     def get_softbans(self, num):
         if not num.isnumeric():
@@ -33,11 +31,7 @@ class ChatHandler:
         else:
             num = int(num)
 
-        with self.bot.database as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT * FROM softban_log DESC LIMIT " + str(num))
-            softbans = cur.fetchall()
-            return softbans
+        return self.queries.recent('softban_log', num)
 
     def get_hatched(self, num, order):
         if not num.isnumeric():
@@ -48,11 +42,7 @@ class ChatHandler:
         if order not in ["cp", "iv", "dated"]:
             order = "iv"
 
-        with self.bot.database as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT pokemon, cp, iv From eggs_hatched_log ORDER BY " + order + " DESC LIMIT " + str(num))
-            hatched = cur.fetchall()
-            return hatched
+        return self.queries.history('eggs_hatched_log', order, num)
 
     def get_caught(self, num, order):
         if not num.isnumeric():
@@ -63,11 +53,7 @@ class ChatHandler:
         if order not in ["cp", "iv", "dated"]:
             order = "iv"
 
-        with self.bot.database as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT pokemon, cp, iv FROM catch_log ORDER BY " + order + " DESC LIMIT " + str(num))
-            caught = cur.fetchall()
-            return caught
+        return self.queries.history('catch_log', order, num)
 
     def get_pokestops(self, num):
         if not num.isnumeric():
@@ -75,11 +61,7 @@ class ChatHandler:
         else:
             num = int(num)
 
-        with self.bot.database as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT * FROM pokestop_log DESC LIMIT " + str(num))
-            pokestops = cur.fetchall()
-            return pokestops
+        return self.queries.recent('pokestop_log', num)
 
     def get_released(self, num, order):
         if not num.isnumeric():
@@ -90,11 +72,7 @@ class ChatHandler:
         if order not in ["cp", "iv", "dated"]:
             order = "iv"
 
-        with self.bot.database as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT pokemon, cp, iv FROM transfer_log ORDER BY " + order + " DESC LIMIT " + str(num))
-            released = cur.fetchall()
-            return released
+        return self.queries.history('transfer_log', order, num)
 
     def get_vanished(self, num, order):
         if not num.isnumeric():
@@ -105,36 +83,29 @@ class ChatHandler:
         if order not in ["cp", "iv", "dated"]:
             order = "iv"
 
-        with self.bot.database as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT pokemon, cp, iv FROM vanish_log ORDER BY " + order + " DESC LIMIT " + str(num))
-            vanished = cur.fetchall()
-            return vanished
+        return self.queries.history('vanish_log', order, num)
 
     def get_player_stats(self):
         stats = inventory.player().player_stats
         dust = self.get_dust()
         if stats:
-            with self.bot.database as conn:
-                cur = conn.cursor()
-                cur.execute(
-                    "SELECT COUNT(DISTINCT encounter_id) FROM catch_log WHERE dated >= datetime('now','-1 day')")
-                catch_day = cur.fetchone()[0]
-                cur.execute("SELECT COUNT(pokestop) FROM pokestop_log WHERE dated >= datetime('now','-1 day')")
-                ps_day = cur.fetchone()[0]
-                res = (
-                    self.bot.config.username,
-                    str(stats["level"]),
-                    str(stats["experience"]),
-                    str(stats["next_level_xp"]),
-                    str(stats["pokemons_captured"]),
-                    str(catch_day),
-                    str(stats["poke_stop_visits"]),
-                    str(ps_day),
-                    str("%.2f" % stats["km_walked"]),
-                    str(dust)
-
-                )
+            catch_day = self.queries.fetchall(
+                "SELECT COUNT(DISTINCT encounter_id) FROM catch_log WHERE dated >= datetime('now','-1 day')")[0][0]
+            ps_day = self.queries.fetchall(
+                "SELECT COUNT(pokestop) FROM pokestop_log WHERE dated >= datetime('now','-1 day')")[0][0]
+            res = (
+                self.bot.config.username,
+                str(stats["level"]),
+                str(stats["experience"]),
+                str(stats["next_level_xp"]),
+                str(stats["pokemons_captured"]),
+                str(catch_day),
+                str(stats["poke_stop_visits"]),
+                str(ps_day),
+                str("%.2f" % stats["km_walked"]),
+                str(dust)
+
+            )
             return (res)
 
     def get_events(self, update):
@@ -187,7 +158,7 @@ class ChatHandler:
 
         if order not in ["cp", "iv", "dated"]:
             order = "iv"
-        pkmns = sorted(inventory.pokemons().all(), key=lambda p: getattr(p, order), reverse=True)[:num]
+        pkmns = heapq.nlargest(num, inventory.pokemons().all(), key=lambda p: getattr(p, order))
         res = []
         for p in pkmns:
             res.append([
@@ -200,5 +171,5 @@ class ChatHandler:
         return res
 
     def get_dust(self):
-        dust = metrics.Metrics.total_stardust(self.metrics)
+        dust = self.metrics.total_stardust()
         return dust
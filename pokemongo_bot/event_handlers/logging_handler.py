@@ -8,6 +8,9 @@ from pokemongo_bot.event_manager import EventHandler
 
 
 class LoggingHandler(EventHandler):
+    # The log has to stay in order with what the bot does
+    SYNCHRONOUS = True
+
     EVENT_COLOR_MAP = {
         'api_error':                         'red',
         'badges':                            'blue',
@@ -149,6 +152,9 @@ class LoggingHandler(EventHandler):
     def __init__(self, color=True, debug=False):
         self.color = color
         self.debug = debug
+        if not debug:
+            # Debug events are only printed in debug mode
+            self.LEVELS = ('info', 'warning', 'error', 'critical')
 
     def handle_event(self, event, sender, level, formatted_msg, data):
         if not formatted_msg:
@@ -205,20 +205,24 @@ class TelegramClass:
     def request_snipe(self, update, pkm, location):
         loc_list = location.split(',')
         snipeSuccess = False
-        try:
-            id = Pokemons.id_for(pkm)
-        except:
+        resolved = Pokemons.resolve_name(pkm)
+        if not resolved:
             self.sendMessage(chat_id=update.message.chat_id, parse_mode='Markdown', text="Invaild Pokemon")
             return
+        id = Pokemons.id_for(resolved)
 
         #Set Telegram Snipe to true and let sniper do its work
         TelegramSnipe.ENABLED = True
         TelegramSnipe.ID = int(id)
-        TelegramSnipe.POKEMON_NAME = str(pkm)
+        TelegramSnipe.POKEMON_NAME = str(resolved)
         TelegramSnipe.LATITUDE = float(loc_list[0].strip())
         TelegramSnipe.LONGITUDE = float(loc_list[1].strip())
         
-        outMsg = 'Catching pokemon: ' + TelegramSnipe.POKEMON_NAME + ' at Latitude: ' + str(TelegramSnipe.LATITUDE) + ' Longitude: ' + str(TelegramSnipe.LONGITUDE) + '\n'
+        outMsg = ''
+        if resolved != pkm:
+            # A typo may resolve to another pokemon, tell which one is sniped
+            outMsg += 'Unknown Pokemon name [' + pkm + ']. Assuming it is [' + resolved + ']\n'
+        outMsg += 'Catching pokemon: ' + TelegramSnipe.POKEMON_NAME + ' at Latitude: ' + str(TelegramSnipe.LATITUDE) + ' Longitude: ' + str(TelegramSnipe.LONGITUDE) + '\n'
         self.sendMessage(chat_id=update.message.chat_id, parse_mode='Markdown', text="".join(outMsg))
         
     def request_snipe_time(self, update, location):
@@ -467,8 +471,7 @@ class TelegramClass:
         # insert chat id into database
         self.grab_uid(update)
         # remove old handler
-        self.bot.event_manager._handlers = filter(lambda x: not isinstance(x, TelegramHandler),
-                                                  self.bot.event_manager._handlers)
+        self.bot.event_manager.remove_handler(TelegramHandler)
         # add new handler (passing newconfig as parameter)
         self.bot.event_manager.add_handler(TelegramHandler(self.bot, newconfig))
 
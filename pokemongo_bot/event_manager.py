@@ -3,13 +3,19 @@ from __future__ import unicode_literals
 from __future__ import print_function
 from sys import stdout
 
+from collections import deque
 from datetime import datetime, timedelta
+from logging.handlers import RotatingFileHandler
 import time
 import json
+import logging
 import os
+import threading
 
 
 from pokemongo_bot.base_dir import _base_dir
+from pokemongo_bot.event_dispatcher import AsyncHandler
+from pokemongo_bot.web_state_writer import write_json
 
 
 class FileIOException(Exception):
@@ -24,14 +30,54 @@ class EventMalformedException(Exception):
     pass
 
 
+LEVELS = frozenset(['info', 'warning', 'error', 'critical', 'debug'])
+
+
 class EventHandler(object):
+    """
+    Receives the emitted events. EVENTS and LEVELS limit a handler to the
+    given event names and levels, None means all of them. SYNCHRONOUS
+    handlers stay on the bot thread when the others are dispatched
+    asynchronously, see EventManager.dispatch_async.
+    """
+
+    EVENTS = None
+    LEVELS = None
+    SYNCHRONOUS = False
 
     def __init__(self):
         pass
 
+    def wants(self, event, level):
+        """
+        Returns whether the handler receives an event at level. Asked once
+        per event and level, the answer is cached by the EventManager.
+        :rtype: bool
+        """
+        return (self.EVENTS is None or event in self.EVENTS) and (self.LEVELS is None or level in self.LEVELS)
+
     def handle_event(self, event, kwargs):
         raise NotImplementedError("Please implement")
 
+
+class EventSchema(object):
+    """
+    A registered event and the parameters its data may hold.
+    """
+
+    __slots__ = ('name', 'parameters', '_parameter_set')
+
+    def __init__(self, name, parameters=()):
+        self.name = name
+        self.parameters = list(parameters)
+        self._parameter_set = frozenset(parameters)
+
+    def validate(self, data):
+        if self._parameter_set:
+            unknown = [k for k in data if k not in self._parameter_set]
+            if unknown:
+                raise EventMalformedException("Event %s does not require parameter %s" % (self.name, unknown[0]))
+
         
 class Event(object):
     """
@@ -73,9 +119,25 @@ class Event(object):
         
 
 class Events(object):
+    """
+    The last MaxEventlog events, for the web UI.
+
+    Events are kept in a fixed size ring buffer. The json file read by the
+    web UI is handed to the background state writer as a snapshot built on
+    demand, so a burst of events costs one snapshot and one write. With
+    event_history_file set in the config, every event is also appended as
+    a json line to that file, rotated at event_history_max_bytes.
+    """
+
+    HISTORY_MAX_BYTES = 5 * 1024 * 1024
+    HISTORY_BACKUPS = 3
+
     def __init__(self, bot):
-        self._events = []
         self.MaxEventlog = 50
+        self._events = deque(maxlen=self.MaxEventlog)
+        self._lock = threading.Lock()
+        self._version = 0
+        self._snapshot = (0, [])
         self.bot = bot
         if bot==None:
             self._username = "TESTBUILD"
@@ -83,6 +145,7 @@ class Events(object):
             self._username = self.bot.config.username
         #Hardcoded to avoid the file is being flooded on disk
         self._write_debug = False
+        self._history = self._init_history()
 
     def retrieve_data(self):
         return self._events
@@ -91,27 +154,40 @@ class Events(object):
         return self._events[number]
 
     def all(self):
-        return list(self._data.values())
+        return list(self._events)
 
     def remove_event_by_num(self, number):
-        del self._events[number]
+        with self._lock:
+            del self._events[number]
+            self._version += 1
 
 
-    def add_event(self, event):
+    def keeps(self, level):
+        """
+        Returns whether events at level are logged at all.
+        :rtype: bool
+        """
         #Do not log anything on disk  when in Jenkins test build
         if self._username == "TESTBUILD":
-            return
+            return False
 
-        if event.level=="debug" and self._write_debug==False:
+        return level != "debug" or self._write_debug
+
+    def add_event(self, event):
+        if not self.keeps(event.level):
             return
-        else:
+
+        # The oldest event drops out once the buffer is full
+        with self._lock:
             self._events.append(event)
-        #Check if we exceed the max log entries
-        if len(self._events) > self.MaxEventlog:
-            self.remove_event_by_num(0)
+            self._version += 1
+
+        if self._history is not None:
+            self._history.info(json.dumps(self._jsonify(event)))
+
         #Write file to disk
         self.update_web_event()
-    
+
     def init_event_outfile(self):
         web_event = os.path.join(_base_dir, "web", "events-%s.json" % self._username)
 
@@ -126,27 +202,44 @@ class Events(object):
     def update_web_event(self):
         web_event = os.path.join(_base_dir, "web", "events-%s.json" % self._username)
 
-        if not os.path.exists(web_event):
-            self.init_event_outfile()
+        # Built by the writer when it writes, not for every event
+        write_json(web_event, self.jsonify_events)
 
-        json_events = self.jsonify_events()
-        #self.bot.logger.info('####### Writing %s' % json_events)
+    def jsonify_events(self):
+        """
+        Returns the json snapshot of the events, rebuilt only when events
+        were added or removed since the last one.
+        :rtype: list
+        """
+        with self._lock:
+            version, json_events = self._snapshot
+            if version != self._version:
+                json_events = [self._jsonify(event) for event in self._events]
+                self._snapshot = (self._version, json_events)
+            return json_events
+
+    def _jsonify(self, event):
+        return {"event": {"timestamp": event.timestamp, "friendly_msg": event.friendly_msg, "event": event.event, "level": event.level, "formatted": event.formatted, "data": event.data}}
+
+    def _init_history(self):
+        path = getattr(getattr(self.bot, 'config', None), 'event_history_file', None)
+        if not path or self._username == "TESTBUILD":
+            return None
+
+        history = logging.getLogger('{}.history.{}'.format(__name__, self._username))
+        history.propagate = False
+        history.setLevel(logging.INFO)
+        if not history.handlers:
+            handler = RotatingFileHandler(
+                path,
+                maxBytes=getattr(self.bot.config, 'event_history_max_bytes', self.HISTORY_MAX_BYTES),
+                backupCount=self.HISTORY_BACKUPS
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            history.addHandler(handler)
+        return history
 
-        try:
-            with open(web_event, "w") as outfile:
-                json.dump(json_events, outfile)
-        except (IOError, ValueError) as e:
-            self.bot.logger.info('[x] Error while opening events file for write: %s' % e, 'red')
-        except:
-            raise FileIOException("Unexpected error writing to {}".web_event)
 
-    def jsonify_events(self):
-        json_events = []
-        for event in self._events:
-            json_events.append({"event": {"timestamp": event.timestamp, "friendly_msg": event.friendly_msg, "event": event.event, "level": event.level, "formatted": event.formatted, "data": event.data}})
-        return json_events
-        
-        
 class EventManager(object):
 
     def __init__(self, bot ,limit_output=False, *handlers):
@@ -154,6 +247,10 @@ class EventManager(object):
 
         self._registered_events = dict()
         self._handlers = list(handlers) or []
+        # (event, level) -> handlers receiving it
+        self._routes = {}
+        # (max_queue, overflow) once handlers run on their own threads
+        self._async = None
         self._last_event = None
         self._limit_output = limit_output
         self.bot = bot
@@ -162,29 +259,106 @@ class EventManager(object):
         
         
     def event_report(self):
-        for event, parameters in self._registered_events.iteritems():
+        for event, schema in self._registered_events.iteritems():
             print('-'*80)
             print('Event: {}'.format(event))
-            if parameters:
+            if schema.parameters:
                 print('Parameters:')
-                for parameter in parameters:
+                for parameter in schema.parameters:
                     print('* {}'.format(parameter))
 
     def add_handler(self, event_handler):
-        self._handlers.append(event_handler)
+        self._handlers.append(self._dispatch(event_handler))
+        self._routes.clear()
+
+    def remove_handler(self, handler):
+        """
+        Removes a handler, or every handler of a class, and stops the worker
+        threads of the asynchronous ones.
+        :param handler: The handler, or its class.
+        :return: Whether any handler was removed.
+        :rtype: bool
+        """
+        def matches(h):
+            if isinstance(handler, type):
+                return isinstance(h, handler)
+            return h is handler
+
+        removed = [h for h in self._handlers
+                   if matches(h) or (isinstance(h, AsyncHandler) and matches(h.handler))]
+        if not removed:
+            return False
+
+        self._handlers = [h for h in self._handlers if h not in removed]
+        self._routes.clear()
+        for h in removed:
+            if isinstance(h, AsyncHandler):
+                h.stop()
+        return True
+
+    def dispatch_async(self, max_queue=AsyncHandler.MAX_QUEUE, overflow=AsyncHandler.DROP_OLDEST):
+        """
+        Runs every handler but the SYNCHRONOUS ones on a worker thread of its
+        own, now and for handlers added later. See AsyncHandler for the
+        overflow policies.
+        """
+        self._async = (max_queue, overflow)
+        self._handlers = [self._dispatch(handler) for handler in self._handlers]
+        self._routes.clear()
+
+    def dispatch_stats(self):
+        """
+        Returns the queue metrics of the asynchronous handlers by handler
+        class name, numbered from the second handler of a class on.
+        :rtype: dict
+        """
+        stats = {}
+        for handler in self._handlers:
+            if isinstance(handler, AsyncHandler):
+                name = handler.name
+                count = 1
+                while name in stats:
+                    count += 1
+                    name = '{}#{}'.format(handler.name, count)
+                stats[name] = handler.stats()
+        return stats
+
+    def flush(self, timeout=None):
+        """
+        Waits until the asynchronous handlers handled their queued events.
+        """
+        for handler in self._handlers:
+            if isinstance(handler, AsyncHandler):
+                handler.join(timeout)
+
+    def _dispatch(self, handler):
+        if self._async is None or isinstance(handler, AsyncHandler) or getattr(handler, 'SYNCHRONOUS', False):
+            return handler
+        return AsyncHandler(handler, *self._async)
 
     def register_event(self, name, parameters=[]):
-        self._registered_events[name] = parameters
+        self._registered_events[name] = EventSchema(name, parameters)
+        self._routes.clear()
+
+    def handlers_for(self, event, level):
+        """
+        Returns the handlers receiving event at level.
+        :rtype: list
+        """
+        key = (event, level)
+        if key not in self._routes:
+            self._routes[key] = [h for h in self._handlers if _wants(h, event, level)]
+        return self._routes[key]
 
     def emit(self, event, sender=None, level='info', formatted='', data={}):
         if not sender:
             raise ArgumentError('Event needs a sender!')
 
-        levels = ['info', 'warning', 'error', 'critical', 'debug']
-        if not level in levels:
-            raise ArgumentError('Event level needs to be in: {}'.format(levels))
+        if level not in LEVELS:
+            raise ArgumentError('Event level needs to be in: {}'.format(sorted(LEVELS)))
 
-        if event not in self._registered_events:
+        schema = self._registered_events.get(event)
+        if schema is None:
             raise EventNotRegisteredException("Event %s not registered..." % event)
 
         if self._limit_output:
@@ -196,18 +370,26 @@ class EventManager(object):
                 self._last_event = event
 
         # verify params match event
-        parameters = self._registered_events[event]
-        if parameters:
-            for k, v in data.iteritems():
-                if k not in parameters:
-                    raise EventMalformedException("Event %s does not require parameter %s" % (event, k))
+        schema.validate(data)
+
+        handlers = self.handlers_for(event, level)
+        logged = self._EventLog.keeps(level)
+        if not handlers and not logged:
+            # Nobody would see it, skip the formatting
+            return
 
         formatted_msg = formatted.format(**data)
 
         # send off to the handlers
-        for handler in self._handlers:
+        for handler in handlers:
             handler.handle_event(event, sender, level, formatted_msg, data)
-        
+
         #Log the event in the event_log
-        l_event = Event(event, sender, level, formatted, data) 
-        self._EventLog.add_event(l_event)
+        if logged:
+            self._EventLog.add_event(Event(event, sender, level, formatted, data))
+
+
+def _wants(handler, event, level):
+    # Handlers not derived from EventHandler receive everything
+    wants = getattr(handler, 'wants', None)
+    return wants is None or wants(event, level)
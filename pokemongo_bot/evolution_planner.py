@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+
+class UpgradeCosts(object):
+    """
+    The candies and stardust to power a pokemon up from a level to another.
+
+    The table gives the [candy, stardust] cost of each power up, the first
+    one for half level 2 (level 1). Both are kept as prefix sums, so the
+    cost between any two levels is two subtractions.
+    """
+
+    def __init__(self, table):
+        if not isinstance(table, list) or not all(isinstance(c, (list, tuple)) and len(c) == 2 for c in table):
+            raise ValueError("Upgrade costs must be a list of [candy, stardust]")
+
+        self.candy = [0]
+        self.stardust = [0]
+        for candy, stardust in table:
+            self.candy.append(self.candy[-1] + candy)
+            self.stardust.append(self.stardust[-1] + stardust)
+
+    def between(self, level, target):
+        """
+        Returns the cost of powering up from level to target.
+        :return: candy, stardust
+        :rtype: tuple
+        """
+        start = int(level * 2) - 2
+        end = int(target * 2) - 2
+        if end <= start:
+            return 0, 0
+        if end >= len(self.candy):
+            raise IndexError("No upgrade cost up to level {}".format(target))
+        return self.candy[end] - self.candy[start], self.stardust[end] - self.stardust[start]
+
+
+class Species(object):
+    __slots__ = ('id', 'name', 'family_id', 'evolution_cost', 'evolution_item', 'evolution_item_needed',
+                 'next_id', 'cost_to_final', 'evolutions_to_final')
+
+
+class EvolutionCosts(object):
+    """
+    What each species needs to evolve: to the next stage, and to the
+    final one following the first branch, computed once for all.
+    """
+
+    def __init__(self, static_data):
+        """
+        :param static_data: The PokemonInfo of every species, see
+        inventory.Pokemons.STATIC_DATA.
+        """
+        self.species = {}
+        for info in static_data:
+            species = Species()
+            species.id = info.id
+            species.name = info.name
+            species.family_id = info.first_evolution_id
+            species.evolution_cost = info.evolution_cost if info.has_next_evolution else 0
+            species.evolution_item = info.evolution_item
+            species.evolution_item_needed = info.evolution_item_needed
+            species.next_id = info.next_evolution_ids[0] if info.has_next_evolution else None
+            self.species[species.id] = species
+
+        for species in self.species.values():
+            species.cost_to_final = 0
+            species.evolutions_to_final = 0
+            pokemon_id = species.id
+            while self.species[pokemon_id].next_id is not None:
+                species.cost_to_final += self.species[pokemon_id].evolution_cost
+                species.evolutions_to_final += 1
+                pokemon_id = self.species[pokemon_id].next_id
+
+    def __getitem__(self, pokemon_id):
+        return self.species[pokemon_id]
+
+    def evolution_items(self):
+        """
+        Returns the ids of the items some evolution needs.
+        :rtype: set
+        """
+        return set(s.evolution_item for s in self.species.values() if s.evolution_item is not None)
+
+
+class FamilyPlan(object):
+    """
+    What to do with the pokemons of a family. Pokemons are in evolve once
+    per evolution.
+    """
+
+    __slots__ = ('transfer', 'evolve', 'upgrade', 'xp', 'candies', 'stardust', 'missing_items')
+
+    def __init__(self):
+        self.transfer = []
+        self.evolve = []
+        self.upgrade = []
+        self.xp = []
+        self.candies = 0
+        self.stardust = 0
+        # (pokemon, item id, needed, owned) of the evolutions lacking an item
+        self.missing_items = []
+
+
+class EvolutionPlanner(object):
+    """
+    Plans what PokemonOptimizer transfers, evolves, upgrades and keeps to
+    evolve for xp, from the pokemons its rules keep and try to evolve or
+    upgrade.
+
+    Plans are made from what they are given only, without looking at the
+    inventory or sending anything, so they can be made for an exported
+    inventory as well.
+    """
+
+    def __init__(self, evolution_costs, upgrade_costs=None, evolve_to_final=True, use_evolution_items=False,
+                 evolve_for_xp=False, xp_whitelist=(), xp_blacklist=()):
+        """
+        :param upgrade_costs: Without, nothing is upgraded.
+        :param evolve_for_xp: Whether to keep cheap evolutions for xp.
+        :param xp_whitelist: The only family names to keep for xp, if any.
+        :param xp_blacklist: The family names not to keep for xp.
+        """
+        self.evolution_costs = evolution_costs
+        self.upgrade_costs = upgrade_costs
+        self.evolve_to_final = evolve_to_final
+        self.use_evolution_items = use_evolution_items
+        self.evolve_for_xp = evolve_for_xp
+        self.xp_whitelist = set(xp_whitelist)
+        self.xp_blacklist = set(xp_blacklist)
+
+    def plan_all(self, pokemons, keep, try_evolve, try_upgrade, candies, stardust, upgrade_level, items=None, buddy_id=0):
+        """
+        Plans every family, by family id. Stardust is spent in that order.
+        :param candies: The candies of each family id.
+        :param items: The count of each evolution item.
+        :return: The plan of each family id, and the stardust left.
+        :rtype: tuple
+        """
+        families = self._by_family(pokemons)
+        keep = self._by_family(keep)
+        try_evolve = self._by_family(try_evolve)
+        try_upgrade = self._by_family(try_upgrade)
+
+        plans = {}
+        for family_id in sorted(families):
+            plan = self.plan(family_id, families[family_id], keep.get(family_id, []), try_evolve.get(family_id, []),
+                             try_upgrade.get(family_id, []), candies.get(family_id, 0), stardust, upgrade_level,
+                             items, buddy_id)
+            stardust = plan.stardust
+            plans[family_id] = plan
+
+        return plans, stardust
+
+    def plan(self, family_id, family_list, keep, try_evolve, try_upgrade, candies, stardust, upgrade_level, items=None, buddy_id=0):
+        """
+        Plans a family.
+        :param family_list: Every pokemon of the family.
+        :param candies: The candies of the family.
+        :param upgrade_level: The level to upgrade to.
+        :param items: The count of each evolution item.
+        :rtype: FamilyPlan
+        """
+        items = items or {}
+        plan = FamilyPlan()
+
+        # All the rest is crap, for now
+        kept = set(id(p) for p in keep)
+        crap = [p for p in family_list if id(p) not in kept]
+        crap = [p for p in crap if not p.in_fort and not p.is_favorite and not (p.unique_id == buddy_id)]
+        crap.sort(key=lambda p: (p.iv, p.cp), reverse=True)
+
+        # We will gain a candy whether we choose to transfer or evolve these Pokemon
+        candies += len(crap)
+
+        for pokemon in try_evolve:
+            species = self.evolution_costs[pokemon.pokemon_id]
+            if species.evolution_item is not None:
+                if not self.use_evolution_items:
+                    continue
+
+                # We need a special Item to evolve this Pokemon!
+                owned = items.get(species.evolution_item, 0)
+                if owned < species.evolution_item_needed:
+                    plan.missing_items.append((pokemon, species.evolution_item, species.evolution_item_needed, owned))
+                    continue
+
+            if self.evolve_to_final:
+                candies -= species.cost_to_final
+                evolutions = species.evolutions_to_final
+            else:
+                candies -= pokemon.evolution_cost
+                evolutions = 1
+
+            if candies < 0:
+                continue
+
+            # One candy back per evolution
+            candies += evolutions
+            plan.evolve += [pokemon] * evolutions
+
+        if self.upgrade_costs is not None:
+            # Highest CP on top.
+            for pokemon in sorted(try_upgrade, key=lambda p: p.cp, reverse=True):
+                if pokemon.level >= upgrade_level:
+                    continue
+
+                candy_cost, stardust_cost = self.upgrade_costs.between(pokemon.level, upgrade_level)
+
+                # Candies are not given back when the stardust is short
+                candies -= candy_cost
+                if (candies < 0) or (stardust < stardust_cost):
+                    continue
+
+                stardust -= stardust_cost
+                plan.upgrade.append(pokemon)
+
+        family_name = self.evolution_costs[family_id].name
+        if ((not self.evolve_for_xp) or (family_name in self.xp_blacklist) or
+                (self.xp_whitelist and (family_name not in self.xp_whitelist))):
+            plan.transfer = crap
+        else:
+            # Compute how many crap we should keep if we want to batch evolve them for xp
+            lowest_evolution_cost = self.evolution_costs[family_id].evolution_cost
+
+            if (candies > 0) and lowest_evolution_cost:
+                keep_for_xp = int((candies - 1) / lowest_evolution_cost)
+            else:
+                keep_for_xp = 0
+
+            plan.xp = [p for p in crap if p.has_next_evolution() and p.evolution_cost == lowest_evolution_cost][:keep_for_xp]
+            xp = set(id(p) for p in plan.xp)
+            plan.transfer = [p for p in crap if id(p) not in xp]
+
+        plan.candies = candies
+        plan.stardust = stardust
+        return plan
+
+    def _by_family(self, pokemons):
+        families = {}
+        for pokemon in pokemons:
+            families.setdefault(pokemon.first_evolution_id, []).append(pokemon)
+        return families
@@ -6,6 +6,7 @@ import raven
 import uuid
 import requests
 import time
+from pokemongo_bot import http_client
 from pokemongo_bot.base_dir import _base_dir
 
 class BotEvent(object):
@@ -83,9 +84,10 @@ class BotEvent(object):
             'dp': path
         }
         try:
-            response = requests.post(
+            response = http_client.post(
                 'http://www.google-analytics.com/collect', data=data)
 
             response.raise_for_status()
-        except requests.exceptions.HTTPError:
+        except requests.exceptions.RequestException:
+            # Errors and timeouts alike, analytics never hold the bot up
             pass
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from urllib.parse import urlencode, urlsplit
+except ImportError:
+    from urllib import urlencode
+    from urlparse import urlsplit
+
+
+class HttpClient(object):
+    """
+    Shared HTTP session for the outbound helpers: sniper sources, map
+    feeds, directions and analytics.
+
+    Connections are kept alive in a pool per host, so polling the same
+    source again skips the TCP and TLS setup. At most per_host requests
+    run against one host at a time, the others wait for a free slot.
+
+    get() can revalidate a response it got before: with conditional set,
+    the ETag and Last-Modified of the last answer are sent along, and a
+    304 hands back the cached response. With max_age set, a response
+    younger than that many seconds is returned without asking at all.
+    """
+
+    POOL_SIZE = 10
+    PER_HOST = 4
+    TIMEOUT = 10  # seconds
+    CACHE_SIZE = 64
+
+    def __init__(self, pool_size=POOL_SIZE, per_host=PER_HOST, timeout=TIMEOUT):
+        self.per_host = per_host
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = threading.Lock()
+        self._slots = {}
+        # url -> (response, fetched at)
+        self._cache = OrderedDict()
+        self._stats = {'requests': 0, 'cache_hits': 0, 'not_modified': 0, 'errors': 0}
+
+    def get(self, url, params=None, headers=None, timeout=None, conditional=False, max_age=0):
+        """
+        Sends a GET request.
+        :param conditional: Revalidate the last response of url instead of
+        downloading it again when unchanged.
+        :type conditional: bool
+        :param max_age: Seconds during which the last response of url is
+        returned without a request.
+        :type max_age: float
+        :rtype: requests.Response
+        """
+        headers = dict(headers or {})
+        key = url + ('?' + urlencode(sorted(params.items())) if params else '')
+
+        if conditional or max_age:
+            with self._lock:
+                cached = self._cache.get(key)
+            if cached is not None:
+                cached_response, fetched_at = cached
+                if max_age and time.time() - fetched_at < max_age:
+                    self._count('cache_hits')
+                    return cached_response
+                if conditional:
+                    if 'ETag' in cached_response.headers:
+                        headers['If-None-Match'] = cached_response.headers['ETag']
+                    if 'Last-Modified' in cached_response.headers:
+                        headers['If-Modified-Since'] = cached_response.headers['Last-Modified']
+        else:
+            cached = None
+
+        response = self.request('GET', url, params=params, headers=headers, timeout=timeout)
+
+        if response.status_code == 304 and cached is not None:
+            self._count('not_modified')
+            response = cached[0]
+        elif response.status_code != 200 or not (conditional or max_age):
+            return response
+
+        with self._lock:
+            self._cache.pop(key, None)
+            self._cache[key] = (response, time.time())
+            while len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+        return response
+
+    def post(self, url, data=None, json=None, headers=None, timeout=None):
+        """
+        Sends a POST request.
+        :rtype: requests.Response
+        """
+        return self.request('POST', url, data=data, json=json, headers=headers, timeout=timeout)
+
+    def request(self, method, url, timeout=None, **kwargs):
+        """
+        Sends a request through the pool, waiting for a free slot of the
+        host first.
+        :rtype: requests.Response
+        """
+        with self._slot(urlsplit(url).netloc):
+            self._count('requests')
+            try:
+                return self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            except requests.exceptions.RequestException:
+                self._count('errors')
+                raise
+
+    def stats(self):
+        """
+        Returns the request counters: requests sent, cache_hits answered
+        without a request, not_modified answers and errors.
+        :rtype: dict
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _slot(self, host):
+        with self._lock:
+            if host not in self._slots:
+                self._slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self._slots[host]
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def client(name='default', **options):
+    """
+    Returns the shared HttpClient called name, created with options on
+    first use.
+    :rtype: HttpClient
+    """
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = HttpClient(**options)
+        return _clients[name]
+
+
+def get(url, **kwargs):
+    """
+    Sends a GET request with the default client, see HttpClient.get.
+    """
+    return client().get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    """
+    Sends a POST request with the default client, see HttpClient.post.
+    """
+    return client().post(url, **kwargs)
@@ -1,14 +1,18 @@
 from __future__ import print_function
 import json
 import logging
+import marshal
 import os
 import datetime
 import calendar
 import sys
+from bisect import bisect_left
 from collections import OrderedDict
 
 from pokemongo_bot.base_dir import _base_dir
 from pokemongo_bot.services.item_recycle_worker import ItemRecycler
+from pokemongo_bot.services.name_resolver import NameResolver
+from pokemongo_bot.web_state_writer import write_json
 
 '''
 Helper class for updating/retrieving Inventory data
@@ -23,6 +27,49 @@ class FileIOException(Exception):
     pass
 
 
+# Parsed static data files, keyed by the size and mtime of their source
+STATIC_CACHE_DIR = os.path.join(_base_dir, 'data', 'cache')
+
+
+def load_static_data(path):
+    """
+    Loads a static data json file, through a marshal copy of the parsed
+    data which loads several times faster than the json itself. The copy
+    is rebuilt whenever the json file changes.
+    :param path: The json file.
+    :type path: str
+    :return: The parsed json.
+    """
+    stat = os.stat(path)
+    key = (stat.st_size, stat.st_mtime)
+    cache_path = os.path.join(STATIC_CACHE_DIR, '{}.{}{}.marshal'.format(
+        os.path.basename(path), sys.version_info[0], sys.version_info[1]))
+
+    try:
+        with open(cache_path, 'rb') as cache:
+            cached_key, data = marshal.load(cache)
+        if tuple(cached_key) == key:
+            return data
+    except (IOError, OSError, EOFError, ValueError, TypeError):
+        pass
+
+    with open(path) as source:
+        data = json.load(source)
+
+    try:
+        if not os.path.isdir(STATIC_CACHE_DIR):
+            os.makedirs(STATIC_CACHE_DIR)
+        temp_path = '{}.{}'.format(cache_path, os.getpid())
+        with open(temp_path, 'wb') as cache:
+            marshal.dump((key, data), cache)
+        os.rename(temp_path, cache_path)
+    except (IOError, OSError, ValueError):
+        # The cache is only an optimization
+        pass
+
+    return data
+
+
 #
 # Abstraction
 
@@ -40,7 +87,7 @@ class _StaticInventoryComponent(object):
     def init_static_data(cls):
         if not hasattr(cls, 'STATIC_DATA') or cls.STATIC_DATA is None:
             cls.STATIC_DATA = cls.process_static_data(
-                json.load(open(cls.STATIC_DATA_FILE)))
+                load_static_data(cls.STATIC_DATA_FILE))
 
     @classmethod
     def process_static_data(cls, data):
@@ -52,6 +99,7 @@ class _StaticInventoryComponent(object):
 class _BaseInventoryComponent(_StaticInventoryComponent):
     TYPE = None  # base key name for items of this type
     ID_FIELD = None  # identifier field for items of this type
+    DELETED_KEY = None  # field naming items of this type in deleted_item
 
     def __init__(self):
         self._data = {}
@@ -67,7 +115,7 @@ class _BaseInventoryComponent(_StaticInventoryComponent):
         assert self.ID_FIELD is not None
         ret = {}
         for item in inventory:
-            data = item['inventory_item_data']
+            data = item.get('inventory_item_data', {})
             if self.TYPE in data:
                 item = data[self.TYPE]
                 key = item[self.ID_FIELD]
@@ -77,6 +125,34 @@ class _BaseInventoryComponent(_StaticInventoryComponent):
     def refresh(self, inventory):
         self._data = self.retrieve_data(inventory)
 
+    def apply_delta(self, inventory):
+        """
+        Applies an inventory delta in place: items sent are added or
+        replaced, deleted ones removed and the others left untouched.
+        :param inventory: The inventory_items of an inventory delta.
+        :type inventory: list
+        """
+        for item in inventory:
+            data = item.get('inventory_item_data')
+            if data is None:
+                key = self.deleted_key(item)
+                if key is not None:
+                    self._data.pop(key, None)
+            elif self.TYPE in data:
+                item = data[self.TYPE]
+                key = item[self.ID_FIELD]
+                self._data[key] = self.update(self._data.get(key), item)
+
+    def update(self, current, item):
+        # optional hook for reusing the current object of a changed item
+        return self.parse(item)
+
+    def deleted_key(self, item):
+        deleted = item.get('deleted_item')
+        if isinstance(deleted, dict) and self.DELETED_KEY is not None:
+            return deleted.get(self.DELETED_KEY)
+        return None
+
     def get(self, object_id):
         return self._data.get(object_id)
 
@@ -125,6 +201,11 @@ class Player(_BaseInventoryComponent):
     def refresh(self,inventory):
         self.player_stats = self.retrieve_data(inventory)
 
+    def apply_delta(self, inventory):
+        player_stats = self.retrieve_data(inventory)
+        if player_stats:
+            self.player_stats = player_stats
+
     def parse(self, item):
         if not item:
             item = {}
@@ -138,7 +219,7 @@ class Player(_BaseInventoryComponent):
     def retrieve_data(self, inventory):
         ret = {}
         for item in inventory:
-            data = item['inventory_item_data']
+            data = item.get('inventory_item_data', {})
             if self.TYPE in data:
                 item = data[self.TYPE]
                 ret = item
@@ -150,6 +231,7 @@ class Player(_BaseInventoryComponent):
 class Candies(_BaseInventoryComponent):
     TYPE = 'candy'
     ID_FIELD = 'family_id'
+    DELETED_KEY = 'candy_family_id'
 
     @classmethod
     def family_id_for(cls, pokemon_id):
@@ -167,6 +249,7 @@ class Candies(_BaseInventoryComponent):
 class Pokedex(_BaseInventoryComponent):
     TYPE = 'pokedex_entry'
     ID_FIELD = 'pokemon_id'
+    DELETED_KEY = 'pokedex_entry_id'
 
     def seen(self, pokemon_id):
         return pokemon_id in self._data
@@ -251,6 +334,7 @@ class Item(object):
 class Items(_BaseInventoryComponent):
     TYPE = 'item'
     ID_FIELD = 'item_id'
+    DELETED_KEY = 'item'
     STATIC_DATA_FILE = os.path.join(_base_dir, 'data', 'items.json')
 
     def parse(self, item_data):
@@ -408,12 +492,23 @@ class AppliedItems(_BaseInventoryComponent):
 class Pokemons(_BaseInventoryComponent):
     TYPE = 'pokemon_data'
     ID_FIELD = 'id'
+    DELETED_KEY = 'pokemon_id'
     STATIC_DATA_FILE = os.path.join(_base_dir, 'data', 'pokemon.json')
+    BY_NAME = {}  # type: Dict[string, int]
+    BY_FAMILY = {}  # type: Dict[int, List[int]]
+    NAMES = NameResolver([])
 
     @classmethod
     def process_static_data(cls, data):
         data = [PokemonInfo(d) for d in data]
 
+        cls.BY_NAME = dict((p.name.lower(), p.id) for p in data)
+        cls.NAMES = NameResolver([p.name for p in data])
+        by_family = {}
+        for p in data:
+            by_family.setdefault(p.family_id, []).append(p.id)
+        cls.BY_FAMILY = by_family
+
         # process evolution info
         for p in data:
             next_all = p.next_evolutions_all
@@ -465,12 +560,26 @@ class Pokemons(_BaseInventoryComponent):
 
     @classmethod
     def id_for(cls, pokemon_name):
-        # TODO: Use a better searching algorithm. This one is O(n)
-        for data in cls.STATIC_DATA:
-            if data.name.lower() == pokemon_name.lower():
-                return data.id
+        pokemon_id = cls.BY_NAME.get(pokemon_name.lower())
+        if pokemon_id is None:
+            raise Exception('Could not find pokemon named {}'.format(pokemon_name))
+
+        return pokemon_id
+
+    @classmethod
+    def resolve_name(cls, pokemon_name):
+        """
+        Returns the Pokedex name closest to a name given by a user or a
+        feed, see NameResolver.
+        :return: The name, or None when nothing is close enough.
+        :rtype: str
+        """
+        return cls.NAMES.resolve(pokemon_name)
 
-        raise Exception('Could not find pokemon named {}'.format(pokemon_name))
+    @classmethod
+    def ids_for_family(cls, family_id):
+        # type: (int) -> List[int]
+        return cls.BY_FAMILY.get(family_id, [])
 
     @classmethod
     def first_evolution_id_for(cls, pokemon_id):
@@ -509,6 +618,24 @@ class Pokemons(_BaseInventoryComponent):
             return Egg(item)
         return Pokemon(item)
 
+    def update(self, current, item):
+        # Stats, IV and movesets are only computed again when the pokemon changed
+        if current is not None:
+            data = dict(current._data)
+            if 'level' not in item:
+                # added by Pokemon itself
+                data.pop('level', None)
+            if data == item:
+                return current
+        return self.parse(item)
+
+    def deleted_key(self, item):
+        # Older protos only send the id of a deleted pokemon
+        key = super(Pokemons, self).deleted_key(item)
+        if key is None:
+            key = item.get('deleted_item_key')
+        return key
+
     def all(self):
         # by default don't include eggs in all pokemon (usually just
         # makes caller's lives more difficult)
@@ -640,7 +767,12 @@ class LevelToCPm(_StaticInventoryComponent):
 
     @classmethod
     def level_from_cpm(cls, cp_multiplier):
-        return min(range(len(cls.STATIC_DATA)), key=lambda i: abs(cls.STATIC_DATA[i] - cp_multiplier)) * 0.5 + 1
+        # Multipliers grow with the level, look for the closest one
+        data = cls.STATIC_DATA
+        i = bisect_left(data, cp_multiplier)
+        if i >= len(data) or (i > 0 and cp_multiplier - data[i - 1] <= data[i] - cp_multiplier):
+            i -= 1
+        return i * 0.5 + 1
 
 
 class _Attacks(_StaticInventoryComponent):
@@ -789,6 +921,8 @@ class Candy(object):
         self.quantity += amount
 
 class Egg(object):
+    __slots__ = ('_data',)
+
     def __init__(self, data):
         self._data = data
 
@@ -967,8 +1101,51 @@ class PokemonInfo(object):
         return moves
 
 
+class _cached(object):
+    """
+    Attribute computed on first access and kept in the slot of the same
+    name with a leading underscore until the instance resets it.
+    """
+
+    def __init__(self, compute):
+        self.compute = compute
+        self.slot = '_' + compute.__name__
+        self.__doc__ = compute.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        try:
+            return getattr(instance, self.slot)
+        except AttributeError:
+            value = self.compute(instance)
+            setattr(instance, self.slot, value)
+            return value
+
+
 class Pokemon(object):
+    # A storage box holds thousands of these, keep them compact. Derived
+    # stats are only computed when read, most workers never need them.
+    CACHED = ('_iv', '_ivcp', '_cp_exact', '_cp_percent', '_moveset')
+
+    __slots__ = ('_data', 'unique_id', 'encounter_id', 'pokemon_id', 'static', 'display_data', 'shiny',
+                 'cp', 'cp_bm', 'cp_am', 'cp_m', 'level', 'hp_max', 'hp', 'iv_attack', 'iv_defense',
+                 'iv_stamina', 'name', 'nickname_raw', 'nickname', 'in_fort', 'fort_id', 'is_favorite',
+                 'buddy_candy', 'is_bad', 'buddy_distance_needed', 'fast_attack', 'charged_attack') + CACHED
+
     def __init__(self, data):
+        self._load(data)
+
+    def update(self, data):
+        """
+        Replaces the data of this pokemon, e.g. after a power up, and drops
+        the derived stats computed so far.
+        :param data: The pokemon_data sent by the server.
+        :type data: dict
+        """
+        self._load(data)
+
+    def _load(self, data):
         self._data = data
         # Unique ID for this particular Pokemon
         self.unique_id = data.get('id', 0)
@@ -1010,11 +1187,6 @@ class Pokemon(object):
         self.iv_defense = data.get('individual_defense', 0)
         self.iv_stamina = data.get('individual_stamina', 0)
 
-        # Basic Values of the pokemon (identical for all pokemons of one kind)
-        base_attack = self.static.base_attack
-        base_defense = self.static.base_defense
-        base_stamina = self.static.base_stamina
-
         self.name = self.static.name
         self.nickname_raw = data.get('nickname', '')
         self.nickname = self.nickname_raw or self.name
@@ -1031,26 +1203,84 @@ class Pokemon(object):
         self.fast_attack = FastAttacks.data_for(data['move_1'])
         self.charged_attack = ChargedAttacks.data_for(data['move_2'])  # type: ChargedAttack
 
+        for slot in self.CACHED:
+            if hasattr(self, slot):
+                delattr(self, slot)
+
+    @_cached
+    def iv(self):
         # Individial values (IV) perfection percent
-        self.iv = self._compute_iv_perfection()
+        return self._compute_iv_perfection()
 
+    @_cached
+    def ivcp(self):
         # IV CP perfection - kind of IV perfection percent but calculated
         #  using weight of each IV in its contribution to CP of the best
         #  evolution of current pokemon
         # So it tends to be more accurate than simple IV perfection
-        self.ivcp = self._compute_cp_perfection()
+        return self._compute_cp_perfection()
 
+    @_cached
+    def cp_exact(self):
         # Exact value of current CP (not rounded)
-        self.cp_exact = _calc_cp(
-            base_attack, base_defense, base_stamina,
+        return _calc_cp(
+            self.static.base_attack, self.static.base_defense, self.static.base_stamina,
             self.iv_attack, self.iv_defense, self.iv_stamina, self.cp_m)
-        #assert max(int(self.cp_exact), 10) == self.cp
 
+    @_cached
+    def cp_percent(self):
         # Percent of maximum possible CP
-        self.cp_percent = self.cp_exact / self.static.max_cp
+        return self.cp_exact / self.static.max_cp
 
+    @_cached
+    def moveset(self):
         # Get moveset instance with calculated DPS and perfection percents
-        self.moveset = self._get_moveset()
+        return self._get_moveset()
+
+    # Sort keys of the pokemon optimizer rules
+    @property
+    def ncp(self):
+        return self.cp_percent
+
+    @property
+    def max_cp(self):
+        return self.static.max_cp
+
+    @property
+    def dps(self):
+        return self.moveset.dps
+
+    @property
+    def dps1(self):
+        return self.fast_attack.dps
+
+    @property
+    def dps2(self):
+        return self.charged_attack.dps
+
+    @property
+    def dps_attack(self):
+        return self.moveset.dps_attack
+
+    @property
+    def dps_defense(self):
+        return self.moveset.dps_defense
+
+    @property
+    def attack_perfection(self):
+        return self.moveset.attack_perfection
+
+    @property
+    def defense_perfection(self):
+        return self.moveset.defense_perfection
+
+    @property
+    def candy(self):
+        return self.candy_quantity
+
+    @property
+    def candy_to_evolution(self):
+        return max(self.evolution_cost - self.candy_quantity, 0)
 
     def __str__(self):
         return self.name
@@ -1061,6 +1291,9 @@ class Pokemon(object):
     def update_nickname(self, new_nickname):
         self.nickname_raw = new_nickname
         self.nickname = self.nickname_raw or self.name
+        # Keep the raw data in line, so the next inventory delta does not
+        # see the renamed pokemon as changed
+        self._data['nickname'] = new_nickname
 
     def can_evolve_now(self):
         if self.evolution_item is None:
@@ -1329,15 +1562,23 @@ class Inventory(object):
         self.pokemons = Pokemons()
         self.player = Player(self.bot)  # include inventory inside Player?
         self.egg_incubators = None
-        self.refresh()
         self.item_inventory_size = None
         self.pokemon_inventory_size = None
+        self.refresh()
 
     def refresh(self, inventory=None):
         if inventory is None:
-            request = self.bot.api.create_request()
-            request.get_holo_inventory(last_timestamp_ms=self.last_timestamp_ms)
-            inventory = request.call()
+            # Only what changed since the last refresh is sent back
+            delta = self.last_holo_timestamp_ms > 0
+            pending = self.bot.api.queue_request('get_holo_inventory', last_timestamp_ms=self.last_holo_timestamp_ms)
+            if self.item_inventory_size is None or self.pokemon_inventory_size is None:
+                # Storage sizes come with the player, fetch both in one go
+                player = self.bot.api.queue_request('get_player')
+            else:
+                player = None
+            inventory = pending.result()
+            if player is not None:
+                self._set_inventories_size(player.result()['responses']['GET_PLAYER']['player_data'])
             if 'inventory_delta' not in inventory['responses']['GET_HOLO_INVENTORY']:
                 self.bot.logger.info("No player information found, possiblity of temp ban")
                 sys.exit(0)
@@ -1347,6 +1588,7 @@ class Inventory(object):
                                                 ['inventory_delta']
                                                 .get('new_timestamp_ms', 0))
         else:
+            delta = self.last_timestamp_ms > 0
             request = self.bot.api.create_request()
             request.get_inventory(last_timestamp_ms=self.last_timestamp_ms)
             inventory = request.call()
@@ -1357,15 +1599,24 @@ class Inventory(object):
                                     .get('new_timestamp_ms', 0))
 
         if 'GET_HOLO_INVENTORY' in inventory['responses']:
-            inventory = inventory['responses']['GET_HOLO_INVENTORY']['inventory_delta']['inventory_items']
+            inventory = inventory['responses']['GET_HOLO_INVENTORY']['inventory_delta'].get('inventory_items', [])
         else:
-            inventory = inventory['responses']['GET_INVENTORY']['inventory_delta']['inventory_items']
-            
+            inventory = inventory['responses']['GET_INVENTORY']['inventory_delta'].get('inventory_items', [])
+
         for i in (self.pokedex, self.candy, self.items, self.pokemons, self.player):
-            i.refresh(inventory)
+            if delta:
+                i.apply_delta(inventory)
+            else:
+                i.refresh(inventory)
 
         # self.applied_items = [x["inventory_item_data"] for x in inventory if "applied_items" in x["inventory_item_data"]]
-        self.egg_incubators = [x["inventory_item_data"] for x in inventory if "egg_incubators" in x["inventory_item_data"]]
+        egg_incubators = [x["inventory_item_data"] for x in inventory
+                          if "egg_incubators" in x.get("inventory_item_data", {})]
+        if egg_incubators or not delta:
+            self.egg_incubators = egg_incubators
+
+        for listener in list(_listeners):
+            listener(inventory, delta)
 
         self.update_web_inventory()
 
@@ -1383,18 +1634,9 @@ class Inventory(object):
     def update_web_inventory(self):
         web_inventory = os.path.join(_base_dir, "web", "inventory-%s.json" % self.bot.config.username)
 
-        if not os.path.exists(web_inventory):
-            self.init_inventory_outfile()
-
-        json_inventory = self.jsonify_inventory()
-
-        try:
-            with open(web_inventory, "w") as outfile:
-                json.dump(json_inventory, outfile)
-        except (IOError, ValueError) as e:
-            self.bot.logger.info('[x] Error while opening inventory file for write: %s' % e, 'red')
-        except:
-            raise FileIOException("Unexpected error writing to {}".web_inventory)
+        # Built and written in the background, only for the last state of a
+        # burst of refreshes
+        write_json(web_inventory, self.jsonify_inventory)
 
     def jsonify_inventory(self):
         json_inventory = []
@@ -1429,12 +1671,12 @@ class Inventory(object):
         """
         # TODO: Force to update it if the player upgrades its size
         if self.item_inventory_size is None or self.pokemon_inventory_size is None:
-            request = self.bot.api.create_request()
-            request.get_player()
-            player_data = request.call()['responses']['GET_PLAYER']['player_data']
-            
-            self.item_inventory_size = player_data['max_item_storage']
-            self.pokemon_inventory_size = player_data['max_pokemon_storage']
+            player = self.bot.api.queue_request('get_player')
+            self._set_inventories_size(player.result()['responses']['GET_PLAYER']['player_data'])
+
+    def _set_inventories_size(self, player_data):
+        self.item_inventory_size = player_data['max_item_storage']
+        self.pokemon_inventory_size = player_data['max_pokemon_storage']
 
 #
 # Other
@@ -1450,6 +1692,7 @@ IMMUNITY_FACTOR = 0.51
 
 
 _inventory = None  # type: Inventory
+_listeners = []
 
 
 def _calc_cp(base_attack, base_defense, base_stamina,
@@ -1515,6 +1758,24 @@ def init_inventory(bot):
     _inventory = Inventory(bot)
 
 
+def add_listener(listener):
+    """
+    Calls listener(inventory_items, delta) after each inventory refresh,
+    with the items the server sent. When delta is True they are only the
+    ones which changed, else the whole inventory.
+    :param listener: The callable to add.
+    :return: Nothing.
+    :rtype: None
+    """
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def remove_listener(listener):
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
 def refresh_inventory(data=None):
     """
     Refreshes the cached inventory, retrieves data from the server.
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import math
+import time
+
+import numpy as np
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+PERIODS = (HOUR, DAY)
+
+# log table -> (metric, key column, summed column) rolled up for each row.
+# The log_rollup migration computes the same from the rows logged before.
+ROLLUPS = {
+    'catch_log': (('catch', 'pokemon', 'iv'), ('catch_iv', 'iv_decile', None)),
+    'eggs_hatched_log': (('hatch', 'pokemon', 'iv'),),
+    'evolve_log': (('evolve', 'pokemon', 'iv'),),
+    'pokestop_log': (('spin', None, 'exp'),),
+    'transfer_log': (('transfer', 'pokemon', 'iv'),),
+    'vanish_log': (('vanish', 'pokemon', 'iv'),),
+}
+
+CREATE_BUCKET = 'INSERT OR IGNORE INTO log_rollup (metric, period, start, key) VALUES (?, ?, ?, ?)'
+ADD_TO_BUCKET = ('UPDATE log_rollup SET count = count + 1, total = total + ? '
+                 'WHERE metric = ? AND period = ? AND start = ? AND key = ?')
+
+
+def rollup_statements(table, columns, at):
+    """
+    Returns the (sql, values) adding a row logged at a time to the rollups.
+    :param at: The time of the row, in seconds since the epoch.
+    :rtype: list
+    """
+    statements = []
+    for metric, key_column, total_column in ROLLUPS.get(table, ()):
+        if key_column == 'iv_decile':
+            iv = columns.get('iv')
+            key = '' if iv is None else str(int(iv * 10))
+        elif key_column is None:
+            key = ''
+        else:
+            key = columns.get(key_column) or ''
+        total = columns.get(total_column) if total_column else None
+        total = float(total) if total is not None else 0.0
+
+        for period in PERIODS:
+            start = int(at) // period * period
+            statements.append((CREATE_BUCKET, (metric, period, start, key)))
+            statements.append((ADD_TO_BUCKET, (total, metric, period, start, key)))
+    return statements
+
+
+class LogAnalytics(object):
+    """
+    Catch, spin and pokemon yields over time, from the hourly and daily
+    rollups LogStore.log() keeps in log_rollup, instead of the log rows.
+
+    A range is read from the daily rollups for the whole days it covers,
+    and the hourly ones for the hours around them. Ranges go by whole UTC
+    hours: from the hour start is in to the one end is in.
+    """
+
+    def __init__(self, log_store):
+        """
+        :type log_store: LogStore
+        """
+        self.log_store = log_store
+
+    def totals(self, metric, start, end):
+        """
+        Returns the count and total of a metric, by key, between two times.
+        :param start: In seconds since the epoch.
+        :param end: In seconds since the epoch.
+        :return: key -> (count, total)
+        :rtype: dict
+        """
+        if not self.log_store.has_table('log_rollup'):
+            return {}
+
+        first_hour = int(start) // HOUR * HOUR
+        last_hour = int(math.ceil(end / float(HOUR))) * HOUR
+        first_day = int(math.ceil(first_hour / float(DAY))) * DAY
+        last_day = last_hour // DAY * DAY
+        if first_day >= last_day:
+            first_day = last_day = last_hour
+
+        rows = self.log_store.queries().fetchall(
+            'SELECT key, SUM(count), SUM(total) FROM log_rollup WHERE metric = ? AND ('
+            '(period = ? AND start >= ? AND start < ?) OR '
+            '(period = ? AND ((start >= ? AND start < ?) OR (start >= ? AND start < ?)))) '
+            'GROUP BY key',
+            (metric, DAY, first_day, last_day, HOUR, first_hour, first_day, last_day, last_hour))
+        return dict((key, (count, total)) for key, count, total in rows)
+
+    def series(self, metric, start, end, period=HOUR):
+        """
+        Returns the count and total of a metric for each period between two
+        times, the periods without any left out.
+        :return: [(period start, count, total)]
+        :rtype: list
+        """
+        if period not in PERIODS:
+            raise ValueError('Rollup period needs to be in: {}'.format(PERIODS))
+        if not self.log_store.has_table('log_rollup'):
+            return []
+
+        return self.log_store.queries().fetchall(
+            'SELECT start, SUM(count), SUM(total) FROM log_rollup '
+            'WHERE metric = ? AND period = ? AND start >= ? AND start < ? GROUP BY start ORDER BY start',
+            (metric, period, int(start) // period * period, end))
+
+    def summary(self, start, end):
+        """
+        Returns the yield between two times: catches, spins, xp from spins,
+        the same per hour, the vanish rate, and the catches by species and
+        by iv decile.
+        :rtype: dict
+        """
+        hours = max(end - start, 1) / float(HOUR)
+        catches = self.totals('catch', start, end)
+        spins = self.totals('spin', start, end)
+        vanishes = self.totals('vanish', start, end)
+
+        caught = sum(count for count, _ in catches.values())
+        spun = sum(count for count, _ in spins.values())
+        vanished = sum(count for count, _ in vanishes.values())
+        xp = sum(total for _, total in spins.values())
+
+        return {
+            'catches': caught,
+            'catches_per_hour': caught / hours,
+            'spins': spun,
+            'spins_per_hour': spun / hours,
+            'xp': xp,
+            'xp_per_hour': xp / hours,
+            'vanish_rate': vanished / float(caught + vanished) if caught + vanished else 0.0,
+            'species': dict((key, count) for key, (count, _) in catches.items()),
+            'iv_distribution': dict((key, count) for key, (count, _) in self.totals('catch_iv', start, end).items()),
+        }
+
+    def export(self, path, tables=None):
+        """
+        Writes the log rows and the rollups to a compressed numpy .npz
+        file, a column per array named table.column. Times are seconds
+        since the epoch, and pokemon names indexes in the pokemon array.
+        :param tables: The log tables to export, all rolled up ones by default.
+        """
+        names = {}
+        arrays = {}
+
+        def codes(values):
+            return np.array([names.setdefault(value, len(names)) for value in values], dtype=np.int32)
+
+        for table in sorted(tables or ROLLUPS):
+            if not self.log_store.has_table(table):
+                continue
+            columns = [c[1] for c in self.log_store.queries().fetchall('PRAGMA table_info({})'.format(table))]
+            selected = ["CAST(strftime('%s', dated) AS INTEGER)"] + [c for c in columns if c != 'dated']
+            rows = self.log_store.queries().fetchall('SELECT {} FROM {}'.format(', '.join(selected), table))
+            data = list(zip(*rows)) if rows else [()] * len(selected)
+
+            arrays['{}.dated'.format(table)] = np.array(data[0], dtype=np.int64)
+            for column, values in zip(selected[1:], data[1:]):
+                if column == 'pokemon':
+                    arrays['{}.pokemon'.format(table)] = codes(values)
+                elif column in ('cp', 'iv', 'exp', 'pokemon_id'):
+                    arrays['{}.{}'.format(table, column)] = np.array(
+                        [np.nan if v is None else float(v) for v in values], dtype=np.float32)
+                else:
+                    arrays['{}.{}'.format(table, column)] = np.array([v or '' for v in values], dtype='U')
+
+        if self.log_store.has_table('log_rollup'):
+            rows = self.log_store.queries().fetchall('SELECT metric, period, start, key, count, total FROM log_rollup')
+            data = list(zip(*rows)) if rows else [()] * 6
+            arrays['log_rollup.metric'] = np.array(data[0], dtype='U')
+            arrays['log_rollup.period'] = np.array(data[1], dtype=np.int32)
+            arrays['log_rollup.start'] = np.array(data[2], dtype=np.int64)
+            arrays['log_rollup.key'] = np.array(data[3], dtype='U')
+            arrays['log_rollup.count'] = np.array(data[4], dtype=np.int64)
+            arrays['log_rollup.total'] = np.array(data[5], dtype=np.float64)
+
+        arrays['pokemon'] = np.array(sorted(names, key=names.get), dtype='U')
+        arrays['exported_at'] = np.array(time.time())
+        np.savez_compressed(path, **arrays)
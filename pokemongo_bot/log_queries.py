@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import sqlite3
+import threading
+
+
+class LogQueries(object):
+    """
+    Read side of the sqlite logs, for the chat commands.
+
+    Queries run on a read only connection of their own, so a command
+    reading a long history does not hold the bot connection, and they are
+    served by the indexes of the log_history_index migration.
+
+    The best rows of each history by cp, iv and date are kept once asked
+    for, up to cache_size of them, and updated by LogStore.log() as rows
+    are logged. Asking for more rows than that queries the table.
+    """
+
+    ORDERS = ('cp', 'iv', 'dated')
+    HISTORIES = ('catch_log', 'eggs_hatched_log', 'evolve_log', 'transfer_log', 'vanish_log')
+    CACHE_SIZE = 100
+
+    def __init__(self, log_store, cache_size=CACHE_SIZE):
+        """
+        :param log_store: The store logging the rows.
+        :type log_store: LogStore
+        """
+        self.log_store = log_store
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+        # (table, order) -> [(sort key, (pokemon, cp, iv))], best first
+        self._top = {}
+
+        if log_store.path:
+            self.connection = sqlite3.connect(log_store.path, check_same_thread=False)
+            self.connection.execute('PRAGMA query_only = ON')
+        else:
+            # An in memory database is only seen by the connection which made it
+            self.connection = log_store.connection
+
+    def history(self, table, order, limit):
+        """
+        Returns the best (pokemon, cp, iv) rows of a history table.
+        :param order: cp, iv or dated.
+        :raise: ValueError for an unknown table or order.
+        :rtype: list
+        """
+        if table not in self.HISTORIES:
+            raise ValueError('No history for {}'.format(table))
+        if order not in self.ORDERS:
+            raise ValueError('History order needs to be in: {}'.format(self.ORDERS))
+        if not self.log_store.has_table(table):
+            return []
+
+        with self.lock:
+            # Under the lock, no row is logged between the flush and the query
+            self.log_store.catch_up()
+            if limit > self.cache_size:
+                return [row[:3] for row in self._history(table, order, limit)]
+
+            top = self._top.get((table, order))
+            if top is None:
+                top = [(self._key(row[3]), row[:3]) for row in self._history(table, order, self.cache_size)]
+                self._top[(table, order)] = top
+            return [row for _, row in top[:limit]]
+
+    def recent(self, table, limit):
+        """
+        Returns the latest rows of a log table, every column.
+        :rtype: list
+        """
+        if not self.log_store.has_table(table):
+            return []
+        return self.fetchall('SELECT * FROM {} ORDER BY dated DESC LIMIT ?'.format(table), (limit,))
+
+    def fetchall(self, sql, params=()):
+        with self.lock:
+            self.log_store.catch_up()
+            return self.connection.execute(sql, params).fetchall()
+
+    def logged(self, table, columns):
+        """
+        Updates the kept rows with a row LogStore logged, under the lock.
+        """
+        if table not in self.HISTORIES:
+            return
+
+        for order in self.ORDERS:
+            top = self._top.get((table, order))
+            if top is None:
+                continue
+
+            key = self._key(columns.get(order))
+
+            index = len(top)
+            while index > 0 and top[index - 1][0] < key:
+                index -= 1
+            if index < self.cache_size:
+                top.insert(index, (key, (columns.get('pokemon'), columns.get('cp'), columns.get('iv'))))
+                del top[self.cache_size:]
+
+    def _history(self, table, order, limit):
+        return self.connection.execute(
+            'SELECT pokemon, cp, iv, {0} FROM {1} ORDER BY {0} DESC LIMIT ?'.format(order, table),
+            (limit,)).fetchall()
+
+    @staticmethod
+    def _key(value):
+        # NULL sorts last in descending order, as in sqlite
+        return value is not None, value
@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import atexit
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from pokemongo_bot.log_analytics import ROLLUPS, LogAnalytics, rollup_statements
+from pokemongo_bot.log_queries import LogQueries
+from pokemongo_bot.rolling_counter import RollingCounter
+
+
+class LogWriter(object):
+    """
+    Write-behind inserts into a sqlite file, on a thread of its own.
+
+    insert() queues a row and returns. The writer thread opens its own
+    connection and commits queued rows in batches: as soon as max_batch
+    rows are waiting, or once the oldest one waited max_latency seconds,
+    so a row is never kept more than about max_latency from the file.
+    Consecutive rows of a same statement go through one executemany(), on
+    the statement sqlite3 prepared and cached the first time.
+
+    A row may come with other statements, like the rollups it adds to.
+    They are queued as one entry, so they are always committed, or lost,
+    together with the row.
+    """
+
+    MAX_BATCH = 100
+    MAX_LATENCY = 1.0  # seconds
+
+    def __init__(self, path, max_batch=MAX_BATCH, max_latency=MAX_LATENCY):
+        self.path = path
+        self.max_batch = max(1, int(max_batch))
+        self.max_latency = max_latency
+        self.logger = logging.getLogger(type(self).__name__)
+
+        self._cond = threading.Condition(threading.Lock())
+        # (queue time, ((sql, values), ...)) per row
+        self._queue = deque()
+        self._flushing = 0
+        self._busy = False
+        self._thread = None
+
+        self._stats = {'queued': 0, 'written': 0, 'batches': 0, 'errors': 0,
+                       'total_latency': 0.0, 'max_latency': 0.0}
+
+    def insert(self, sql, values, statements=()):
+        """
+        Queues a row.
+        :param statements: Other (sql, values) to run in the same
+        transaction as the row, after it.
+        """
+        entry = ((sql, tuple(values)),) + tuple((other_sql, tuple(other_values))
+                                                for other_sql, other_values in statements)
+        with self._cond:
+            self._queue.append((time.time(), entry))
+            self._stats['queued'] += 1
+            self._start()
+            if len(self._queue) >= self.max_batch:
+                self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Commits every queued row now, and waits for it.
+        :return: Whether every row was committed in time, False right away
+        when the writer thread died.
+        :rtype: bool
+        """
+        end = None if timeout is None else time.time() + timeout
+        with self._cond:
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                while self._queue or self._busy:
+                    if not self._thread.is_alive():
+                        return False
+                    remaining = None if end is None else end - time.time()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    # Waits by steps, to notice a writer which died meanwhile
+                    self._cond.wait(1.0 if remaining is None else min(remaining, 1.0))
+                return True
+            finally:
+                self._flushing -= 1
+
+    def stats(self):
+        """
+        Returns the writer metrics: depth (rows waiting), queued, written,
+        batches, errors (rows lost), and the mean and max latency in seconds
+        from insert to commit.
+        :rtype: dict
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats['depth'] = len(self._queue)
+        stats['mean_latency'] = stats['total_latency'] / stats['written'] if stats['written'] else 0.0
+        return stats
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='LogWriter')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _next_batch(self):
+        with self._cond:
+            while True:
+                if not self._queue:
+                    self._busy = False
+                    self._cond.notify_all()
+                    self._cond.wait()
+                    continue
+
+                delay = self._queue[0][0] + self.max_latency - time.time()
+                if self._flushing or len(self._queue) >= self.max_batch or delay <= 0:
+                    break
+                self._cond.wait(delay)
+
+            self._busy = True
+            count = min(len(self._queue), self.max_batch)
+            return [self._queue.popleft() for _ in range(count)]
+
+    def _run(self):
+        try:
+            self._write_batches()
+        except Exception:
+            # Rows queued from now on stay queued, flush() gives up on them
+            self.logger.exception('[x] Log writer stopped, log rows are no longer written')
+
+    def _write_batches(self):
+        connection = sqlite3.connect(self.path)
+        while True:
+            batch = self._next_batch()
+            statements = [statement for _, entry in batch for statement in entry]
+            try:
+                with connection:
+                    start = 0
+                    while start < len(statements):
+                        sql = statements[start][0]
+                        end = start
+                        while end < len(statements) and statements[end][0] == sql:
+                            end += 1
+                        connection.executemany(sql, [values for _, values in statements[start:end]])
+                        start = end
+                result = 'written'
+            except sqlite3.Error as e:
+                self.logger.warning('[x] Error while writing %d log rows: %s', len(batch), e)
+                result = 'errors'
+
+            now = time.time()
+            with self._cond:
+                self._stats[result] += len(batch)
+                if result == 'written':
+                    self._stats['batches'] += 1
+                    for queued_at, _ in batch:
+                        self._stats['total_latency'] += now - queued_at
+                    self._stats['max_latency'] = max(self._stats['max_latency'], now - batch[0][0])
+
+
+class LogStore(object):
+    """
+    The bot access to its sqlite logs.
+
+    Tables are looked up once, when created after the migrations, instead
+    of querying sqlite_master before every insert. log() hands rows to a
+    LogWriter, so a worker never waits for a commit; reads of the logs go
+    through fetchone(), which flushes pending rows first to see them. It
+    waits READ_FLUSH_LATENCIES times the writer latency at most (or
+    seconds, when the latency is below one), then reads without the rows
+    still pending.
+
+    File databases are switched to WAL, so the bot connection can read
+    while the writer commits. An in memory database can not be shared
+    with another connection, rows are then inserted right away.
+
+    Counts checked over and over, like the daily limits, are kept in
+    memory by daily_count() and count_since(): queried once, then updated by
+    log().
+    """
+
+    PRAGMAS = ('PRAGMA journal_mode=WAL', 'PRAGMA synchronous=NORMAL', 'PRAGMA temp_store=MEMORY')
+    READ_FLUSH_LATENCIES = 5
+
+    def __init__(self, connection, max_batch=LogWriter.MAX_BATCH, max_latency=LogWriter.MAX_LATENCY):
+        """
+        :param connection: The bot connection, see Datastore.get_connection().
+        :type connection: sqlite3.Connection
+        """
+        self.connection = connection
+        self._sql = {}
+        self._counters = {}
+        self._streaks = {}
+        self._queries = None
+        self.writer = None
+
+        self.logger = logging.getLogger(type(self).__name__)
+
+        self.path = path = self._path()
+        if path:
+            for pragma in self.PRAGMAS:
+                connection.execute(pragma)
+            self.writer = LogWriter(path, max_batch, max_latency)
+            atexit.register(self._flush_at_exit)
+
+        self.refresh()
+
+    def refresh(self):
+        """
+        Looks the tables up again, after running migrations.
+        """
+        rows = self.connection.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
+        self.tables = set(row[0] for row in rows)
+
+    def has_table(self, name):
+        return name in self.tables
+
+    def log(self, table, **columns):
+        """
+        Inserts a row in table.
+        :return: False if there is no such table.
+        :rtype: bool
+        """
+        if table not in self.tables:
+            return False
+
+        statements = []
+        if table in ROLLUPS:
+            # Dated now rather than when written, so it matches the rollups
+            now = time.time()
+            columns.setdefault('dated', time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(now)))
+            if 'log_rollup' in self.tables:
+                statements = rollup_statements(table, columns, now)
+
+        names = tuple(sorted(columns))
+        key = (table, names)
+        sql = self._sql.get(key)
+        if sql is None:
+            sql = 'INSERT INTO {} ({}) VALUES ({})'.format(table, ', '.join(names), ', '.join('?' * len(names)))
+            self._sql[key] = sql
+        values = [columns[name] for name in names]
+
+        if table in self._counters:
+            self._counters[table].add()
+        for (counted, reset_by) in self._streaks:
+            if counted == table:
+                self._streaks[(counted, reset_by)] += 1
+            elif reset_by == table:
+                self._streaks[(counted, reset_by)] = 0
+
+        queries = self._queries
+        if queries is None:
+            self._insert(sql, values, statements)
+        else:
+            # So the rows LogQueries keeps are either read or added
+            with queries.lock:
+                self._insert(sql, values, statements)
+                queries.logged(table, columns)
+        return True
+
+    def daily_count(self, table):
+        """
+        Returns the rows logged in table over the last day. The first call
+        counts them from the table, with the dated index.
+        :rtype: int
+        """
+        counter = self._counters.get(table)
+        if counter is None:
+            counter = RollingCounter()
+            if table in self.tables:
+                self.catch_up()
+                rows = self.connection.execute(
+                    "SELECT CAST(strftime('%s', dated) AS INTEGER) / ? AS bucket, COUNT(*) FROM {} "
+                    "WHERE dated >= datetime('now', '-{} seconds') GROUP BY bucket".format(table, int(RollingCounter.WINDOW)),
+                    (counter.bucket,)).fetchall()
+                for bucket, count in rows:
+                    counter.add(count, at=bucket * counter.bucket)
+            self._counters[table] = counter
+        return counter.count()
+
+    def count_since(self, table, reset_by):
+        """
+        Returns the rows logged in table since the last one in reset_by, the
+        vanishes since the last catch for instance. The first call counts
+        them from the tables.
+        :rtype: int
+        """
+        key = (table, reset_by)
+        if key not in self._streaks:
+            count = 0
+            if table in self.tables and reset_by in self.tables:
+                count = self.fetchone(
+                    "SELECT COUNT(*) FROM {0} WHERE dated > (SELECT MAX(dated) FROM {1})".format(table, reset_by))[0]
+            self._streaks[key] = count
+        return self._streaks[key]
+
+    def queries(self):
+        """
+        Returns the read side of the logs, for the chat commands.
+        :rtype: LogQueries
+        """
+        if self._queries is None:
+            self._queries = LogQueries(self)
+        return self._queries
+
+    def analytics(self):
+        """
+        Returns the yields over time, from the rollups.
+        :rtype: LogAnalytics
+        """
+        return LogAnalytics(self)
+
+    def fetchone(self, sql, params=()):
+        """
+        Runs a query on the logs, once every pending row was written.
+        """
+        self.catch_up()
+        with self.connection as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def flush(self, timeout=None):
+        """
+        Waits until every pending row was written.
+        :rtype: bool
+        """
+        if self.writer is None:
+            return True
+        return self.writer.flush(timeout)
+
+    def catch_up(self):
+        """
+        Waits for the pending rows before a read, a bounded time so the bot
+        never hangs on the writer.
+        :return: Whether every pending row was written.
+        :rtype: bool
+        """
+        if self.writer is None or self._bounded_flush():
+            return True
+        self.logger.warning('[x] Log writer is behind, reading the logs without its %d pending rows',
+                            self.writer.stats()['depth'])
+        return False
+
+    def _bounded_flush(self):
+        return self.writer.flush(max(self.writer.max_latency, 1.0) * self.READ_FLUSH_LATENCIES)
+
+    def _flush_at_exit(self):
+        # The same bound as reads, so a stuck writer does not hang the exit
+        if not self._bounded_flush():
+            self.logger.warning('[x] Log writer did not finish, %d pending rows are lost',
+                                self.writer.stats()['depth'])
+
+    def _insert(self, sql, values, statements):
+        if self.writer is None:
+            with self.connection as conn:
+                conn.execute(sql, values)
+                for other_sql, other_values in statements:
+                    conn.execute(other_sql, other_values)
+        else:
+            self.writer.insert(sql, values, statements)
+
+    def _path(self):
+        for _, name, path in self.connection.execute('PRAGMA database_list').fetchall():
+            if name == 'main':
+                return path
+        return None
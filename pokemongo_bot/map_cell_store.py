@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import threading
+from collections import OrderedDict
+
+from s2sphere import Cell, CellId, LatLng
+
+from pokemongo_bot.spatial_index import SpatialIndex
+
+
+class MapCellStore(object):
+    """
+    Persistent view of the map cells around the player, keyed by s2_cell_id.
+
+    GET_MAP_OBJECTS responses are merged cell by cell. A cell whose
+    current_timestamp_ms did not move since the last merge is skipped, forts
+    are kept per cell by id so delta responses only touch what changed, and
+    the pokemon lists of a returned cell replace the previous ones.
+
+    The aggregated lists handed out by views(), forts() and gyms(), and the
+    spatial indexes over them, are only rebuilt when a merge actually changed
+    something; callers must treat them as read-only.
+    """
+
+    POKEMON_KEYS = ('wild_pokemons', 'catchable_pokemons', 'nearby_pokemons')
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._cells = OrderedDict()
+        self._forts = {}
+        self._timestamps = {}
+        self._centers = {}
+
+        # Bumped whenever any cell content changes / when the fort set changes
+        self.version = 0
+        self.forts_version = 0
+
+        self._views = self._empty_views()
+        self._views_version = 0
+        self._fort_views = ([], [], SpatialIndex([]), SpatialIndex([]))
+        self._fort_views_version = 0
+
+    def since_timestamps(self, cell_ids):
+        """
+        Returns the since_timestamp_ms list matching cell_ids, so the server
+        only sends what changed in cells we already know.
+        :param cell_ids: The s2 cell ids sent with GET_MAP_OBJECTS.
+        :type cell_ids: list
+        :return: One timestamp per cell id, 0 for unknown cells.
+        :rtype: list
+        """
+        with self._lock:
+            return [self._timestamps.get(cell_id, 0) for cell_id in cell_ids]
+
+    def cell_center(self, cell_id):
+        """
+        Returns the (latitude, longitude) center of a s2 cell, cached per id.
+        :param cell_id: The s2 cell id.
+        :type cell_id: int
+        :rtype: tuple
+        """
+        center = self._centers.get(cell_id)
+
+        if center is None:
+            latlng = LatLng.from_point(Cell(CellId(cell_id)).get_center())
+            center = (latlng.lat().degrees, latlng.lng().degrees)
+            self._centers[cell_id] = center
+
+        return center
+
+    def merge(self, map_cells, cell_ids=None):
+        """
+        Merges the map_cells of a GET_MAP_OBJECTS response into the store.
+        :param map_cells: The map_cells of the response.
+        :type map_cells: list
+        :param cell_ids: The cell ids the request was made for. Stored cells
+        which are neither requested nor returned are dropped.
+        :type cell_ids: list
+        :return: True if anything changed.
+        :rtype: bool
+        """
+        with self._lock:
+            changed = False
+            forts_changed = False
+            returned = set()
+
+            for cell in map_cells:
+                cell_id = cell.get('s2_cell_id')
+                if cell_id is None:
+                    continue
+
+                returned.add(cell_id)
+                timestamp = cell.get('current_timestamp_ms', 0)
+
+                if timestamp and self._timestamps.get(cell_id) == timestamp:
+                    continue
+
+                self._timestamps[cell_id] = timestamp
+                forts_changed |= self._merge_cell(cell_id, cell)
+                changed = True
+
+            if cell_ids is not None:
+                keep = returned.union(cell_ids)
+
+                for cell_id in [c for c in self._cells if c not in keep]:
+                    del self._cells[cell_id]
+                    del self._timestamps[cell_id]
+                    forts_changed |= len(self._forts.pop(cell_id)) > 0
+                    changed = True
+
+            if changed:
+                self.version += 1
+            if forts_changed:
+                self.forts_version += 1
+
+            return changed
+
+    def _merge_cell(self, cell_id, cell):
+        stored = self._cells.get(cell_id)
+        if stored is None:
+            stored = self._cells[cell_id] = {'s2_cell_id': cell_id}
+            self._forts[cell_id] = OrderedDict()
+
+        forts = self._forts[cell_id]
+        forts_changed = False
+
+        for fort in cell.get('forts', ()):
+            fort_id = fort.get('id')
+            if forts.get(fort_id) != fort:
+                forts[fort_id] = fort
+                forts_changed = True
+
+        for object_id in cell.get('deleted_objects', ()):
+            if forts.pop(object_id, None) is not None:
+                forts_changed = True
+
+        # Nearby pokemons only carry their cell, place them at its center
+        lat, lng = self.cell_center(cell_id)
+        for pokemon in cell.get('nearby_pokemons', ()):
+            pokemon['latitude'] = lat
+            pokemon['longitude'] = lng
+            pokemon['s2_cell_id'] = cell_id
+
+        for key, value in cell.items():
+            if key not in ('forts', 'deleted_objects'):
+                stored[key] = value
+
+        for key in self.POKEMON_KEYS:
+            stored[key] = cell.get(key, [])
+
+        if forts_changed or 'forts' not in stored:
+            stored['forts'] = list(forts.values())
+
+        return forts_changed
+
+    def cells(self):
+        """
+        Returns the merged cells, including forts sent in earlier responses.
+        :rtype: list
+        """
+        with self._lock:
+            return list(self._cells.values())
+
+    def views(self):
+        """
+        Returns the combined forts and pokemons of all stored cells, in the
+        format of PokemonGoBot.cell.
+        :rtype: dict
+        """
+        with self._lock:
+            if self._views_version != self.version:
+                views = self._empty_views()
+
+                for cell in self._cells.values():
+                    views['forts'].extend(cell['forts'])
+                    for key in self.POKEMON_KEYS:
+                        views[key].extend(cell[key])
+
+                self._views = views
+                self._views_version = self.version
+
+            return self._views
+
+    def forts(self):
+        """
+        Returns the enabled, open forts with a known position.
+        :rtype: list
+        """
+        return self._get_fort_views()[0]
+
+    def gyms(self):
+        """
+        Returns the enabled, open gyms with a known position.
+        :rtype: list
+        """
+        return self._get_fort_views()[1]
+
+    def fort_index(self):
+        """
+        Returns the spatial index over forts().
+        :rtype: SpatialIndex
+        """
+        return self._get_fort_views()[2]
+
+    def gym_index(self):
+        """
+        Returns the spatial index over gyms().
+        :rtype: SpatialIndex
+        """
+        return self._get_fort_views()[3]
+
+    def _get_fort_views(self):
+        with self._lock:
+            if self._fort_views_version != self.forts_version:
+                forts = [f for f in self.views()['forts']
+                         if 'latitude' in f and 'longitude' in f and
+                         f.get('enabled') is True and 'closed' not in f]
+                gyms = [f for f in forts if 'type' not in f]
+
+                self._fort_views = (forts, gyms, SpatialIndex(forts), SpatialIndex(gyms))
+                self._fort_views_version = self.forts_version
+
+            return self._fort_views
+
+    def _empty_views(self):
+        views = {'forts': []}
+        for key in self.POKEMON_KEYS:
+            views[key] = []
+        return views
@@ -1,7 +1,7 @@
 import time
+from collections import namedtuple
 from datetime import timedelta
 from pokemongo_bot.inventory import Pokemons
-from pokemongo_bot.inventory import refresh_inventory
 from pokemongo_bot import inventory
 
 class Metrics(object):
@@ -29,6 +29,8 @@ class Metrics(object):
 
         self.player_stats = []
 
+        inventory.add_listener(self.inventory_changed)
+
     def runtime(self):
         return timedelta(seconds=round(time.time() - self.start_time))
 
@@ -105,59 +107,117 @@ class Metrics(object):
     def released_pokemon(self, count=1):
         self.releases += count
 
-    def capture_stats(self):
-        try:
-            uniq_pokemon_list = set()
-
-            if self.bot.tick_count > 0:
-                self.dust['latest'] = self.bot.stardust 
-                if self.dust['start'] < 0:
-                    self.dust['start'] = self.dust['latest']
-
-            inventory.refresh_inventory()
-            json_inventory = inventory.jsonify_inventory()
-            for item in json_inventory:
-                if 'inventory_item_data' in item:
-                    if 'player_stats' in item['inventory_item_data']:
-                        playerdata = item['inventory_item_data']['player_stats']
-                        self.player_stats = playerdata
-
-                        self.xp['latest'] = playerdata.get('experience', 0)
-                        if self.xp['start'] < 0: self.xp['start'] = self.xp['latest']
-
-                        self.visits['latest'] = playerdata.get('poke_stop_visits', 0)
-                        if self.visits['start'] < 0: self.visits['start'] = self.visits['latest']
-
-                        self.captures['latest'] = playerdata.get('pokemons_captured', 0)
-                        if self.captures['start'] < 0: self.captures['start'] = self.captures['latest']
-
-                        self.distance['latest'] = playerdata.get('km_walked', 0)
-                        if self.distance['start'] < 0: self.distance['start'] = self.distance['latest']
-
-                        self.encounters['latest'] = playerdata.get('pokemons_encountered', 0)
-                        if self.encounters['start'] < 0: self.encounters['start'] = self.encounters['latest']
+    def close(self):
+        """
+        Stops following the inventory refreshes, see inventory_changed().
+        """
+        inventory.remove_listener(self.inventory_changed)
 
-                        self.throws['latest'] = playerdata.get('pokeballs_thrown', 0)
-                        if self.throws['start'] < 0: self.throws['start'] = self.throws['latest']
+    def inventory_changed(self, inventory_items, delta):
+        """
+        Updates the counters from the items of an inventory refresh, see
+        inventory.add_listener().
+        """
+        player_stats = None
+        pokedex_ids = set()
+        for item in inventory_items:
+            data = item.get('inventory_item_data') or {}
+            if 'player_stats' in data:
+                player_stats = data['player_stats']
+            elif 'pokedex_entry' in data:
+                entry = data['pokedex_entry'].get('pokemon_id')
+                if entry:
+                    pokedex_ids.add(entry)
+
+        if player_stats:
+            self._update_player_stats(player_stats)
+        self._update_pokedex(pokedex_ids, delta)
 
-                        self.unique_mons['latest'] = playerdata.get('unique_pokedex_entries', 0)
-                        if self.unique_mons['start'] < 0: self.unique_mons['start'] = self.unique_mons['latest']
+    def capture_stats(self):
+        """
+        Brings the stardust up to date. The other counters follow the
+        inventory refreshes already, without a request of their own.
+        """
+        if self.bot.tick_count > 0:
+            self.dust['latest'] = self.bot.stardust
+            if self.dust['start'] < 0:
+                self.dust['start'] = self.dust['latest']
+
+        if not self.player_stats:
+            # Created after the inventory was loaded, catch up from it once
+            try:
+                player_stats = inventory.player().player_stats
+            except AttributeError:
+                # Nothing we can do if there's no player info.
+                return
+            if player_stats:
+                self._update_player_stats(player_stats)
+                if self.uniq_pokemons_list is None:
+                    self._update_pokedex(self._pokedex_ids(), False)
+
+    def snapshot(self):
+        """
+        Returns the session stats as of now.
+        :rtype: MetricsSnapshot
+        """
+        self.capture_stats()
+        return MetricsSnapshot(
+            runtime=self.runtime(),
+            player_stats=dict(self.player_stats or {}),
+            xp_earned=self.xp_earned(),
+            xp_per_hour=self.xp_per_hour(),
+            distance_travelled=self.distance_travelled(),
+            visits=self.num_visits(),
+            encounters=self.num_encounters(),
+            captures=self.num_captures(),
+            captures_per_hour=self.captures_per_hour(),
+            releases=self.releases,
+            evolutions=self.num_evolutions(),
+            new_mons=self.num_new_mons(),
+            throws=self.num_throws(),
+            earned_dust=self.earned_dust(),
+            stardust_per_hour=self.stardust_per_hour(),
+            total_stardust=self.total_stardust(),
+            highest_cp=self.highest_cp['desc'],
+            most_perfect=self.most_perfect['desc'],
+            next_hatching_km=self.eggs['next_hatching_km'],
+            hatched_eggs=self.eggs['hatched'],
+            uniq_caught=tuple(sorted(self.uniq_pokemons_caught or ())),
+        )
+
+    def _update_player_stats(self, playerdata):
+        self.player_stats = playerdata
+
+        for counter, key in ((self.xp, 'experience'), (self.visits, 'poke_stop_visits'),
+                             (self.captures, 'pokemons_captured'), (self.distance, 'km_walked'),
+                             (self.encounters, 'pokemons_encountered'), (self.throws, 'pokeballs_thrown'),
+                             (self.unique_mons, 'unique_pokedex_entries'), (self.evolutions, 'evolutions')):
+            counter['latest'] = playerdata.get(key, 0)
+            if counter['start'] < 0:
+                counter['start'] = counter['latest']
+
+    def _update_pokedex(self, pokedex_ids, delta):
+        if delta:
+            if not pokedex_ids:
+                return
+            if self.uniq_pokemons_list is None:
+                # Only the new entries were sent, the others are in the inventory already
+                pokedex_ids = self._pokedex_ids()
+            else:
+                pokedex_ids = pokedex_ids | self.uniq_pokemons_list | (self.uniq_pokemons_caught or set())
 
-                        self.visits['latest'] = playerdata.get('poke_stop_visits', 0)
-                        if self.visits['start'] < 0: self.visits['start'] = self.visits['latest']
+        if not self.uniq_pokemons_list:  # make set from pokedex entries on first run
+            self.uniq_pokemons_list = pokedex_ids
+        else:
+            # generate new entries for current bot session
+            self.uniq_pokemons_caught = pokedex_ids - self.uniq_pokemons_list
 
-                        self.evolutions['latest'] = playerdata.get('evolutions', 0)
-                        if self.evolutions['start'] < 0: self.evolutions['start'] = self.evolutions['latest']
-                    elif 'pokedex_entry' in item['inventory_item_data']:
-                        entry = item['inventory_item_data']['pokedex_entry'].get('pokemon_id')
-                        if entry: uniq_pokemon_list.add(entry)
 
-            if not self.uniq_pokemons_list:  # make set from pokedex entries on first run
-                self.uniq_pokemons_list = uniq_pokemon_list
-            else:
-                # generate new entries for current bot session
-                self.uniq_pokemons_caught = uniq_pokemon_list - self.uniq_pokemons_list
+    def _pokedex_ids(self):
+        return set(entry['pokemon_id'] for entry in inventory.pokedex().all() if entry.get('pokemon_id'))
 
-        except KeyError:
-            # Nothing we can do if there's no player info.
-            return
+MetricsSnapshot = namedtuple('MetricsSnapshot', [
+    'runtime', 'player_stats', 'xp_earned', 'xp_per_hour', 'distance_travelled', 'visits', 'encounters',
+    'captures', 'captures_per_hour', 'releases', 'evolutions', 'new_mons', 'throws', 'earned_dust',
+    'stardust_per_hour', 'total_stardust', 'highest_cp', 'most_perfect', 'next_hatching_km', 'hatched_eggs',
+    'uniq_caught'])
@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import itertools
+import math
+import numbers
+from operator import attrgetter
+
+import numpy as np
+
+# Above this, an int does not fit in a float without rounding
+MAX_EXACT_INT = 2 ** 53
+
+
+class PokemonScorer(object):
+    """
+    Applies the PokemonOptimizer rules to the pokemons one by one.
+
+    A rule scores each pokemon with its sort attributes and flags whether
+    it may be kept, evolved, upgraded, made buddy or favorite. groups()
+    ranks the pokemons of each group best first, best() and multi_best()
+    pick the ones worth keeping from a ranking. Rankings are lists of
+    pokemons here, ScoreTable gives the same answers with arrays.
+
+    This is the reference for ScoreTable, and the scorer used in debug
+    mode, where every score is logged.
+    """
+
+    def __init__(self, pokemons, evolve=True, log=None):
+        self.all = list(pokemons)
+        self.evolve = evolve
+        self.log = log
+        self._scores = {}
+
+    def groups(self, rule, key=None, accept_group=None, accept_pokemon=None):
+        """
+        Returns the ranking of every group, in group order.
+        :param key: The attribute to group by, all pokemons form one group
+        without.
+        :param accept_group: Tells by group value whether to rank it.
+        :param accept_pokemon: Tells by pokemon whether to rank it.
+        :return: (group value, ranking) pairs, for the groups in which
+        the rule keeps any pokemon.
+        :rtype: list
+        """
+        pokemons = self.all
+        if accept_pokemon is not None:
+            pokemons = [p for p in pokemons if accept_pokemon(p)]
+
+        if key is None:
+            groups = [(None, pokemons)]
+        else:
+            groups = itertools.groupby(sorted(pokemons, key=attrgetter(key)), attrgetter(key))
+
+        rankings = []
+        for value, members in groups:
+            if accept_group is None or accept_group(value):
+                ranking = self.score_and_sort(members, rule)
+                if ranking:
+                    rankings.append((value, ranking))
+        return rankings
+
+    def pokemons(self, ranking):
+        return list(ranking)
+
+    def score_and_sort(self, pokemon_list, rule):
+        pokemon_list = list(pokemon_list)
+
+        if self.log:
+            self.log("Pokemon %s" % pokemon_list)
+            self.log("Rule %s" % rule)
+
+        for pokemon in pokemon_list:
+            self._scores[id(pokemon)] = self.get_score(pokemon, rule)
+
+        keep = [p for p in pokemon_list if self.score(p)[1] is True]
+        keep.sort(key=lambda p: self.score(p)[0], reverse=True)
+
+        return keep
+
+    def score(self, pokemon):
+        return self._scores[id(pokemon)]
+
+    def get_score(self, pokemon, rule):
+        score = rule.score(pokemon)
+        keep = rule.keep(pokemon)
+        may_try_evolve = bool(hasattr(pokemon, "has_next_evolution") and pokemon.has_next_evolution()) and rule.evolve(pokemon)
+        may_try_upgrade = rule.upgrade(pokemon)
+        may_buddy = rule.buddy and pokemon.in_fort is False
+        may_favor = rule.favor
+
+        if self.log:
+            self.log("P:%s S:%s K:%s E:%s U:%s B:%s F:%s" % (pokemon, score, keep, may_try_evolve, may_try_upgrade, may_buddy, may_favor))
+
+        return score, keep, may_try_evolve, may_try_upgrade, may_buddy, may_favor
+
+    def best(self, pokemon_list, rule):
+        """
+        Returns the pokemons of a ranking to keep, try to evolve, try to
+        upgrade, make buddy and make favorite.
+        """
+        pokemon_list = list(pokemon_list)
+
+        if len(pokemon_list) == 0:
+            return ([], [], [], [], [])
+
+        top = rule.top
+        index = int(math.ceil(top)) - 1
+
+        if 0 < top < 1:
+            # The top fraction of the best score
+            worst = tuple(v * (1 - top) for v in self.score(pokemon_list[0])[0])
+        elif 0 <= index < len(pokemon_list):
+            worst = self.score(pokemon_list[index])[0]
+        else:
+            worst = self.score(pokemon_list[-1])[0]
+
+        return self.better(pokemon_list, worst)
+
+    def multi_best(self, family_list, rule, nb_branch):
+        """
+        Same as best(), for a family evolving into nb_branch pokemons: the
+        best of each final evolution is kept.
+        """
+        family_list = list(family_list)
+
+        if len(family_list) == 0:
+            return ([], [], [], [], [])
+
+        # Handle each group of senior independently
+        senior_pokemon_list = [p for p in family_list if not p.has_next_evolution()]
+        other_family_list = [p for p in family_list if p.has_next_evolution()]
+        senior_pids = set(p.pokemon_id for p in senior_pokemon_list)
+
+        keep_all = []
+        try_evolve_all = []
+        try_upgrade_all = []
+        buddy_all = []
+        favor_all = []
+
+        if not self.evolve:
+            # Player handle evolution manually = Fall-back to per Pokemon behavior
+            for _, pokemon_list in itertools.groupby(sorted(family_list, key=attrgetter("pokemon_id")), attrgetter("pokemon_id")):
+                keep, try_evolve, try_upgrade, buddy, favor = self.best(pokemon_list, rule)
+                keep_all += keep
+                try_evolve_all += try_evolve
+                try_upgrade_all += try_upgrade
+                buddy_all += buddy
+                favor_all += favor
+        else:
+            for _, pokemon_list in itertools.groupby(sorted(senior_pokemon_list, key=attrgetter("pokemon_id")), attrgetter("pokemon_id")):
+                keep, try_evolve, try_upgrade, buddy, favor = self.best(pokemon_list, rule)
+                keep_all += keep
+                try_evolve_all += try_evolve
+                try_upgrade_all += try_upgrade
+                buddy_all += buddy
+                favor_all += favor
+
+            if len(other_family_list) > 0:
+                best = keep_all + try_evolve_all + try_upgrade_all
+
+                if len(senior_pids) < nb_branch or len(best) == 0:
+                    # We did not get every combination yet = All other Pokemon are potentially good to keep
+                    worst = other_family_list[-1]
+                else:
+                    best.sort(key=lambda p: self.score(p)[0], reverse=True)
+                    worst = best[-1]
+
+                keep, try_evolve, try_upgrade, buddy, favor = self.better(other_family_list, self.score(worst)[0], 12)
+                keep_all += keep
+                try_evolve_all += try_evolve
+                try_upgrade_all += try_upgrade
+                buddy_all += buddy
+                favor_all += favor
+
+        return keep_all, try_evolve_all, try_upgrade_all, buddy_all, favor_all
+
+    def better(self, pokemon_list, worst, limit=1000):
+        keep = [p for p in pokemon_list if self.score(p)[0] >= worst][:limit]
+        try_evolve = [p for p in keep if self.score(p)[2] is True]
+        try_upgrade = [p for p in keep if (self.score(p)[2] is False) and (self.score(p)[3] is True)]
+        buddy = [p for p in keep if self.score(p)[4] is True]
+        favor = [p for p in keep if self.score(p)[5] is True]
+
+        return keep, try_evolve, try_upgrade, buddy, favor
+
+
+class RuleScores(object):
+    """
+    The scores of every pokemon for one rule: a column per sort attribute
+    and a mask per flag.
+    """
+
+    __slots__ = ('keys', 'keep', 'evolve', 'upgrade', 'buddy', 'favor')
+
+    def key(self, i):
+        return tuple(k[i] for k in self.keys)
+
+
+class ScoreTable(PokemonScorer):
+    """
+    Applies the PokemonOptimizer rules to a whole box at once.
+
+    The attributes the rules read are loaded once into one array each, so
+    a rule is a handful of array operations instead of attribute lookups
+    per pokemon. Groups are ranked with a single lexsort, by group and
+    then by score, and rankings are index arrays into the box. Decisions
+    are the same as PokemonScorer's.
+
+    Raises TypeError when a rule reads an attribute which is not a number,
+    PokemonScorer handles those.
+    """
+
+    def __init__(self, pokemons, rules, evolve=True):
+        super(ScoreTable, self).__init__(pokemons, evolve)
+        self._rule_scores = {}
+
+        attributes = set()
+        for rule in rules:
+            attributes.update(rule.attributes)
+
+        self.columns = dict((a, _column([getattr(p, a, 0) for p in self.all])) for a in attributes)
+        self.group_columns = {
+            "pokemon_id": np.array([p.pokemon_id for p in self.all], dtype=np.int64),
+            "first_evolution_id": np.array([p.first_evolution_id for p in self.all], dtype=np.int64)
+        }
+        self.has_next = np.array([bool(p.has_next_evolution()) for p in self.all], dtype=bool)
+        self.not_in_fort = np.array([p.in_fort is False for p in self.all], dtype=bool)
+
+    def groups(self, rule, key=None, accept_group=None, accept_pokemon=None):
+        scores = self.scores(rule)
+        members = scores.keep
+        if accept_pokemon is not None:
+            members = members & np.array([bool(accept_pokemon(p)) for p in self.all], dtype=bool)
+        members = np.flatnonzero(members)
+
+        if key is None:
+            group = np.zeros(len(members), dtype=np.int64)
+        else:
+            group = self.group_columns[key][members]
+
+        # Stable, so ties keep the box order like list.sort
+        order = np.lexsort([-k[members] for k in reversed(scores.keys)] + [group])
+        ranked = members[order]
+        group = group[order]
+
+        groups = []
+        for part in np.split(np.arange(len(ranked)), np.flatnonzero(group[1:] != group[:-1]) + 1):
+            if len(part) == 0:
+                continue
+            value = None if key is None else int(group[part[0]])
+            if accept_group is None or accept_group(value):
+                groups.append((value, (scores, ranked[part])))
+        return groups
+
+    def pokemons(self, ranking):
+        return [self.all[i] for i in ranking[1]]
+
+    def scores(self, rule):
+        """
+        Returns the scores of the box for rule.
+        :rtype: RuleScores
+        """
+        rule_id = id(rule)
+        if rule_id in self._rule_scores:
+            return self._rule_scores[rule_id][1]
+
+        n = len(self.all)
+        scores = RuleScores()
+        scores.keys = [-self.columns[a] if negate else self.columns[a] for a, negate in rule.sort]
+        scores.keep = self._satisfy(rule.keep)
+        scores.evolve = self.has_next & self._satisfy(rule.evolve)
+        scores.upgrade = self._satisfy(rule.upgrade)
+        scores.buddy = self.not_in_fort & rule.buddy
+        scores.favor = np.full(n, rule.favor, dtype=bool)
+
+        # Keep the rule itself, its id must not be reused while cached
+        self._rule_scores[rule_id] = (rule, scores)
+        return scores
+
+    def best(self, ranking, rule):
+        scores, members = ranking
+        if len(members) == 0:
+            return self._parts(scores, members)
+
+        top = rule.top
+        index = int(math.ceil(top)) - 1
+
+        if 0 < top < 1:
+            worst = tuple(v * (1 - top) for v in scores.key(members[0]))
+        elif 0 <= index < len(members):
+            worst = scores.key(members[index])
+        else:
+            worst = scores.key(members[-1])
+
+        return self.better(ranking, worst)
+
+    def multi_best(self, ranking, rule, nb_branch):
+        scores, members = ranking
+        if len(members) == 0:
+            return self._parts(scores, members)
+
+        senior = members[~self.has_next[members]]
+        other = members[self.has_next[members]]
+
+        results = [[] for _ in range(5)]
+
+        def add(parts):
+            for result, part in zip(results, parts):
+                result.append(part[1])
+
+        if not self.evolve:
+            for part in self._by_pokemon_id(members):
+                add(self.best((scores, part), rule))
+        else:
+            for part in self._by_pokemon_id(senior):
+                add(self.best((scores, part), rule))
+
+            if len(other) > 0:
+                best = np.concatenate(results[0] + results[1] + results[2] + [members[:0]])
+
+                if len(set(self.group_columns["pokemon_id"][senior])) < nb_branch or len(best) == 0:
+                    worst = scores.key(other[-1])
+                elif scores.keys:
+                    lowest = np.lexsort([k[best] for k in reversed(scores.keys)])[0]
+                    worst = scores.key(best[lowest])
+                else:
+                    worst = ()
+
+                add(self.better((scores, other), worst, 12))
+
+        return tuple((scores, np.concatenate(result) if result else np.array([], dtype=np.intp)) for result in results)
+
+    def better(self, ranking, worst, limit=1000):
+        scores, members = ranking
+
+        # Tuple comparison, from the last sort attribute to the first
+        at_least = np.ones(len(members), dtype=bool)
+        for k, w in reversed(list(zip(scores.keys, worst))):
+            values = k[members]
+            at_least = (values > w) | ((values == w) & at_least)
+
+        keep = members[at_least][:limit]
+        evolve = scores.evolve[keep]
+        return ((scores, keep),
+                (scores, keep[evolve]),
+                (scores, keep[~evolve & scores.upgrade[keep]]),
+                (scores, keep[scores.buddy[keep]]),
+                (scores, keep[scores.favor[keep]]))
+
+    def _by_pokemon_id(self, members):
+        pokemon_ids = self.group_columns["pokemon_id"][members]
+        order = np.argsort(pokemon_ids, kind="mergesort")
+        members, pokemon_ids = members[order], pokemon_ids[order]
+        return np.split(members, np.flatnonzero(pokemon_ids[1:] != pokemon_ids[:-1]) + 1)
+
+    def _parts(self, scores, members):
+        return tuple((scores, members) for _ in range(5))
+
+    def _satisfy(self, req):
+        n = len(self.all)
+        if not req.enabled or req.ranges is None:
+            return np.full(n, req.enabled and req.setting, dtype=bool)
+
+        satisfy = np.ones(n, dtype=bool)
+
+        for a, ranges in req.ranges:
+            value = self.columns[a]
+            satisfy_range = np.zeros(n, dtype=bool)
+
+            for low, high in ranges:
+                satisfy_range |= (value >= low) & (value <= high)
+
+            satisfy &= satisfy_range
+
+        return satisfy
+
+
+def _column(values):
+    for value in values:
+        if not isinstance(value, numbers.Real) or (isinstance(value, numbers.Integral) and abs(value) > MAX_EXACT_INT):
+            raise TypeError("Can not score on {!r}".format(value))
+    return np.array(values, dtype=np.float64)
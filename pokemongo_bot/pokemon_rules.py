@@ -0,0 +1,390 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import numbers
+import threading
+
+from pokemongo_bot.tree_config_builder import ConfigException
+
+text_type = type(u"")
+
+LOGIC = {
+    'or': lambda x, y, z: x or y or z,
+    'and': lambda x, y, z: x and y and z,
+    'orand': lambda x, y, z: x or y and z,
+    'andor': lambda x, y, z: x and y or z
+}
+
+INFINITY = float("inf")
+
+
+def number(value, what):
+    """
+    Returns a threshold of the config as a number, numeric strings are
+    accepted.
+    :raise: ConfigException: When the value is not a number.
+    """
+    if isinstance(value, (bytes, text_type)):
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    elif isinstance(value, numbers.Real):
+        return value
+
+    raise ConfigException("{} must be a number, not {!r}".format(what, value))
+
+
+def count(value, what):
+    """
+    Returns an amount of the config as an int.
+    :raise: ConfigException: When the value is not a positive integer.
+    """
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ConfigException("{} must be an integer, not {!r}".format(what, value))
+
+    if value < 0:
+        raise ConfigException("{} can not be negative".format(what))
+    return value
+
+
+def logic(value, allowed, what):
+    """
+    Returns the function combining the three checks of a logic setting.
+    :raise: ConfigException: When the logic is not one of allowed.
+    """
+    if value not in allowed:
+        raise ConfigException("{} must be one of {}, not {!r}".format(what, ", ".join(allowed), value))
+    return LOGIC[value]
+
+
+def enabled(setting):
+    return setting not in [False, {}]
+
+
+class Requirement(object):
+    """
+    The requirement of an optimizer rule: True or False, or a dict of
+    attribute to what its value must be:
+
+    - a number (or a numeric string): at least that much
+    - a negative number: at most its opposite
+    - [low, high]: in that range
+    - [[low, high], ...]: in one of those ranges
+
+    Every condition is compiled to a list of ranges, so a pokemon is
+    checked with comparisons only, and ScoreTable can check whole columns
+    the same way.
+    """
+
+    __slots__ = ('setting', 'enabled', 'ranges')
+
+    def __init__(self, setting, what="requirement"):
+        self.setting = setting
+        self.enabled = enabled(setting)
+
+        if type(setting) is bool:
+            self.ranges = None
+        elif isinstance(setting, dict):
+            self.ranges = [(a, self._ranges(v, "{} {}".format(what, a))) for a, v in setting.items()]
+        else:
+            raise ConfigException("{} must be true, false or a dict, not {!r}".format(what, setting))
+
+    @property
+    def attributes(self):
+        return [a for a, _ in self.ranges or []]
+
+    def satisfied(self, pokemon):
+        if self.ranges is None:
+            return self.setting
+
+        for a, ranges in self.ranges:
+            value = getattr(pokemon, a, 0)
+            if not any(low <= value <= high for low, high in ranges):
+                return False
+        return True
+
+    def __call__(self, pokemon):
+        """
+        Tells whether the rule allows it for pokemon, like the setting
+        being enabled and satisfied.
+        """
+        return self.enabled and self.satisfied(pokemon)
+
+    @staticmethod
+    def _ranges(value, what):
+        if type(value) is list:
+            if value and type(value[0]) is list:
+                return [Requirement._range(r, what) for r in value]
+            return [Requirement._range(value, what)]
+
+        value = number(value, what)
+        if value < 0:
+            return [(-INFINITY, abs(value))]
+        return [(value, INFINITY)]
+
+    @staticmethod
+    def _range(value, what):
+        if type(value) is not list or len(value) != 2:
+            raise ConfigException("{} range must be [low, high], not {!r}".format(what, value))
+        return (number(value[0], what), number(value[1], what))
+
+
+class OptimizerRule(object):
+    """
+    A rule of the PokemonOptimizer config.
+    """
+
+    MODES = ("by_pokemon", "by_family", "overall")
+
+    def __init__(self, setting):
+        if not isinstance(setting, dict):
+            raise ConfigException("Optimizer rule must be a dict, not {!r}".format(setting))
+
+        self.setting = setting
+        self.mode = setting.get("mode", "by_family")
+        if self.mode not in self.MODES:
+            raise ConfigException("Optimizer rule mode must be one of {}, not {!r}".format(", ".join(self.MODES), self.mode))
+
+        self.names = setting.get("names", [])
+
+        top = setting.get("top", 0)
+        self.top = 0 if top == "all" else max(number(top, "Optimizer rule top"), 0)
+        # Would the rule keep every pokemon it sees
+        self.keeps_all = setting.get("top", "all") == "all" and self.names == [] and bool(setting.get("keep", True))
+
+        sort = setting.get("sort", [])
+        if type(sort) is not list or not all(isinstance(a, (bytes, text_type)) and a.lstrip("-") for a in sort):
+            raise ConfigException("Optimizer rule sort must be a list of attributes, not {!r}".format(sort))
+        self.sort = [(a[1:], True) if a[0] == "-" else (a, False) for a in sort]
+
+        self.keep = Requirement(setting.get("keep", True), "Optimizer rule keep")
+        self.evolve = Requirement(setting.get("evolve", True), "Optimizer rule evolve")
+        self.upgrade = Requirement(setting.get("upgrade", False), "Optimizer rule upgrade")
+        self.buddy = enabled(setting.get("buddy", False))
+        self.favor = enabled(setting.get("favorite", False))
+
+    @property
+    def attributes(self):
+        """
+        Every attribute the rule reads.
+        :rtype: set
+        """
+        attributes = set(a for a, _ in self.sort)
+        for req in (self.keep, self.evolve, self.upgrade):
+            attributes.update(req.attributes)
+        return attributes
+
+    def score(self, pokemon):
+        return tuple(-getattr(pokemon, a, 0) if negate else getattr(pokemon, a, 0) for a, negate in self.sort)
+
+
+class CatchRule(object):
+    """
+    The entry of a pokemon in the catch or vips config.
+    """
+
+    THRESHOLDS = ('catch_above_ncp', 'catch_above_cp', 'catch_below_cp', 'catch_above_iv')
+
+    def __init__(self, setting, default_logic='and'):
+        if not isinstance(setting, dict):
+            raise ConfigException("Catch config must be a dict, not {!r}".format(setting))
+
+        self.setting = setting
+        self.logic_name = setting.get('logic', default_logic)
+        self.logic = logic(self.logic_name, sorted(LOGIC), "Catch logic")
+
+        self.candy_threshold = number(setting.get('candy_threshold', -1), "candy_threshold")
+        self.never_catch = setting.get('never_catch', False)
+        self.always_catch = setting.get('always_catch', False)
+        self.only_catch_better_cp = setting.get('only_catch_better_cp', False)
+        self.only_catch_better_iv = setting.get('only_catch_better_iv', False)
+
+        # A threshold below 0 is not set
+        thresholds = dict((t, number(setting.get(t, -1), t)) for t in self.THRESHOLDS)
+        self.above_ncp, self.above_cp, self.below_cp, self.above_iv = [
+            thresholds[t] if thresholds[t] >= 0 else None for t in self.THRESHOLDS]
+
+        self.fast_attacks = frozenset(text_type(a) for a in setting.get('fast_attack', []))
+        self.charged_attacks = frozenset(text_type(a) for a in setting.get('charged_attack', []))
+
+        # What a check counts as when it is not set, by logic
+        self.unset = {
+            'and': (True, True, True),
+            'andor': (True, True, False),
+            'orand': (False, True, True)
+        }.get(self.logic_name, (False, False, False))
+
+    def has_enough_candies(self, candies):
+        return self.candy_threshold > 0 and candies >= self.candy_threshold
+
+    def results(self, pokemon):
+        """
+        Returns the result of every check on pokemon: ncp, cp, iv, fast
+        attack and charged attack.
+        :rtype: tuple
+        """
+        ncp = self.above_ncp is not None and pokemon.cp_percent >= self.above_ncp
+        cp = ((self.above_cp is not None and pokemon.cp >= self.above_cp) or
+              (self.below_cp is not None and pokemon.cp <= self.below_cp))
+        iv = self.above_iv is not None and pokemon.iv > self.above_iv
+        fa = not self.fast_attacks or text_type(pokemon.fast_attack) in self.fast_attacks
+        ca = not self.charged_attacks or text_type(pokemon.charged_attack) in self.charged_attacks
+        return ncp, cp, iv, fa, ca
+
+    def matches(self, results):
+        """
+        Tells whether results, as returned by results(), pass the rule.
+        """
+        ncp, cp, iv, fa, ca = results
+        checks = (ncp if self.above_ncp is not None else self.unset[0],
+                  cp if self.above_cp is not None or self.below_cp is not None else self.unset[1],
+                  iv if self.above_iv is not None else self.unset[2])
+        return bool(self.logic(*checks)) and fa and ca
+
+
+class ReleaseRule(object):
+    """
+    The entry of a pokemon in the release config.
+    """
+
+    THRESHOLDS = ('release_below_cp', 'release_below_iv', 'release_below_ivcp')
+    KEEP_BEST_CRITERIA = ['cp', 'iv', 'iv_attack', 'iv_defense', 'iv_stamina', 'ivcp',
+                          'moveset.attack_perfection', 'moveset.defense_perfection', 'hp', 'hp_max']
+
+    def __init__(self, setting, default_logic='and'):
+        if not isinstance(setting, dict):
+            raise ConfigException("Release config must be a dict, not {!r}".format(setting))
+
+        self.setting = setting
+        self.logic_name = setting.get('logic') or default_logic
+        self.logic = logic(self.logic_name, ['and', 'or'], "Release logic")
+
+        self.never_release = setting.get('never_release', False)
+        self.always_release = setting.get('always_release', False)
+        self.has_release_rules = any(k in setting for k in ('never_release', 'always_release') + self.THRESHOLDS)
+
+        self.below_cp, self.below_iv, self.below_ivcp = [number(setting.get(t, 0), t) for t in self.THRESHOLDS]
+        # With "and", a threshold set to 0 fails while a missing one passes
+        self.zeroed = tuple(t in setting and setting[t] == 0 for t in self.THRESHOLDS)
+
+        self.keep_best_cp, self.keep_best_iv, self.keep_best_ivcp = [
+            count(setting.get(k) or 0, k) for k in ('keep_best_cp', 'keep_best_iv', 'keep_best_ivcp')]
+        self.keep_best = bool(self.keep_best_cp or self.keep_best_iv or self.keep_best_ivcp)
+
+        self.keep_best_criteria = []
+        self.keep_amount = 0
+        if setting.get('keep_best_custom') and setting.get('amount'):
+            self.keep_best_criteria = [str(c) for c in setting['keep_best_custom'].replace(' ', '').split(',')]
+            for criteria in self.keep_best_criteria:
+                if criteria not in self.KEEP_BEST_CRITERIA:
+                    raise ConfigException("keep_best_custom can not sort by {}, only by {}".format(criteria, ", ".join(self.KEEP_BEST_CRITERIA)))
+            self.keep_amount = count(setting['amount'], "amount")
+        self.keep_best_custom = bool(self.keep_best_criteria)
+
+    def release(self, pokemon):
+        """
+        Tells whether pokemon should be released by the thresholds.
+        """
+        if self.never_release:
+            return False
+
+        if self.always_release:
+            return True
+
+        thresholds = (self.below_cp, self.below_iv, self.below_ivcp)
+        if not any(thresholds):
+            return False
+
+        values = (pokemon.cp, pokemon.iv, pokemon.ivcp)
+        if self.logic_name == 'and':
+            results = [not zeroed and (not t or v < t) for zeroed, t, v in zip(self.zeroed, thresholds, values)]
+        else:
+            results = [bool(t) and v < t for t, v in zip(thresholds, values)]
+        return bool(self.logic(*results))
+
+
+class EvolveRule(object):
+    """
+    The EvolvePokemon settings deciding which pokemons to evolve.
+    """
+
+    def __init__(self, setting):
+        self.above_cp = number(setting.get('evolve_above_cp', 500), "evolve_above_cp")
+        self.above_iv = number(setting.get('evolve_above_iv', 0.8), "evolve_above_iv")
+        logic_name = setting.get('logic', 'or')
+        self.logic = logic(logic_name, ['and', 'or'], "Evolve logic")
+        # The third check of the logic, which does not change its result
+        self.neutral = logic_name == 'and'
+
+        self.evolve_list = self._names(setting.get('evolve_list', []))
+        self.donot_evolve_list = self._names(setting.get('donot_evolve_list', []))
+
+        self.evolve_all = len(self.evolve_list) > 0 and self.evolve_list[0] == 'all'
+        self.evolve_names = frozenset(self.evolve_list)
+        self.donot_evolve_names = frozenset(self.donot_evolve_list)
+        if self.donot_evolve_list and self.donot_evolve_list[0] == 'none':
+            self.donot_evolve_names = frozenset()
+
+    def should_evolve(self, pokemon):
+        if pokemon.unique_id > 0 and pokemon.has_next_evolution():
+            if self.logic(pokemon.cp >= self.above_cp, pokemon.iv >= self.above_iv, self.neutral):
+                name = pokemon.name.lower()
+                if name in self.donot_evolve_names:
+                    return False
+                return self.evolve_all or name in self.evolve_names
+        return False
+
+    @staticmethod
+    def _names(names):
+        if isinstance(names, (bytes, text_type)):
+            return [str(name).lower().strip() for name in names.split(',')]
+        return list(names)
+
+
+class NamedRules(object):
+    """
+    The rules of a config keyed by pokemon name, compiled once.
+
+    Names without an entry get the 'any' entry. With empty_is_missing, an
+    empty entry gets it too.
+    """
+
+    def __init__(self, setting, compile_rule, empty_is_missing=False):
+        self.empty_is_missing = empty_is_missing
+        self.rules = {}
+        for name, rule in (setting or {}).items():
+            if rule or not empty_is_missing:
+                self.rules[name] = compile_rule(rule) if rule else None
+        self.any = self.rules.get('any')
+
+    def get(self, name):
+        """
+        Returns the rule for name.
+        :return: The rule, or None without one.
+        """
+        return self.rules.get(name, self.any)
+
+
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+def named_rules(setting, rule_class, empty_is_missing=False, **options):
+    """
+    Returns NamedRules of rule_class for setting, compiled on the first
+    call for that setting only.
+    """
+    key = (id(setting), rule_class, empty_is_missing, tuple(sorted(options.items())))
+    with _compiled_lock:
+        if key in _compiled:
+            return _compiled[key][1]
+
+    rules = NamedRules(setting, lambda rule: rule_class(rule, **options), empty_is_missing)
+
+    with _compiled_lock:
+        # Keep the setting itself, its id must not be reused while cached
+        _compiled[key] = (setting, rules)
+    return rules
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import itertools
+import threading
+import time
+
+
+def backoff(attempt, base=1.0, cap=30.0):
+    """
+    Returns the delay before retry number attempt (starting at 1), doubling
+    from base up to cap. Sleep with human_behaviour.sleep, which adds jitter.
+    :rtype: float
+    """
+    return min(cap, base * 2 ** max(0, attempt - 1))
+
+
+class TokenBucket(object):
+    """
+    Holds up to burst tokens, refilled at rate tokens per second.
+    """
+
+    def __init__(self, rate, burst=1, clock=time.time):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated = clock()
+
+    def delay(self, now=None):
+        """
+        Returns the seconds to wait before a token is available.
+        :rtype: float
+        """
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now=None):
+        self._refill(now)
+        self.tokens -= 1
+
+    def drain(self, now=None):
+        self._refill(now)
+        self.tokens = min(self.tokens, 0.0)
+
+    def _refill(self, now):
+        if now is None:
+            now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class RateLimiter(object):
+    """
+    Shared scheduler for the RPCs of one account.
+
+    Every request takes a token from the account bucket, and one from the
+    bucket of each of its request types that has a budget of its own.
+    Waiting requests go by priority lane, then in arrival order: a catch
+    waiting for a token goes before a nickname which came earlier. A
+    request only waits behind others that could actually be sent, so an
+    exhausted map budget does not hold back inventory calls.
+
+    Budgets are a rate in requests per second, or a dict with rate and
+    burst, keyed by request type name:
+
+        {"GET_MAP_OBJECTS": 0.2, "ENCOUNTER": {"rate": 1, "burst": 3}}
+    """
+
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+    LANES = {HIGH: 'high', NORMAL: 'normal', LOW: 'low'}
+
+    PRIORITIES = {
+        'ENCOUNTER': HIGH,
+        'DISK_ENCOUNTER': HIGH,
+        'INCENSE_ENCOUNTER': HIGH,
+        'CATCH_POKEMON': HIGH,
+        'USE_ITEM_CAPTURE': HIGH,
+        'USE_ITEM_ENCOUNTER': HIGH,
+        'NICKNAME_POKEMON': LOW,
+        'SET_FAVORITE_POKEMON': LOW,
+        'RECYCLE_INVENTORY_ITEM': LOW,
+        'LEVEL_UP_REWARDS': LOW,
+        'CHECK_AWARDED_BADGES': LOW,
+        'GET_INBOX': LOW,
+        'SET_BUDDY_POKEMON': LOW,
+        'SET_PLAYER_TEAM': LOW,
+        'UPGRADE_POKEMON': LOW,
+    }
+
+    DEFAULT_RATE = 2.0
+
+    def __init__(self, rate=DEFAULT_RATE, burst=1, budgets=None, clock=time.time):
+        self.clock = clock
+        self.bucket = TokenBucket(rate, burst, clock)
+        self.budgets = {}
+        for request_type, budget in (budgets or {}).items():
+            if not isinstance(budget, dict):
+                budget = {'rate': budget}
+            self.budgets[request_type.upper()] = TokenBucket(budget['rate'], budget.get('burst', 1), clock)
+
+        self._cond = threading.Condition(threading.Lock())
+        self._waiting = []
+        self._counter = itertools.count()
+        self._stats = dict((lane, {'count': 0, 'total_wait': 0.0, 'max_wait': 0.0})
+                           for lane in self.LANES.values())
+
+    def priority(self, request_types):
+        """
+        Returns the lane of a request, the most urgent of its subrequests.
+        :rtype: int
+        """
+        return min([self.PRIORITIES.get(t.upper(), self.NORMAL) for t in request_types] or [self.NORMAL])
+
+    def acquire(self, request_types):
+        """
+        Blocks until the request may be sent and takes its tokens.
+        :param request_types: The subrequest names of the request.
+        :type request_types: list
+        :return: The seconds spent waiting.
+        :rtype: float
+        """
+        buckets = [self.budgets[t.upper()] for t in set(request_types) if t.upper() in self.budgets]
+        ticket = (self.priority(request_types), next(self._counter), buckets)
+        start = self.clock()
+
+        with self._cond:
+            self._waiting.append(ticket)
+            self._waiting.sort(key=lambda waiter: waiter[0:2])
+            try:
+                while True:
+                    now = self.clock()
+                    delay = self._turn(ticket, now)
+                    if delay <= 0:
+                        for bucket in [self.bucket] + buckets:
+                            bucket.take(now)
+                        break
+                    self._cond.wait(delay)
+            finally:
+                self._waiting.remove(ticket)
+                self._cond.notify_all()
+
+        waited = self.clock() - start
+        stats = self._stats[self.LANES[ticket[0]]]
+        stats['count'] += 1
+        stats['total_wait'] += waited
+        stats['max_wait'] = max(stats['max_wait'], waited)
+        return waited
+
+    def throttled(self):
+        """
+        Empties the account bucket after the server asked us to slow down,
+        so every pending request waits for a fresh token.
+        """
+        with self._cond:
+            self.bucket.drain()
+
+    def stats(self):
+        """
+        Returns the queue wait metrics per lane: count, total_wait, max_wait
+        and mean_wait, in seconds.
+        :rtype: dict
+        """
+        with self._cond:
+            stats = {}
+            for lane, values in self._stats.items():
+                values = dict(values)
+                values['mean_wait'] = values['total_wait'] / values['count'] if values['count'] else 0.0
+                stats[lane] = values
+            return stats
+
+    def _turn(self, ticket, now):
+        # Seconds until ticket may go, the first waiter whose own budgets
+        # allow it is the only one competing for the account bucket
+        for waiter in self._waiting:
+            delay = max([bucket.delay(now) for bucket in waiter[2]] or [0.0])
+            if delay <= 0:
+                if waiter is ticket:
+                    return self.bucket.delay(now)
+                break
+            if waiter is ticket:
+                return delay
+
+        return max(self.bucket.delay(now), 0.01)
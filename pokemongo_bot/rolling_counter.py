@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import time
+
+
+class RollingCounter(object):
+    """
+    Counts events over the last window seconds, in constant time.
+
+    Events are counted in a ring of time buckets, the oldest bucket being
+    cleared as time moves past it, so the count covers the window up to
+    one bucket more. A running total makes count() not depend on how many
+    events there are.
+    """
+
+    WINDOW = 24 * 60 * 60  # seconds
+    BUCKET = 60  # seconds
+
+    def __init__(self, window=WINDOW, bucket=BUCKET):
+        self.bucket = bucket
+        # One more for the current bucket, which only started
+        self.counts = [0] * (int(window // bucket) + 1)
+        self.total = 0
+        # The bucket number of now, as of the last update
+        self.current = int(time.time() // bucket)
+
+    def add(self, count=1, at=None):
+        """
+        Counts events.
+        :param at: When they happened, now by default.
+        :type at: float
+        """
+        now = self._advance()
+        number = now if at is None else min(int(at // self.bucket), now)
+        if number <= now - len(self.counts):
+            return
+        self.counts[number % len(self.counts)] += count
+        self.total += count
+
+    def count(self):
+        self._advance()
+        return self.total
+
+    def _advance(self):
+        now = int(time.time() // self.bucket)
+        if now > self.current:
+            for number in range(self.current + 1, min(now, self.current + len(self.counts)) + 1):
+                index = number % len(self.counts)
+                self.total -= self.counts[index]
+                self.counts[index] = 0
+            self.current = now
+        return self.current
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, unicode_literals
+
+import threading
+from collections import OrderedDict
+from difflib import SequenceMatcher
+
+
+class NameResolver(object):
+    """
+    Resolves pokemon names as typed by users or sent by sniper feeds to the
+    names of the Pokedex.
+
+    Names are compared normalized: lower case, the gender signs spelled as
+    f and m, and anything but letters and digits left out, so "Mr-Mime",
+    "mr. mime" and "Nidoran♂" resolve without any fuzzy matching.
+
+    Other names go to the closest Pokedex name by difflib ratio, at least
+    CUTOFF, among the names sharing a bigram with it. The bigrams of every
+    name are indexed up front, so a lookup does not scan the Pokedex.
+    Resolutions are kept in an LRU cache, as feeds repeat the same
+    misspellings on every poll.
+    """
+
+    CUTOFF = 0.6
+    CACHE_SIZE = 1024
+
+    def __init__(self, names, cutoff=CUTOFF, cache_size=CACHE_SIZE):
+        self.cutoff = cutoff
+        self.cache_size = cache_size
+
+        self._names = {}
+        self._bigrams = {}
+        for name in names:
+            key = normalize(name)
+            if key in self._names:
+                continue
+            self._names[key] = name
+            for bigram in bigrams(key):
+                self._bigrams.setdefault(bigram, set()).add(key)
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, name):
+        """
+        Returns the Pokedex name closest to name.
+        :return: The name, or None when nothing is close enough.
+        :rtype: str
+        """
+        if not name:
+            return None
+
+        with self._lock:
+            if name in self._cache:
+                resolved = self._cache.pop(name)
+                self._cache[name] = resolved
+                return resolved
+
+        resolved = self._resolve(name)
+
+        with self._lock:
+            self._cache[name] = resolved
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return resolved
+
+    def _resolve(self, name):
+        key = normalize(name)
+        if key in self._names:
+            return self._names[key]
+
+        candidates = set()
+        for bigram in bigrams(key):
+            candidates.update(self._bigrams.get(bigram, ()))
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(key)
+        best = None
+        best_score = self.cutoff
+        # Sorted, so that ties always go the same way
+        for candidate in sorted(candidates):
+            matcher.set_seq1(candidate)
+            if matcher.real_quick_ratio() < best_score or matcher.quick_ratio() < best_score:
+                continue
+            score = matcher.ratio()
+            if score > best_score or (score == best_score and best is None):
+                best, best_score = candidate, score
+
+        return self._names[best] if best is not None else None
+
+
+def normalize(name):
+    name = name.lower().replace('♀', 'f').replace('♂', 'm')
+    return ''.join(c for c in name if c.isalnum())
+
+
+def bigrams(key):
+    # Padded, so a first or last letter alone counts too
+    padded = '^{}$'.format(key)
+    return set(padded[i:i + 2] for i in range(len(padded) - 1))
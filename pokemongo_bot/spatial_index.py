@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+from math import cos, radians, sqrt
+
+import numpy as np
+
+from pokemongo_bot.cell_workers.utils import coordinates, distance, distances_from
+
+EARTH_RADIUS = 6371000.0
+# Relative error allowed for the local projection when picking candidates.
+# Final answers are always checked with the real great circle distance.
+PROJECTION_MARGIN = 0.05
+
+
+class SpatialIndex(object):
+    """
+    Uniform grid over forts (or any dict with latitude/longitude) projected
+    on a local equirectangular plane around the first point.
+
+    The grid is only used to pick candidates; distances returned and compared
+    against radii are real great circle distances, so results match a plain
+    scan over cell_workers.utils.distance. Build one per fort set and throw
+    it away when the set changes.
+    """
+
+    CELL_SIZE = 100.0  # meters
+
+    def __init__(self, points, cell_size=CELL_SIZE):
+        self.points = list(points)
+        self.cell_size = float(cell_size)
+        self._grid = {}
+        self._sorted_cache = (None, None)
+
+        if self.points:
+            self._lat0 = self.points[0]['latitude']
+        else:
+            self._lat0 = 0.0
+        self._kx = EARTH_RADIUS * radians(1) * cos(radians(self._lat0))
+        self._ky = EARTH_RADIUS * radians(1)
+
+        self._lats, self._lngs = coordinates(self.points)
+        self._xy = [self._project(p['latitude'], p['longitude']) for p in self.points]
+        for index, (x, y) in enumerate(self._xy):
+            self._grid.setdefault(self._key(x, y), []).append(index)
+
+    def __len__(self):
+        return len(self.points)
+
+    def nearest(self, lat, lng, k=None):
+        """
+        Returns the k points closest to lat/lng, closest first.
+        :param k: The number of points wanted, None for all of them.
+        :type k: int
+        :rtype: list
+        """
+        if k is None or k >= len(self.points):
+            return list(self._sorted_from(lat, lng))
+
+        x, y = self._project(lat, lng)
+        cx, cy = self._key(x, y)
+        found = []
+        ring = 0
+
+        while True:
+            # Past this point a full sort touches less than the ring walk
+            if 8 * ring > len(self.points):
+                return self._sorted_from(lat, lng)[:k]
+
+            for key in self._ring(cx, cy, ring):
+                for index in self._grid.get(key, ()):
+                    found.append((self._distance(lat, lng, index), index))
+
+            # Nothing outside of this ring can be closer than ring * cell_size
+            if len(found) >= k:
+                found.sort()
+                if found[k - 1][0] * (1 + PROJECTION_MARGIN) <= ring * self.cell_size:
+                    return [self.points[i] for _, i in found[:k]]
+
+            ring += 1
+
+    def within(self, lat, lng, radius):
+        """
+        Returns the points at most radius meters from lat/lng, closest first.
+        :rtype: list
+        """
+        x, y = self._project(lat, lng)
+        reach = radius * (1 + PROJECTION_MARGIN) + 1
+
+        candidates = np.asarray(self._candidates(x - reach, y - reach, x + reach, y + reach), dtype=np.intp)
+        dists = distances_from(lat, lng, self._lats[candidates], self._lngs[candidates])
+
+        inside = dists <= radius
+        candidates, dists = candidates[inside], dists[inside]
+        order = np.lexsort((candidates, dists))
+        return [self.points[i] for i in candidates[order]]
+
+    def along_segment(self, a, b, width):
+        """
+        Returns the points at most width meters away from the segment going
+        from a to b, ordered by their progress along the segment. The width is
+        measured on the local projection.
+        :param a: (latitude, longitude) start of the segment.
+        :param b: (latitude, longitude) end of the segment.
+        :rtype: list
+        """
+        ax, ay = self._project(a[0], a[1])
+        bx, by = self._project(b[0], b[1])
+        dx, dy = bx - ax, by - ay
+        length2 = dx * dx + dy * dy
+        reach = width * (1 + PROJECTION_MARGIN) + 1
+
+        found = []
+        for index in self._candidates(min(ax, bx) - reach, min(ay, by) - reach,
+                                      max(ax, bx) + reach, max(ay, by) + reach):
+            px, py = self._xy[index]
+            if length2 > 0:
+                t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length2))
+            else:
+                t = 0.0
+            ex, ey = ax + t * dx - px, ay + t * dy - py
+            if sqrt(ex * ex + ey * ey) <= width:
+                found.append((t, index))
+
+        found.sort()
+        return [self.points[i] for _, i in found]
+
+    def _sorted_from(self, lat, lng):
+        # Several tasks ask for the same ordering during one tick
+        position, ordered = self._sorted_cache
+        if position != (lat, lng):
+            order = np.argsort(distances_from(lat, lng, self._lats, self._lngs), kind='mergesort')
+            ordered = [self.points[i] for i in order]
+            self._sorted_cache = ((lat, lng), ordered)
+        return ordered
+
+    def _candidates(self, x0, y0, x1, y1):
+        ix0, iy0 = self._key(x0, y0)
+        ix1, iy1 = self._key(x1, y1)
+
+        if (ix1 - ix0 + 1) * (iy1 - iy0 + 1) > len(self._grid):
+            return range(len(self.points))
+
+        candidates = []
+        for ix in range(ix0, ix1 + 1):
+            for iy in range(iy0, iy1 + 1):
+                candidates.extend(self._grid.get((ix, iy), ()))
+        return candidates
+
+    def _ring(self, cx, cy, ring):
+        if ring == 0:
+            return [(cx, cy)]
+
+        keys = []
+        for i in range(-ring, ring + 1):
+            keys.append((cx + i, cy - ring))
+            keys.append((cx + i, cy + ring))
+        for i in range(-ring + 1, ring):
+            keys.append((cx - ring, cy + i))
+            keys.append((cx + ring, cy + i))
+        return keys
+
+    def _distance(self, lat, lng, index):
+        point = self.points[index]
+        return distance(lat, lng, point['latitude'], point['longitude'])
+
+    def _project(self, lat, lng):
+        return lng * self._kx, lat * self._ky
+
+    def _key(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
@@ -0,0 +1,79 @@
+import threading
+import unittest
+
+from mock import MagicMock
+
+from pokemongo_bot.api_wrapper import ApiWrapper
+
+
+class FakeRequest(object):
+    def __init__(self, sent):
+        self.methods = []
+        sent.append(self.methods)
+
+    def __getattr__(self, method):
+        def add(**kwargs):
+            self.methods.append((method, kwargs))
+        return add
+
+    def call(self):
+        return {'status_code': 1,
+                'responses': dict((m.upper(), dict(kw)) for m, kw in self.methods)}
+
+
+class ApiBatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.sent = []
+        self.api = ApiWrapper.__new__(ApiWrapper)
+        self.api._batch_lock = threading.RLock()
+        self.api._pending_requests = []
+        self.api.create_request = MagicMock(side_effect=lambda: FakeRequest(self.sent))
+
+    def testDistinctTypesShareOneEnvelope(self):
+        inventory = self.api.queue_request('get_holo_inventory', last_timestamp_ms=0)
+        player = self.api.queue_request('get_player')
+
+        self.assertFalse(inventory.done())
+        self.assertEqual(player.result()['responses'], {'GET_PLAYER': {}})
+        self.assertEqual(inventory.result()['responses'], {'GET_HOLO_INVENTORY': {'last_timestamp_ms': 0}})
+        self.assertEqual(len(self.sent), 1)
+
+    def testSameTypeGoesInLaterEnvelopes(self):
+        first = self.api.queue_request('fort_details', fort_id='a')
+        second = self.api.queue_request('fort_details', fort_id='b')
+        player = self.api.queue_request('get_player')
+        self.api.flush_requests()
+
+        self.assertEqual(len(self.sent), 2)
+        self.assertEqual([m for m, _ in self.sent[0]], ['fort_details', 'get_player'])
+        self.assertEqual(first.result()['responses']['FORT_DETAILS'], {'fort_id': 'a'})
+        self.assertEqual(second.result()['responses']['FORT_DETAILS'], {'fort_id': 'b'})
+        self.assertTrue(player.done())
+
+    def testBatchSizeIsCapped(self):
+        methods = ['get_player', 'get_holo_inventory', 'check_awarded_badges', 'get_inbox',
+                   'download_settings', 'get_hatched_eggs']
+        for method in methods:
+            self.api.queue_request(method)
+        self.api.flush_requests()
+
+        self.assertEqual([len(envelope) for envelope in self.sent], [ApiWrapper.MAX_BATCH_SIZE, 1])
+
+    def testErrorsReachEveryCaller(self):
+        self.api.create_request = MagicMock(return_value=MagicMock(call=MagicMock(side_effect=ValueError)))
+        first = self.api.queue_request('get_player')
+        second = self.api.queue_request('get_holo_inventory')
+
+        self.assertRaises(ValueError, first.result)
+        self.assertRaises(ValueError, second.result)
+
+    def testUnclaimedErrorsAreLogged(self):
+        self.api.logger = MagicMock()
+        self.api.create_request = MagicMock(return_value=MagicMock(call=MagicMock(side_effect=ValueError)))
+        self.api.queue_request('get_player')
+        self.api.flush_requests()
+        self.assertFalse(self.api.logger.warning.called)
+
+        self.api.queue_request('get_player')
+        self.api.flush_requests(unclaimed=True)
+        self.assertTrue(self.api.logger.warning.called)
@@ -0,0 +1,81 @@
+import os
+import pickle
+import unittest
+
+from pokemongo_bot.cell_workers.utils import distance
+from pokemongo_bot.cluster_engine import ClusterEngine, camp_clusters, find_biggest_cluster
+
+
+class ClusterEngineTestCase(unittest.TestCase):
+    def setUp(self):
+        forts_path = os.path.join(os.path.dirname(__file__), 'resources', 'example_forts.pickle')
+        with open(forts_path, 'rb') as forts:
+            self.forts = pickle.load(forts)
+
+    def testBiggestCluster(self):
+        cluster = find_biggest_cluster(50, self.forts)
+
+        self.assertEqual(cluster['num_points'], 4)
+        self.assertAlmostEqual(cluster['latitude'], 37.397183750142624, delta=1e-11)
+        self.assertAlmostEqual(cluster['longitude'], -5.9932912500000013, delta=1e-11)
+
+    def testMembersFitInRadius(self):
+        cluster = find_biggest_cluster(50, self.forts)
+
+        for a in cluster['points']:
+            for b in cluster['points']:
+                self.assertTrue(distance(a['latitude'], a['longitude'], b['latitude'], b['longitude']) <= 100)
+
+    def testLuredTiesGoToOldestLure(self):
+        forts = [
+            {'latitude': 37.0, 'longitude': -5.0, 'last_modified_timestamp_ms': 2000},
+            {'latitude': 38.0, 'longitude': -5.0, 'last_modified_timestamp_ms': 1000},
+        ]
+
+        cluster = find_biggest_cluster(50, forts, '9QM=')
+
+        self.assertEqual(cluster['num_points'], 1)
+        self.assertAlmostEqual(cluster['latitude'], 38.0, delta=1e-6)
+
+    def testEmpty(self):
+        self.assertIsNone(find_biggest_cluster(50, []))
+
+    def testResultIsCachedPerFortSet(self):
+        engine = ClusterEngine()
+        first = engine.biggest_cluster(50, self.forts)
+
+        self.assertIs(engine.biggest_cluster(50, list(self.forts)), first)
+        self.assertIsNot(engine.biggest_cluster(60, self.forts), first)
+
+    def testCampClustersHoldTheirForts(self):
+        clusters = camp_clusters(40, self.forts)
+
+        self.assertTrue(len(clusters.best()) > 0)
+        for cluster in clusters.clusters:
+            for fort in cluster['forts']:
+                self.assertTrue(distance(cluster['center'][0], cluster['center'][1],
+                                         fort['latitude'], fort['longitude']) <= 40)
+
+    def testCampLureCountsFollowUpdates(self):
+        clusters = camp_clusters(40, self.forts)
+        forts = dict((f['id'], dict(f)) for f in self.forts)
+        lured = clusters.clusters[0]['forts'][0]['id']
+
+        forts[lured]['active_fort_modifier'] = '9QM='
+        clusters.update((37.396787, -5.994587), forts)
+        self.assertTrue(clusters.clusters[0]['lured'] >= 1)
+
+        del forts[lured]['active_fort_modifier']
+        clusters.update((37.396787, -5.994587), forts)
+        self.assertTrue(all(cluster['lured'] == 0 for cluster in clusters.clusters))
+
+    def testEnginesDoNotShareCampClusters(self):
+        first, second = ClusterEngine(), ClusterEngine()
+        forts = dict((f['id'], dict(f)) for f in self.forts)
+        lured = first.camp_clusters(40, self.forts).clusters[0]['forts'][0]['id']
+
+        forts[lured]['active_fort_modifier'] = '9QM='
+        first.camp_clusters(40, self.forts).update((37.396787, -5.994587), forts)
+
+        self.assertIs(first.camp_clusters(40, self.forts), first.camp_clusters(40, list(self.forts)))
+        self.assertTrue(all(cluster['lured'] == 0 for cluster in second.camp_clusters(40, self.forts).clusters))
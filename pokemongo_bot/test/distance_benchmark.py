@@ -0,0 +1,40 @@
+"""
+Micro-benchmark of the batch distance kernel against the scalar one.
+
+    python -m pokemongo_bot.test.distance_benchmark
+"""
+from __future__ import print_function
+
+import random
+import timeit
+
+from pokemongo_bot.cell_workers.utils import coordinates, distance, distances_from, pairwise_distances
+
+
+def main(count=500, repeat=200):
+    rnd = random.Random(42)
+    points = [{'latitude': 37.39 + rnd.uniform(-0.02, 0.02),
+               'longitude': -5.99 + rnd.uniform(-0.02, 0.02)} for _ in range(count)]
+    lats, lngs = coordinates(points)
+    lat, lng = 37.3968, -5.9945
+
+    def scalar():
+        return [distance(lat, lng, p['latitude'], p['longitude']) for p in points]
+
+    def batch():
+        return distances_from(lat, lng, lats, lngs)
+
+    def batch_with_extraction():
+        return distances_from(lat, lng, *coordinates(points))
+
+    def pairwise():
+        return pairwise_distances(lats, lngs)
+
+    for name, func in (('scalar', scalar), ('batch', batch),
+                       ('batch + coordinates()', batch_with_extraction), ('pairwise', pairwise)):
+        seconds = min(timeit.repeat(func, number=repeat, repeat=3)) / repeat
+        print('{:<24} {:>10.1f} us / call ({} points)'.format(name, seconds * 1e6, count))
+
+
+if __name__ == '__main__':
+    main()
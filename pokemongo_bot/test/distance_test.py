@@ -0,0 +1,41 @@
+import random
+import unittest
+
+from pokemongo_bot.cell_workers.utils import (DISTANCE_TOLERANCE, coordinates, distance,
+                                              distances_from, pairwise_distances)
+
+
+class DistanceKernelTestCase(unittest.TestCase):
+    def setUp(self):
+        rnd = random.Random(42)
+        self.points = [{'latitude': 37.39 + rnd.uniform(-0.05, 0.05),
+                        'longitude': -5.99 + rnd.uniform(-0.05, 0.05)} for _ in range(200)]
+        self.lats, self.lngs = coordinates(self.points)
+
+    def testDistancesFromMatchesScalar(self):
+        dists = distances_from(37.3968, -5.9945, self.lats, self.lngs)
+
+        for p, d in zip(self.points, dists):
+            expected = distance(37.3968, -5.9945, p['latitude'], p['longitude'])
+            self.assertAlmostEqual(d, expected, delta=DISTANCE_TOLERANCE)
+
+    def testPairwiseMatchesScalar(self):
+        matrix = pairwise_distances(self.lats[:20], self.lngs[:20], self.lats[20:50], self.lngs[20:50])
+
+        self.assertEqual(matrix.shape, (20, 30))
+        for i, p in enumerate(self.points[:20]):
+            for j, q in enumerate(self.points[20:50]):
+                expected = distance(p['latitude'], p['longitude'], q['latitude'], q['longitude'])
+                self.assertAlmostEqual(matrix[i, j], expected, delta=DISTANCE_TOLERANCE)
+
+    def testPairwiseWithItself(self):
+        matrix = pairwise_distances(self.lats, self.lngs)
+
+        self.assertEqual(matrix.shape, (200, 200))
+        self.assertTrue((matrix.diagonal() == 0).all())
+        self.assertTrue((abs(matrix - matrix.T) <= DISTANCE_TOLERANCE).all())
+
+    def testEmpty(self):
+        lats, lngs = coordinates([])
+
+        self.assertEqual(len(distances_from(0, 0, lats, lngs)), 0)
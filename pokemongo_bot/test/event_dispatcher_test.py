@@ -0,0 +1,154 @@
+import threading
+import unittest
+
+from pokemongo_bot.event_dispatcher import AsyncHandler
+from pokemongo_bot.event_manager import EventHandler, EventManager
+
+
+class BlockedHandler(EventHandler):
+    def __init__(self):
+        super(BlockedHandler, self).__init__()
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.received = []
+
+    def handle_event(self, event, sender, level, formatted_msg, data):
+        self.started.set()
+        self.release.wait(5)
+        self.received.append((event, level, data.get('n')))
+
+
+class SyncHandler(BlockedHandler):
+    SYNCHRONOUS = True
+
+
+class AsyncHandlerTestCase(unittest.TestCase):
+    def fill(self, overflow, levels):
+        handler = BlockedHandler()
+        dispatcher = AsyncHandler(handler, max_queue=2, overflow=overflow)
+
+        # The first event keeps the worker busy, the queue holds two more
+        dispatcher.handle_event('busy', None, 'info', '', {})
+        handler.started.wait(5)
+        for n, level in enumerate(levels):
+            dispatcher.handle_event('test', None, level, '', {'n': n})
+
+        return handler, dispatcher
+
+    def handled(self, handler, dispatcher):
+        handler.release.set()
+        self.assertTrue(dispatcher.join(5))
+        return [n for event, _, n in handler.received if event == 'test']
+
+    def testDropOldest(self):
+        handler, dispatcher = self.fill(AsyncHandler.DROP_OLDEST, ['info', 'info', 'info'])
+
+        self.assertEqual(self.handled(handler, dispatcher), [1, 2])
+        stats = dispatcher.stats()
+        self.assertEqual(stats['dropped'], 1)
+        self.assertEqual(stats['handled'], 3)
+        self.assertEqual(stats['depth'], 0)
+
+    def testDropDebug(self):
+        handler, dispatcher = self.fill(AsyncHandler.DROP_DEBUG, ['info', 'debug', 'info', 'debug'])
+
+        self.assertEqual(self.handled(handler, dispatcher), [0, 2])
+        self.assertEqual(dispatcher.stats()['dropped'], 2)
+
+    def testBlockWaitsForRoom(self):
+        handler, dispatcher = self.fill(AsyncHandler.BLOCK, ['info', 'info'])
+        emitter = threading.Thread(target=dispatcher.handle_event, args=('test', None, 'info', '', {'n': 2}))
+        emitter.start()
+        emitter.join(0.1)
+        self.assertTrue(emitter.is_alive())
+
+        self.assertEqual(self.handled(handler, dispatcher)[:2], [0, 1])
+        emitter.join(5)
+        self.assertTrue(dispatcher.join(5))
+        self.assertEqual(dispatcher.stats()['dropped'], 0)
+        self.assertEqual(handler.received[-1][2], 2)
+
+    def testHandlerErrorsAreCounted(self):
+        class FailingHandler(EventHandler):
+            def handle_event(self, event, sender, level, formatted_msg, data):
+                raise ValueError(event)
+
+        dispatcher = AsyncHandler(FailingHandler())
+        dispatcher.logger.disabled = True
+        dispatcher.handle_event('test', None, 'info', '', {})
+
+        self.assertTrue(dispatcher.join(5))
+        self.assertEqual(dispatcher.stats()['errors'], 1)
+
+    def testSystemExitDoesNotWedgeTheQueue(self):
+        class ExitingHandler(EventHandler):
+            def __init__(self):
+                super(ExitingHandler, self).__init__()
+                self.received = []
+
+            def handle_event(self, event, sender, level, formatted_msg, data):
+                self.received.append(event)
+                if event == 'exit':
+                    raise SystemExit(1)
+
+        handler = ExitingHandler()
+        dispatcher = AsyncHandler(handler)
+        dispatcher.logger.disabled = True
+        dispatcher.handle_event('exit', None, 'info', '', {})
+        dispatcher.handle_event('test', None, 'info', '', {})
+
+        self.assertTrue(dispatcher.join(5))
+        self.assertEqual(handler.received, ['exit', 'test'])
+        self.assertEqual(dispatcher.stats()['errors'], 1)
+
+
+class AsyncDispatchTestCase(unittest.TestCase):
+    def testSynchronousHandlersStayOnBotThread(self):
+        slow = BlockedHandler()
+        logging = SyncHandler()
+        logging.release.set()
+        manager = EventManager(None, False, slow, logging)
+        manager.register_event('test', parameters=('n',))
+        manager.dispatch_async()
+        later = BlockedHandler()
+        manager.add_handler(later)
+
+        manager.emit('test', sender=self, data={'n': 1})
+
+        # Handled before emit returned, while the others are still waiting
+        self.assertEqual(logging.received, [('test', 'info', 1)])
+        self.assertEqual(sorted(manager.dispatch_stats()), ['BlockedHandler', 'BlockedHandler#2'])
+
+        slow.release.set()
+        later.release.set()
+        manager.flush(5)
+        self.assertEqual(slow.received, [('test', 'info', 1)])
+        self.assertEqual(later.received, [('test', 'info', 1)])
+
+    def testRemoveHandlerStopsItsWorker(self):
+        class OtherHandler(EventHandler):
+            received = []
+
+            def handle_event(self, event, sender, level, formatted_msg, data):
+                self.received.append((event, level, data.get('n')))
+
+        old = BlockedHandler()
+        old.release.set()
+        other = OtherHandler()
+        manager = EventManager(None, False, old, other)
+        manager.register_event('test', parameters=('n',))
+        manager.dispatch_async()
+        manager.emit('test', sender=self, data={'n': 1})
+        manager.flush(5)
+        worker = manager._handlers[0]._thread
+
+        self.assertTrue(manager.remove_handler(BlockedHandler))
+        self.assertFalse(manager.remove_handler(BlockedHandler))
+        manager.emit('test', sender=self, data={'n': 2})
+
+        worker.join(5)
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(old.received, [('test', 'info', 1)])
+        manager.flush(5)
+        self.assertEqual(other.received, [('test', 'info', 1), ('test', 'info', 2)])
+        self.assertEqual(list(manager.dispatch_stats()), ['OtherHandler'])
@@ -0,0 +1,62 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import MagicMock, patch
+
+from pokemongo_bot.event_manager import Events
+
+
+def event(number, level='info'):
+    return MagicMock(timestamp='2017-01-01 00:00:00', friendly_msg='msg %d' % number, event='test',
+                     level=level, formatted='msg {n}', data='{}')
+
+
+class EventLogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.bot = MagicMock()
+        self.bot.config.username = 'test'
+        self.bot.config.event_history_file = None
+        self.bot.config.event_history_max_bytes = 1024 * 1024
+        self.patch = patch('pokemongo_bot.event_manager.write_json')
+        self.write_json = self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        shutil.rmtree(self.dir)
+
+    def testRingBufferKeepsLastEvents(self):
+        events = Events(self.bot)
+        for i in range(events.MaxEventlog + 10):
+            events.add_event(event(i))
+
+        self.assertEqual(len(events.all()), events.MaxEventlog)
+        self.assertEqual(events.get(0).friendly_msg, 'msg 10')
+        self.assertEqual(events.jsonify_events()[-1]['event']['friendly_msg'], 'msg 59')
+
+    def testSnapshotIsBuiltOnDemand(self):
+        events = Events(self.bot)
+        events.add_event(event(1))
+        events.add_event(event(2, level='debug'))
+
+        path, snapshot = self.write_json.call_args[0]
+        self.assertTrue(path.endswith('events-test.json'))
+        self.assertIs(snapshot(), events.jsonify_events())
+        self.assertEqual(len(snapshot()), 1)
+
+        events.add_event(event(3))
+        self.assertEqual(len(snapshot()), 2)
+
+    def testHistoryFile(self):
+        self.bot.config.event_history_file = os.path.join(self.dir, 'history.jsonl')
+        self.bot.config.username = 'history'
+        events = Events(self.bot)
+        events.add_event(event(1))
+        events.add_event(event(2))
+
+        with open(self.bot.config.event_history_file) as history:
+            lines = [json.loads(line) for line in history]
+        self.assertEqual([line['event']['friendly_msg'] for line in lines], ['msg 1', 'msg 2'])
@@ -0,0 +1,65 @@
+import unittest
+
+from mock import MagicMock, patch
+
+from pokemongo_bot.event_manager import EventHandler, EventManager, EventMalformedException, \
+    EventNotRegisteredException
+
+
+class RecordingHandler(EventHandler):
+    def __init__(self, events=None, levels=None):
+        super(RecordingHandler, self).__init__()
+        self.EVENTS = events
+        self.LEVELS = levels
+        self.received = []
+
+    def handle_event(self, event, sender, level, formatted_msg, data):
+        self.received.append((event, level, formatted_msg))
+
+
+class EventManagerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.manager = EventManager(None, False)
+        self.manager.register_event('position_update', parameters=('current_position', 'distance'))
+        self.manager.register_event('level_up', parameters=('current_level',))
+
+    def testUnknownEventAndParameter(self):
+        with self.assertRaises(EventNotRegisteredException):
+            self.manager.emit('nope', sender=self)
+
+        with self.assertRaises(EventMalformedException):
+            self.manager.emit('level_up', sender=self, data={'level': 2})
+
+    def testHandlersOnlyReceiveSubscribedEvents(self):
+        everything = RecordingHandler()
+        level_ups = RecordingHandler(events=('level_up',))
+        no_debug = RecordingHandler(levels=('info',))
+        for handler in (everything, level_ups, no_debug):
+            self.manager.add_handler(handler)
+
+        self.manager.emit('level_up', sender=self, formatted='Level {current_level}', data={'current_level': 3})
+        self.manager.emit('position_update', sender=self, level='debug', formatted='{distance}',
+                          data={'current_position': (0, 0), 'distance': 5})
+
+        self.assertEqual(everything.received, [('level_up', 'info', 'Level 3'), ('position_update', 'debug', '5')])
+        self.assertEqual(level_ups.received, [('level_up', 'info', 'Level 3')])
+        self.assertEqual(no_debug.received, [('level_up', 'info', 'Level 3')])
+
+    def testNothingIsFormattedWithoutReceiver(self):
+        self.manager.add_handler(RecordingHandler(levels=('info',)))
+        formatted = MagicMock()
+
+        with patch('pokemongo_bot.event_manager.Event') as event:
+            self.manager.emit('position_update', sender=self, level='debug', formatted=formatted, data={})
+
+        self.assertFalse(formatted.format.called)
+        self.assertFalse(event.called)
+
+    def testRoutesFollowNewHandlers(self):
+        self.manager.emit('level_up', sender=self, data={'current_level': 3})
+        handler = RecordingHandler()
+        self.manager.add_handler(handler)
+
+        self.manager.emit('level_up', sender=self, data={'current_level': 4})
+
+        self.assertEqual(len(handler.received), 1)
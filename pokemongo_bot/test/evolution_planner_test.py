@@ -0,0 +1,120 @@
+import unittest
+
+from pokemongo_bot.evolution_planner import EvolutionCosts, EvolutionPlanner, UpgradeCosts
+
+
+class Info(object):
+    def __init__(self, pokemon_id, family_id, evolution_cost=0, next_id=None, item=None):
+        self.id = pokemon_id
+        self.name = 'P{}'.format(pokemon_id)
+        self.first_evolution_id = family_id
+        self.has_next_evolution = next_id is not None
+        self.evolution_cost = evolution_cost
+        self.next_evolution_ids = [next_id] if next_id else []
+        self.evolution_item = item
+        self.evolution_item_needed = 1 if item else 0
+
+
+# Two families: 1 -> 2 -> 3 and 10 -> 11, which needs an item
+STATIC_DATA = [Info(1, 1, 12, 2), Info(2, 1, 50, 3), Info(3, 1), Info(10, 10, 25, 11, item=1101), Info(11, 10)]
+
+
+class FakePokemon(object):
+    def __init__(self, unique_id, pokemon_id, cp=100, level=10):
+        info = [i for i in STATIC_DATA if i.id == pokemon_id][0]
+        self.unique_id = unique_id
+        self.pokemon_id = pokemon_id
+        self.first_evolution_id = info.first_evolution_id
+        self.name = info.name
+        self.evolution_cost = info.evolution_cost
+        self.iv = 0.5
+        self.cp = cp
+        self.level = level
+        self.in_fort = False
+        self.is_favorite = False
+        self._has_next = info.has_next_evolution
+
+    def has_next_evolution(self):
+        return self._has_next
+
+
+class UpgradeCostsTestCase(unittest.TestCase):
+    def testBetweenSumsEveryPowerUp(self):
+        table = [[i % 3 + 1, 100 * i] for i in range(78)]
+        costs = UpgradeCosts(table)
+
+        for level, target in [(1, 40), (10, 30), (20.5, 21), (15, 15), (30, 20)]:
+            steps = [table[i - 2] for i in range(int(level * 2), int(target * 2))]
+            self.assertEqual(costs.between(level, target), (sum(s[0] for s in steps), sum(s[1] for s in steps)))
+
+    def testInvalidTable(self):
+        self.assertRaises(ValueError, UpgradeCosts, {"1": 200})
+
+
+class EvolutionCostsTestCase(unittest.TestCase):
+    def testCostToFinal(self):
+        costs = EvolutionCosts(STATIC_DATA)
+
+        self.assertEqual((costs[1].cost_to_final, costs[1].evolutions_to_final), (62, 2))
+        self.assertEqual((costs[2].cost_to_final, costs[2].evolutions_to_final), (50, 1))
+        self.assertEqual((costs[3].cost_to_final, costs[3].evolutions_to_final), (0, 0))
+        self.assertEqual(costs.evolution_items(), set([1101]))
+
+
+class EvolutionPlannerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.costs = EvolutionCosts(STATIC_DATA)
+        self.upgrade_costs = UpgradeCosts([[1, 1000]] * 78)
+
+    def testEvolveToFinal(self):
+        planner = EvolutionPlanner(self.costs, evolve_to_final=True)
+        best, second, crap = FakePokemon(1, 1), FakePokemon(2, 1), FakePokemon(3, 1)
+
+        # 61 candies + 1 for crap: 62 for the first, 2 left for the second
+        plan = planner.plan(1, [best, second, crap], [best, second], [best, second], [], 61, 0, 30)
+
+        self.assertEqual(plan.evolve, [best, best])
+        self.assertEqual(plan.transfer, [crap])
+
+    def testUpgradeSpendsStardust(self):
+        planner = EvolutionPlanner(self.costs, self.upgrade_costs)
+        strong, weak = FakePokemon(1, 3, cp=500, level=20), FakePokemon(2, 3, cp=100, level=20)
+
+        plan = planner.plan(1, [strong, weak], [strong, weak], [], [weak, strong], 100, 25000, 30)
+
+        self.assertEqual(plan.upgrade, [strong])
+        self.assertEqual(plan.stardust, 5000)
+
+    def testMissingItem(self):
+        planner = EvolutionPlanner(self.costs, use_evolution_items=True)
+        pokemon = FakePokemon(1, 10)
+
+        plan = planner.plan(10, [pokemon], [pokemon], [pokemon], [], 100, 0, 30, items={1101: 0})
+
+        self.assertEqual(plan.evolve, [])
+        self.assertEqual(plan.missing_items, [(pokemon, 1101, 1, 0)])
+
+    def testKeepForXp(self):
+        planner = EvolutionPlanner(self.costs, evolve_for_xp=True)
+        crap = [FakePokemon(i, 1) for i in range(1, 6)] + [FakePokemon(6, 2)]
+
+        # 20 candies + 6 for crap: two evolutions of 12
+        plan = planner.plan(1, crap, [], [], [], 20, 0, 30)
+
+        self.assertEqual([p.unique_id for p in plan.xp], [1, 2])
+        self.assertEqual([p.unique_id for p in plan.transfer], [3, 4, 5, 6])
+
+    def testPlanAllLeavesInputsAlone(self):
+        planner = EvolutionPlanner(self.costs, self.upgrade_costs, evolve_for_xp=True, xp_blacklist=['P10'])
+        box = [FakePokemon(i, pokemon_id, cp=i) for i, pokemon_id in enumerate([1, 2, 3, 10, 11, 1], 1)]
+        try_upgrade = box[:3]
+
+        plans, stardust = planner.plan_all(box, box[:3], [], try_upgrade, {1: 100, 10: 5}, 50000, 30)
+
+        self.assertEqual(sorted(plans), [1, 10])
+        # Highest CP first
+        self.assertEqual([p.unique_id for p in plans[10].transfer], [5, 4])
+        self.assertEqual([p.unique_id for p in try_upgrade], [1, 2, 3])
+        # 40 power ups from level 10 to 30, for the highest CP only
+        self.assertEqual([p.unique_id for p in plans[1].upgrade], [3])
+        self.assertEqual(stardust, 10000)
@@ -0,0 +1,109 @@
+import json
+import threading
+import time
+import unittest
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from pokemongo_bot.http_client import HttpClient
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), StubHandler)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.ports = set()
+        self.running = 0
+        self.max_running = 0
+        self.delay = 0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    ETAG = '"v1"'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits += 1
+            server.ports.add(self.client_address[1])
+            server.running += 1
+            server.max_running = max(server.max_running, server.running)
+        time.sleep(server.delay)
+        with server.lock:
+            server.running -= 1
+
+        if self.headers.get('If-None-Match') == self.ETAG:
+            self.send_response(304)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = json.dumps({'pokemons': [self.path]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', self.ETAG)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class HttpClientTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer()
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.url = 'http://127.0.0.1:{}/feed'.format(self.server.server_address[1])
+        self.client = HttpClient(per_host=2, timeout=5)
+
+    def tearDown(self):
+        self.client.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def testConnectionIsKeptAlive(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get(self.url).json(), {'pokemons': ['/feed']})
+
+        self.assertEqual(self.server.hits, 3)
+        self.assertEqual(len(self.server.ports), 1)
+
+    def testConditionalGetReusesCachedBody(self):
+        first = self.client.get(self.url, conditional=True)
+        second = self.client.get(self.url, conditional=True)
+
+        self.assertEqual(self.server.hits, 2)
+        self.assertIs(second, first)
+        self.assertEqual(second.json(), {'pokemons': ['/feed']})
+        self.assertEqual(self.client.stats()['not_modified'], 1)
+
+    def testMaxAgeSkipsRequest(self):
+        self.client.get(self.url, max_age=60)
+        self.client.get(self.url, max_age=60)
+        self.client.get(self.url, params={'page': 2}, max_age=60)
+
+        self.assertEqual(self.server.hits, 2)
+        self.assertEqual(self.client.stats()['cache_hits'], 1)
+
+    def testConcurrencyPerHost(self):
+        self.server.delay = 0.05
+        threads = [threading.Thread(target=self.client.get, args=(self.url,)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(self.server.hits, 6)
+        self.assertLessEqual(self.server.max_running, 2)
@@ -0,0 +1,49 @@
+import unittest
+
+from pokemongo_bot.inventory import Candies, Pokedex, Pokemons
+
+
+def candy(family_id, count):
+    return {'inventory_item_data': {'candy': {'family_id': family_id, 'candy': count}}}
+
+
+def egg(egg_id, km):
+    return {'inventory_item_data': {'pokemon_data': {'id': egg_id, 'is_egg': True, 'egg_km_walked_target': km}}}
+
+
+class InventoryDeltaTestCase(unittest.TestCase):
+    def testDeltaKeepsUnsentItems(self):
+        candies = Candies()
+        candies.refresh([candy(1, 10), candy(4, 3)])
+
+        candies.apply_delta([candy(4, 7)])
+
+        self.assertEqual(candies.get(1).quantity, 10)
+        self.assertEqual(candies.get(4).quantity, 7)
+
+    def testDeletedItemsAreRemoved(self):
+        pokedex = Pokedex()
+        pokedex.refresh([{'inventory_item_data': {'pokedex_entry': {'pokemon_id': 16, 'times_captured': 1}}}])
+
+        pokedex.apply_delta([{'modified_timestamp_ms': 1, 'deleted_item': {'pokedex_entry_id': 16}}])
+
+        self.assertFalse(pokedex.seen(16))
+
+    def testUnchangedPokemonsAreReused(self):
+        pokemons = Pokemons()
+        pokemons.refresh([egg(1, 2.0), egg(2, 5.0)])
+        first, second = pokemons.get(1), pokemons.get(2)
+
+        pokemons.apply_delta([egg(1, 2.0), egg(2, 10.0)])
+
+        self.assertIs(pokemons.get(1), first)
+        self.assertIsNot(pokemons.get(2), second)
+        self.assertEqual(pokemons.get(2)._data['egg_km_walked_target'], 10.0)
+
+    def testDeletedPokemons(self):
+        pokemons = Pokemons()
+        pokemons.refresh([egg(1, 2.0), egg(2, 5.0), egg(3, 5.0)])
+
+        pokemons.apply_delta([{'deleted_item': {'pokemon_id': 1}}, {'deleted_item_key': 2}])
+
+        self.assertEqual([p._data['id'] for p in pokemons.all_with_eggs()], [3])
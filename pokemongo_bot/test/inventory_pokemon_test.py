@@ -0,0 +1,68 @@
+import unittest
+
+from mock import MagicMock, patch
+
+from pokemongo_bot.inventory import ChargedAttacks, FastAttacks, LevelToCPm, Pokemon, Pokemons
+
+
+def pokemon_data(**kwargs):
+    data = {'id': 1, 'pokemon_id': 16, 'cp': 100, 'cp_multiplier': 0.5, 'stamina_max': 40, 'stamina': 40,
+            'individual_attack': 15, 'individual_defense': 15, 'individual_stamina': 0,
+            'move_1': 219, 'move_2': 45, 'pokemon_display': {}}
+    data.update(kwargs)
+    return data
+
+
+class InventoryPokemonTestCase(unittest.TestCase):
+    def setUp(self):
+        static = MagicMock(base_attack=94, base_defense=90, base_stamina=80, max_cp=1000)
+        static.name = 'Pidgey'
+        self.patches = [
+            patch.object(Pokemons, 'data_for', return_value=static),
+            patch.object(LevelToCPm, 'level_from_cpm', return_value=20),
+            patch.object(FastAttacks, 'data_for', return_value=MagicMock(dps=10)),
+            patch.object(ChargedAttacks, 'data_for', return_value=MagicMock(dps=20)),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def testStatsAreComputedOnFirstAccess(self):
+        with patch.object(Pokemon, '_compute_cp_perfection', return_value=0.5) as compute:
+            pokemon = Pokemon(pokemon_data())
+            self.assertFalse(compute.called)
+
+            self.assertEqual(pokemon.ivcp, 0.5)
+            self.assertEqual(pokemon.ivcp, 0.5)
+            self.assertEqual(compute.call_count, 1)
+
+        self.assertEqual(pokemon.iv, round(30 / 45.0, 2))
+
+    def testUpdateResetsStats(self):
+        pokemon = Pokemon(pokemon_data())
+        iv = pokemon.iv
+        cp_exact = pokemon.cp_exact
+
+        pokemon.update(pokemon_data(cp=150, individual_stamina=15, additional_cp_multiplier=0.1))
+
+        self.assertEqual(pokemon.cp, 150)
+        self.assertTrue(pokemon.iv > iv)
+        self.assertTrue(pokemon.cp_exact > cp_exact)
+
+    def testUpdateNicknameKeepsData(self):
+        pokemon = Pokemon(pokemon_data())
+
+        pokemon.update_nickname('Bob')
+
+        self.assertEqual(pokemon.nickname, 'Bob')
+        self.assertEqual(pokemon._data['nickname'], 'Bob')
+
+    def testSlots(self):
+        pokemon = Pokemon(pokemon_data())
+
+        self.assertFalse(hasattr(pokemon, '__dict__'))
+        self.assertEqual(pokemon.ncp, pokemon.cp_percent)
+        self.assertEqual(pokemon.dps1, 10)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+
+import numpy as np
+from mock import patch
+
+from pokemongo_bot.log_analytics import DAY, HOUR, LogAnalytics
+from pokemongo_bot.log_store import LogStore
+
+# As created by the log_rollup migration
+ROLLUP_TABLE = ('CREATE TABLE log_rollup (metric text, period integer, start integer, key text, '
+                'count integer DEFAULT 0, total real DEFAULT 0, PRIMARY KEY (metric, period, start, key))')
+
+
+class LogAnalyticsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.connection = sqlite3.connect(os.path.join(self.directory, 'test.db'), check_same_thread=False)
+        self.connection.execute('CREATE TABLE catch_log (pokemon text, cp real, iv real, encounter_id text, '
+                                'pokemon_id real, dated datetime DEFAULT CURRENT_TIMESTAMP)')
+        self.connection.execute('CREATE TABLE vanish_log (pokemon text, cp real, iv real, encounter_id text, '
+                                'pokemon_id real, dated datetime DEFAULT CURRENT_TIMESTAMP)')
+        self.connection.execute('CREATE TABLE pokestop_log (pokestop text, exp real, items text, '
+                                'dated datetime DEFAULT CURRENT_TIMESTAMP)')
+        self.connection.execute(ROLLUP_TABLE)
+        self.store = LogStore(self.connection)
+        self.analytics = LogAnalytics(self.store)
+        # Midnight UTC
+        self.start = 1480000000 // DAY * DAY
+
+    def tearDown(self):
+        self.store.flush()
+        self.connection.close()
+        shutil.rmtree(self.directory)
+
+    def log(self, at, table, **columns):
+        with patch('pokemongo_bot.log_store.time.time', return_value=at):
+            self.store.log(table, **columns)
+
+    def testRollupsFollowTheLog(self):
+        # Two days and a half, a catch every half hour and a spin every hour
+        for half_hours in range(120):
+            at = self.start + half_hours * HOUR / 2
+            self.log(at, 'catch_log', pokemon='Pidgey' if half_hours % 3 else 'Eevee', cp=10, iv=0.95)
+            if half_hours % 2 == 0:
+                self.log(at, 'pokestop_log', pokestop='Fort', exp='50', items='{}')
+        self.log(self.start, 'vanish_log', pokemon='Eevee', cp=10, iv=0.5)
+
+        summary = self.analytics.summary(self.start, self.start + 2 * DAY + 12 * HOUR)
+        self.assertEqual(summary['catches'], 120)
+        self.assertEqual(summary['species'], {'Pidgey': 80, 'Eevee': 40})
+        self.assertEqual(summary['iv_distribution'], {'9': 120})
+        self.assertEqual((summary['spins'], summary['xp'], summary['xp_per_hour']), (60, 3000.0, 50.0))
+        self.assertAlmostEqual(summary['vanish_rate'], 1 / 121.0)
+
+        # An hour in the middle of the second day
+        self.assertEqual(self.analytics.totals('catch', self.start + DAY + HOUR, self.start + DAY + 2 * HOUR),
+                         {'Pidgey': (1, 0.95), 'Eevee': (1, 0.95)})
+        # From the hourly rollups around a daily one
+        totals = self.analytics.totals('spin', self.start + 20 * HOUR, self.start + DAY + 28 * HOUR)
+        self.assertEqual(totals, {'': (32, 1600.0)})
+
+        self.assertEqual([row[1] for row in self.analytics.series('catch', self.start, self.start + 3 * DAY, DAY)],
+                         [48, 48, 24])
+
+    def testExport(self):
+        self.log(self.start, 'catch_log', pokemon='Pidgey', cp=10, iv=0.5, encounter_id='1', pokemon_id=16)
+        self.log(self.start + 60, 'catch_log', pokemon=u'Nidoran♀', cp=20, iv=None, encounter_id='2', pokemon_id=29)
+        path = os.path.join(self.directory, 'history.npz')
+
+        self.analytics.export(path)
+
+        data = np.load(path)
+        self.assertEqual(list(data['catch_log.dated']), [self.start, self.start + 60])
+        self.assertEqual([data['pokemon'][i] for i in data['catch_log.pokemon']], ['Pidgey', u'Nidoran♀'])
+        self.assertTrue(np.isnan(data['catch_log.iv'][1]))
+        self.assertEqual(len(data['vanish_log.dated']), 0)
+        self.assertEqual(int(data['log_rollup.count'].sum()), 8)
+
+    def testRollupsAreCommittedWithTheirRow(self):
+        store = LogStore(self.connection, max_batch=4, max_latency=60)
+
+        for n in range(10):
+            store.log('catch_log', pokemon='Pidgey', cp=10, iv=0.5, encounter_id=str(n))
+        # The full batches are committed in the background, the rest waits
+        end = time.time() + 5
+        while store.writer.stats()['written'] < 8 and time.time() < end:
+            time.sleep(0.01)
+
+        connection = sqlite3.connect(os.path.join(self.directory, 'test.db'))
+        try:
+            rows = connection.execute('SELECT COUNT(*) FROM catch_log').fetchone()[0]
+            rollups = connection.execute("SELECT metric, period, SUM(count) FROM log_rollup "
+                                         "GROUP BY metric, period").fetchall()
+        finally:
+            connection.close()
+
+        self.assertEqual(rows, 8)
+        self.assertEqual(sorted(rollups), [('catch', HOUR, 8), ('catch', DAY, 8),
+                                           ('catch_iv', HOUR, 8), ('catch_iv', DAY, 8)])
+        store.flush()
+        self.assertEqual(store.writer.stats()['batches'], 3)
@@ -0,0 +1,70 @@
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from pokemongo_bot.log_store import LogStore
+
+
+class LogQueriesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.connection = sqlite3.connect(os.path.join(self.directory, 'test.db'), check_same_thread=False)
+        self.connection.execute('CREATE TABLE catch_log (pokemon text, cp real, iv real, dated datetime DEFAULT CURRENT_TIMESTAMP)')
+        self.connection.execute('CREATE TABLE softban_log (status text, source text, dated datetime DEFAULT CURRENT_TIMESTAMP)')
+        self.store = LogStore(self.connection)
+
+    def tearDown(self):
+        self.store.flush()
+        self.connection.close()
+        shutil.rmtree(self.directory)
+
+    def log(self, rnd, count):
+        for _ in range(count):
+            self.store.log('catch_log', pokemon=rnd.choice(['Pidgey', 'Rattata']), cp=rnd.randint(10, 500),
+                           iv=rnd.randint(0, 45) / 45.0)
+
+    def testKeptRowsFollowTheTable(self):
+        rnd = random.Random(3)
+        queries = self.store.queries()
+        queries.cache_size = 20
+
+        self.log(rnd, 30)
+        kept = [queries.history('catch_log', order, 20) for order in ('cp', 'iv')]
+        self.log(rnd, 30)
+
+        for order in ('cp', 'iv'):
+            # Kept rows, then read from the table
+            rows = queries.history('catch_log', order, 20)
+            expected = queries.history('catch_log', order, 21)[:20]
+            self.assertEqual([row[1 if order == 'cp' else 2] for row in rows],
+                             [row[1 if order == 'cp' else 2] for row in expected])
+        self.assertNotEqual(kept[0], queries.history('catch_log', 'cp', 20))
+
+    def testLatestFirst(self):
+        queries = self.store.queries()
+        self.connection.execute("INSERT INTO catch_log VALUES ('Pidgey', 10, 0.1, datetime('now', '-1 day'))")
+        self.connection.commit()
+
+        self.assertEqual(queries.history('catch_log', 'dated', 1), [('Pidgey', 10, 0.1)])
+        self.store.log('catch_log', pokemon='Rattata', cp=20, iv=0.2)
+        self.assertEqual(queries.history('catch_log', 'dated', 2), [('Rattata', 20, 0.2), ('Pidgey', 10, 0.1)])
+
+    def testRecent(self):
+        queries = self.store.queries()
+        self.connection.execute("INSERT INTO softban_log VALUES ('Old', 'SpinFort', datetime('now', '-1 day'))")
+        self.connection.commit()
+        self.store.log('softban_log', status='New', source='SpinFort')
+
+        self.assertEqual([row[0] for row in queries.recent('softban_log', 5)], ['New', 'Old'])
+        self.assertEqual(queries.recent('pokestop_log', 5), [])
+
+    def testReadOnly(self):
+        queries = self.store.queries()
+
+        self.assertEqual(queries.history('evolve_log', 'iv', 10), [])
+        self.assertRaises(ValueError, queries.history, 'catch_log', 'weight', 10)
+        self.assertRaises(ValueError, queries.history, 'softban_log', 'cp', 10)
+        self.assertRaises(sqlite3.OperationalError, queries.fetchall, "DELETE FROM catch_log")
@@ -0,0 +1,141 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from mock import MagicMock, patch
+
+from pokemongo_bot.log_store import LogStore, LogWriter
+
+SCHEMA = '''
+CREATE TABLE catch_log (pokemon text, cp real, iv real, encounter_id text, pokemon_id int,
+                        dated datetime DEFAULT CURRENT_TIMESTAMP)
+'''
+
+
+class LogStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'test.db')
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute(SCHEMA)
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.directory)
+
+    def count(self):
+        # From another connection, to see what was committed only
+        connection = sqlite3.connect(self.path)
+        try:
+            return connection.execute('SELECT COUNT(*) FROM catch_log').fetchone()[0]
+        finally:
+            connection.close()
+
+    def testWriteBehind(self):
+        store = LogStore(self.connection, max_latency=60)
+
+        self.assertEqual(self.connection.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        for i in range(10):
+            self.assertTrue(store.log('catch_log', pokemon='Pidgey', cp=10, iv=0.5, encounter_id=str(i), pokemon_id=16))
+        self.assertEqual(self.count(), 0)
+
+        self.assertEqual(store.fetchone('SELECT COUNT(DISTINCT encounter_id) FROM catch_log')[0], 10)
+        stats = store.writer.stats()
+        self.assertEqual((stats['written'], stats['batches'], stats['depth']), (10, 1, 0))
+
+    def testBatchSize(self):
+        store = LogStore(self.connection, max_batch=4, max_latency=60)
+
+        for i in range(9):
+            store.log('catch_log', pokemon='Pidgey', encounter_id=str(i))
+        # Two full batches go without waiting for the latency
+        end = time.time() + 5
+        while self.count() < 8 and time.time() < end:
+            time.sleep(0.01)
+
+        self.assertEqual(self.count(), 8)
+        store.flush()
+        self.assertEqual(self.count(), 9)
+
+    def testLatency(self):
+        store = LogStore(self.connection, max_latency=0.05)
+
+        store.log('catch_log', pokemon='Pidgey')
+        end = time.time() + 5
+        while self.count() < 1 and time.time() < end:
+            time.sleep(0.01)
+
+        self.assertEqual(self.count(), 1)
+
+    def testMissingTable(self):
+        store = LogStore(self.connection)
+
+        self.assertFalse(store.log('vanish_log', pokemon='Pidgey'))
+        self.connection.execute('CREATE TABLE vanish_log (pokemon text, dated datetime)')
+        store.refresh()
+        self.assertTrue(store.log('vanish_log', pokemon='Pidgey'))
+        self.assertEqual(store.fetchone('SELECT COUNT(*) FROM vanish_log')[0], 1)
+
+    def testDailyCount(self):
+        self.connection.execute('CREATE TABLE vanish_log (pokemon text, dated datetime DEFAULT CURRENT_TIMESTAMP)')
+        self.connection.executemany("INSERT INTO catch_log (pokemon, dated) VALUES ('Pidgey', datetime('now', ?))",
+                                    [('-2 days',), ('-23 hours',), ('-1 hour',)])
+        self.connection.execute("INSERT INTO vanish_log (pokemon, dated) VALUES ('Pidgey', datetime('now', '-10 minutes'))")
+        self.connection.commit()
+        store = LogStore(self.connection)
+
+        self.assertEqual(store.daily_count('catch_log'), 2)
+        self.assertEqual(store.count_since('vanish_log', 'catch_log'), 1)
+        self.assertEqual(store.daily_count('pokestop_log'), 0)
+
+        store.log('vanish_log', pokemon='Pidgey')
+        self.assertEqual(store.count_since('vanish_log', 'catch_log'), 2)
+        store.log('catch_log', pokemon='Pidgey')
+        self.assertEqual(store.daily_count('catch_log'), 3)
+        self.assertEqual(store.count_since('vanish_log', 'catch_log'), 0)
+        store.flush()
+
+    def testErrorsAreCounted(self):
+        writer = LogWriter(self.path)
+
+        writer.insert('INSERT INTO catch_log (weight) VALUES (?)', [1])
+        writer.insert('INSERT INTO catch_log (pokemon) VALUES (?)', ['Pidgey'])
+        writer.flush()
+
+        # The batch is one transaction
+        self.assertEqual(self.count(), 0)
+        self.assertEqual(writer.stats()['errors'], 2)
+
+    def testInMemory(self):
+        connection = sqlite3.connect(':memory:')
+        connection.execute(SCHEMA)
+        store = LogStore(connection)
+
+        self.assertIsNone(store.writer)
+        store.log('catch_log', pokemon='Pidgey')
+        self.assertEqual(store.fetchone('SELECT pokemon FROM catch_log'), ('Pidgey',))
+
+    def testReadsDoNotWaitForADeadWriter(self):
+        store = LogStore(self.connection, max_latency=0.01)
+        store.logger.disabled = store.writer.logger.disabled = True
+
+        with patch('pokemongo_bot.log_store.sqlite3.connect', side_effect=sqlite3.OperationalError('locked')):
+            store.log('catch_log', pokemon='Pidgey')
+            store.writer._thread.join(5)
+
+        self.assertFalse(store.writer._thread.is_alive())
+        self.assertEqual(store.fetchone('SELECT COUNT(*) FROM catch_log'), (0,))
+        self.assertEqual(store.writer.stats()['depth'], 1)
+
+    def testExitFlushIsBounded(self):
+        store = LogStore(self.connection, max_latency=0.01)
+        store.logger = MagicMock()
+
+        with patch.object(store.writer, 'flush', return_value=False) as flush:
+            store._flush_at_exit()
+
+        flush.assert_called_once_with(LogStore.READ_FLUSH_LATENCIES)
+        self.assertTrue(store.logger.warning.called)
@@ -0,0 +1,87 @@
+import unittest
+
+from pokemongo_bot.map_cell_store import MapCellStore
+
+CELL_A = 9926595610352287744
+CELL_B = 9926595612499771392
+
+
+def fort(fort_id, **kwargs):
+    data = {'id': fort_id, 'latitude': 37.3968, 'longitude': -5.9945, 'enabled': True, 'type': 1}
+    data.update(kwargs)
+    return data
+
+
+class MapCellStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.store = MapCellStore()
+        self.store.merge([
+            {'s2_cell_id': CELL_A, 'current_timestamp_ms': 100,
+             'forts': [fort('a1'), fort('a2')],
+             'nearby_pokemons': [{'pokemon_id': 16, 'encounter_id': 1}]},
+            {'s2_cell_id': CELL_B, 'current_timestamp_ms': 100,
+             'forts': [fort('b1', type=None)]},
+        ], [CELL_A, CELL_B])
+
+    def testSinceTimestamps(self):
+        self.assertEqual(self.store.since_timestamps([CELL_A, CELL_B, 1]), [100, 100, 0])
+
+    def testUnchangedCellIsSkipped(self):
+        views = self.store.views()
+        version = self.store.version
+
+        changed = self.store.merge([{'s2_cell_id': CELL_A, 'current_timestamp_ms': 100}], [CELL_A, CELL_B])
+
+        self.assertFalse(changed)
+        self.assertEqual(self.store.version, version)
+        self.assertIs(self.store.views(), views)
+
+    def testDeltaKeepsUnsentForts(self):
+        forts_version = self.store.forts_version
+        self.store.merge([
+            {'s2_cell_id': CELL_A, 'current_timestamp_ms': 200,
+             'forts': [fort('a3')], 'deleted_objects': ['a1']}
+        ], [CELL_A, CELL_B])
+
+        ids = sorted(f['id'] for f in self.store.views()['forts'])
+        self.assertEqual(ids, ['a2', 'a3', 'b1'])
+        self.assertEqual(self.store.views()['nearby_pokemons'], [])
+        self.assertEqual(self.store.forts_version, forts_version + 1)
+
+    def testPokemonOnlyUpdateKeepsFortViews(self):
+        forts = self.store.forts()
+        self.store.merge([
+            {'s2_cell_id': CELL_A, 'current_timestamp_ms': 200,
+             'forts': [fort('a1'), fort('a2')],
+             'wild_pokemons': [{'pokemon_id': 19, 'encounter_id': 2}]}
+        ], [CELL_A, CELL_B])
+
+        self.assertIs(self.store.forts(), forts)
+        self.assertEqual(len(self.store.views()['wild_pokemons']), 1)
+
+    def testNearbyPokemonsPlacedAtCellCenter(self):
+        pokemon = self.store.views()['nearby_pokemons'][0]
+        lat, lng = self.store.cell_center(CELL_A)
+
+        self.assertEqual((pokemon['latitude'], pokemon['longitude']), (lat, lng))
+        self.assertEqual(pokemon['s2_cell_id'], CELL_A)
+
+    def testCellsOutOfRangeAreDropped(self):
+        self.store.merge([], [CELL_B])
+
+        self.assertEqual([f['id'] for f in self.store.views()['forts']], ['b1'])
+        self.assertEqual(self.store.since_timestamps([CELL_A]), [0])
+
+    def testFortAndGymViews(self):
+        self.store.merge([
+            {'s2_cell_id': CELL_B, 'current_timestamp_ms': 200,
+             'forts': [fort('g1', enabled=False), fort('g2', closed=True)]}
+        ], [CELL_A, CELL_B])
+        gym = fort('g3')
+        del gym['type']
+        self.store.merge([
+            {'s2_cell_id': CELL_B, 'current_timestamp_ms': 300, 'forts': [gym]}
+        ], [CELL_A, CELL_B])
+
+        self.assertEqual(sorted(f['id'] for f in self.store.forts()), ['a1', 'a2', 'b1', 'g3'])
+        self.assertEqual([f['id'] for f in self.store.gyms()], ['g3'])
@@ -0,0 +1,55 @@
+import unittest
+
+from mock import MagicMock, patch
+
+from pokemongo_bot import inventory
+from pokemongo_bot.metrics import Metrics
+
+
+def player_stats(**stats):
+    return {'inventory_item_data': {'player_stats': stats}}
+
+
+def pokedex_entry(pokemon_id):
+    return {'inventory_item_data': {'pokedex_entry': {'pokemon_id': pokemon_id}}}
+
+
+class MetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.bot = MagicMock(tick_count=1, stardust=100)
+        self.metrics = Metrics(self.bot)
+
+    def tearDown(self):
+        self.metrics.close()
+
+    def testFollowsInventoryDeltas(self):
+        self.metrics.inventory_changed([player_stats(experience=1000, pokemons_captured=5), pokedex_entry(16),
+                                        pokedex_entry(19)], False)
+        self.metrics.inventory_changed([pokedex_entry(10)], True)
+        self.metrics.inventory_changed([player_stats(experience=1500, pokemons_captured=7), pokedex_entry(13)], True)
+
+        self.assertEqual(self.metrics.xp_earned(), 500)
+        self.assertEqual(self.metrics.num_captures(), 2)
+        self.assertEqual(self.metrics.uniq_pokemons_caught, set([10, 13]))
+
+        # A full refresh replaces the pokedex
+        self.metrics.inventory_changed([pokedex_entry(16), pokedex_entry(19), pokedex_entry(10)], False)
+        self.assertEqual(self.metrics.uniq_pokemons_caught, set([10]))
+
+    def testCloseRemovesTheListener(self):
+        self.assertIn(self.metrics.inventory_changed, inventory._listeners)
+        self.metrics.close()
+        self.assertNotIn(self.metrics.inventory_changed, inventory._listeners)
+
+    def testSnapshotWithoutRequests(self):
+        with patch.object(inventory, 'refresh_inventory') as refresh_inventory:
+            self.metrics.inventory_changed([player_stats(experience=1000, km_walked=2.5)], False)
+            first = self.metrics.snapshot()
+            self.metrics.inventory_changed([player_stats(experience=1200, km_walked=3.0)], True)
+            self.bot.stardust = 250
+            second = self.metrics.snapshot()
+
+        self.assertFalse(refresh_inventory.called)
+        self.assertEqual((first.xp_earned, first.player_stats['experience']), (0, 1000))
+        self.assertEqual((second.xp_earned, second.distance_travelled), (200, 0.5))
+        self.assertEqual(second.earned_dust, 150)
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import unittest
+
+from pokemongo_bot.services.name_resolver import NameResolver
+
+NAMES = ['Bulbasaur', 'Ivysaur', 'Nidoran F', 'Nidoran M', 'Mr. Mime', "Farfetch'd", 'Mew', 'Mewtwo', 'Porygon2']
+
+
+class NameResolverTestCase(unittest.TestCase):
+    def setUp(self):
+        self.resolver = NameResolver(NAMES)
+
+    def testSpellingVariantsResolveExactly(self):
+        self.assertEqual(self.resolver.resolve('bulbasaur'), 'Bulbasaur')
+        self.assertEqual(self.resolver.resolve('mr-mime'), 'Mr. Mime')
+        self.assertEqual(self.resolver.resolve('farfetchd'), "Farfetch'd")
+        self.assertEqual(self.resolver.resolve('Nidoran♂'), 'Nidoran M')
+        self.assertEqual(self.resolver.resolve('Nidoran♀'), 'Nidoran F')
+        self.assertEqual(self.resolver.resolve('porygon 2'), 'Porygon2')
+
+    def testMisspellingsResolveToClosestName(self):
+        self.assertEqual(self.resolver.resolve('Bulbasuar'), 'Bulbasaur')
+        self.assertEqual(self.resolver.resolve('ivysuar'), 'Ivysaur')
+        self.assertEqual(self.resolver.resolve('Mewtow'), 'Mewtwo')
+
+    def testUnknownNames(self):
+        self.assertIsNone(self.resolver.resolve('Charizard'))
+        self.assertIsNone(self.resolver.resolve(''))
+        self.assertIsNone(self.resolver.resolve(None))
+
+    def testResolutionsAreCached(self):
+        resolver = NameResolver(NAMES, cache_size=2)
+        resolver.resolve('Bulbasuar')
+        resolver._names.clear()
+
+        self.assertEqual(resolver.resolve('Bulbasuar'), 'Bulbasaur')
+        resolver.resolve('a')
+        resolver.resolve('b')
+        self.assertEqual(list(resolver._cache), ['a', 'b'])
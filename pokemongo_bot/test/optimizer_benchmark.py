@@ -0,0 +1,39 @@
+"""
+Benchmark of the optimizer rules on a full box, array scorer against the
+per-pokemon one.
+
+    python -m pokemongo_bot.test.optimizer_benchmark
+"""
+from __future__ import print_function
+
+import random
+import timeit
+
+from mock import patch
+
+from pokemongo_bot.test.pokemon_optimizer_test import SPECIES, FakePokemon, make_optimizer, random_rule
+
+
+def main(size=2000, rule_count=10, repeat=5):
+    rnd = random.Random(1)
+    rules = [random_rule(rnd) for _ in range(rule_count)]
+    box = [FakePokemon(i, rnd.choice(list(SPECIES)), rnd) for i in range(size)]
+
+    with patch('pokemongo_bot.cell_workers.pokemon_optimizer.inventory') as inventory:
+        inventory.pokemons.return_value.name_for.side_effect = lambda pokemon_id: SPECIES[pokemon_id][0]
+        optimizer = make_optimizer(rules, True)
+
+        def array():
+            return optimizer.apply_rules(box)
+
+        def per_pokemon():
+            with patch('pokemongo_bot.cell_workers.pokemon_optimizer.ScoreTable', side_effect=TypeError):
+                return optimizer.apply_rules(box)
+
+        for name, func in (('ScoreTable', array), ('PokemonScorer', per_pokemon)):
+            seconds = min(timeit.repeat(func, number=1, repeat=repeat))
+            print('{:<16} {:>10.1f} ms / run ({} pokemons, {} rules)'.format(name, seconds * 1e3, size, rule_count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,461 @@
+import itertools
+import math
+import random
+import unittest
+
+from mock import MagicMock, patch
+
+from pokemongo_bot.cell_workers.pokemon_optimizer import PokemonOptimizer
+from pokemongo_bot.inventory import ChargedAttacks, FastAttacks, LevelToCPm, Pokemon, Pokemons
+
+try:
+    unicode
+except NameError:
+    unicode = str
+
+# pokemon_id: (name, family, has next evolution)
+SPECIES = {
+    1: ('Bulbasaur', 1, True), 2: ('Ivysaur', 1, True), 3: ('Venusaur', 1, False),
+    16: ('Pidgey', 16, True), 17: ('Pidgeotto', 16, True), 18: ('Pidgeot', 16, False),
+    133: ('Eevee', 133, True), 134: ('Vaporeon', 133, False), 135: ('Jolteon', 133, False),
+    136: ('Flareon', 133, False), 143: ('Snorlax', 143, False),
+}
+
+
+class FakePokemon(object):
+    def __init__(self, unique_id, pokemon_id, rnd):
+        self.unique_id = unique_id
+        self.pokemon_id = pokemon_id
+        self.name, self.first_evolution_id, self._has_next = SPECIES[pokemon_id]
+        # Few distinct values, so there are plenty of ties
+        self.iv = rnd.choice([0.5, 0.8, 0.9, 1.0])
+        self.ncp = rnd.choice([0.2, 0.5, 0.9])
+        self.cp = rnd.randint(10, 40) * 10
+        self.candy = rnd.randint(0, 200)
+        self.level = rnd.choice([10, 20.5, 30])
+        self.in_fort = rnd.random() < 0.1
+        self.is_favorite = rnd.random() < 0.1
+
+    def has_next_evolution(self):
+        return self._has_next
+
+
+def random_rule(rnd):
+    def requirement():
+        return rnd.choice([
+            True, False, {},
+            {'iv': rnd.choice([0.8, '0.9', -0.8])},
+            {'cp': [100, 300]},
+            {'ncp': [[0, 0.3], [0.8, 1]], 'iv': 0.5},
+        ])
+
+    rule = {
+        'mode': rnd.choice(['by_family', 'by_family', 'by_pokemon', 'overall']),
+        'top': rnd.choice([1, 2, 3, 0.5, 0, 10]),
+        'sort': rnd.sample(['iv', 'ncp', 'cp', '-candy', 'level'], rnd.randint(0, 3)),
+        'keep': requirement(),
+        'evolve': requirement(),
+        'upgrade': requirement(),
+        'buddy': rnd.choice([True, False]),
+        'favorite': rnd.choice([True, False, {}]),
+    }
+    if rnd.random() < 0.3:
+        rule['names'] = [rnd.choice(['Eevee', 'Pidgey', '!Pidgey', '!Snorlax'])]
+    return rule
+
+
+class OriginalOptimizer(object):
+    """
+    The rule loop of PokemonOptimizer.work() and the scoring methods it
+    called, as they were before the optimizer engine, to check the
+    decisions of the engine against. Changes to the original, where it
+    crashed: the worst pokemon of a fraction top is a plain object with
+    the attributes the sort reads, and a family whose seniors are all
+    left out keeps its other pokemons.
+    """
+
+    def __init__(self, optimizer):
+        self.config_rules = optimizer.config_rules
+        self.config_evolve = optimizer.config_evolve
+        self.get_colorlist = optimizer.get_colorlist
+        self.get_family_names = optimizer.get_family_names
+
+    def apply_rules(self, box):
+        keep_all = []
+        try_evolve_all = []
+        try_upgrade_all = []
+        buddy_all = []
+        favor_all = []
+
+        for rule in self.config_rules:
+            mode = rule.get("mode", "by_family")
+            names = rule.get("names", [])
+            whitelist, blacklist = self.get_colorlist(names)
+
+            if mode == "by_pokemon":
+                for pokemon_id, pokemon_list in self.group_by_pokemon_id(inventory_pokemons(box)):
+                    name = SPECIES[pokemon_id][0]
+
+                    if name in blacklist:
+                        continue
+
+                    if whitelist and (name not in whitelist):
+                        continue
+
+                    sorted_list = self.score_and_sort(pokemon_list, rule)
+
+                    if len(sorted_list) == 0:
+                        continue
+
+                    keep, try_evolve, try_upgrade, buddy, favor = self.get_best_pokemon_for_rule(sorted_list, rule)
+                    keep_all += keep
+                    try_evolve_all += try_evolve
+                    try_upgrade_all += try_upgrade
+                    buddy_all += buddy
+                    favor_all += favor
+            elif mode == "by_family":
+                for family_id, pokemon_list in self.group_by_family_id(inventory_pokemons(box)):
+                    matching_names = self.get_family_names(family_id)
+
+                    if any(n in blacklist for n in matching_names):
+                        continue
+
+                    if whitelist and not any(n in whitelist for n in matching_names):
+                        continue
+
+                    sorted_list = self.score_and_sort(pokemon_list, rule)
+
+                    if len(sorted_list) == 0:
+                        continue
+
+                    if family_id == 133:  # "Eevee"
+                        keep, try_evolve, try_upgrade, buddy, favor = self.get_multi_best_pokemon_for_rule(sorted_list, rule, 3)
+                    else:
+                        keep, try_evolve, try_upgrade, buddy, favor = self.get_best_pokemon_for_rule(sorted_list, rule)
+
+                    keep_all += keep
+                    try_evolve_all += try_evolve
+                    try_upgrade_all += try_upgrade
+                    buddy_all += buddy
+                    favor_all += favor
+            elif mode == "overall":
+                selected = []
+
+                for pokemon in inventory_pokemons(box):
+                    name = pokemon.name
+
+                    if name in blacklist:
+                        continue
+
+                    if whitelist and (name not in whitelist):
+                        continue
+
+                    selected.append(pokemon)
+
+                sorted_list = self.score_and_sort(selected, rule)
+
+                if len(sorted_list) == 0:
+                    continue
+
+                keep, try_evolve, try_upgrade, buddy, favor = self.get_best_pokemon_for_rule(sorted_list, rule)
+                keep_all += keep
+                try_evolve_all += try_evolve
+                try_upgrade_all += try_upgrade
+                buddy_all += buddy
+                favor_all += favor
+
+        return keep_all, try_evolve_all, try_upgrade_all, buddy_all, favor_all
+
+    def group_by_pokemon_id(self, pokemon_list):
+        sorted_list = sorted(pokemon_list, key=self.get_pokemon_id)
+        return itertools.groupby(sorted_list, self.get_pokemon_id)
+
+    def group_by_family_id(self, pokemon_list):
+        sorted_list = sorted(pokemon_list, key=self.get_family_id)
+        return itertools.groupby(sorted_list, self.get_family_id)
+
+    def get_pokemon_id(self, pokemon):
+        return pokemon.pokemon_id
+
+    def get_family_id(self, pokemon):
+        return pokemon.first_evolution_id
+
+    def score_and_sort(self, pokemon_list, rule):
+        pokemon_list = list(pokemon_list)
+
+        for pokemon in pokemon_list:
+            setattr(pokemon, "__score__", self.get_score(pokemon, rule))
+
+        keep = [p for p in pokemon_list if p.__score__[1] is True]
+        keep.sort(key=lambda p: p.__score__[0], reverse=True)
+
+        return keep
+
+    def get_score(self, pokemon, rule):
+        score = []
+
+        for a in rule.get("sort", []):
+            if a[0] == "-":
+                value = -getattr(pokemon, a[1:], 0)
+            else:
+                value = getattr(pokemon, a, 0)
+
+            score.append(value)
+
+        rule_keep = rule.get("keep", True)
+        rule_evolve = rule.get("evolve", True)
+        rule_upgrade = rule.get("upgrade", False)
+        rule_buddy = rule.get("buddy", False)
+        rule_favor = rule.get("favorite", False)
+
+        keep = rule_keep not in [False, {}]
+        keep &= self.satisfy_requirements(pokemon, rule_keep)
+
+        may_try_evolve = (hasattr(pokemon, "has_next_evolution") and pokemon.has_next_evolution())
+        may_try_evolve &= rule_evolve not in [False, {}]
+        may_try_evolve &= self.satisfy_requirements(pokemon, rule_evolve)
+
+        may_try_upgrade = rule_upgrade not in [False, {}]
+        may_try_upgrade &= self.satisfy_requirements(pokemon, rule_upgrade)
+
+        may_buddy = rule_buddy not in [False, {}]
+        may_buddy &= pokemon.in_fort is False
+        may_buddy &= self.satisfy_requirements(pokemon, may_buddy)
+
+        may_favor = rule_favor not in [False, {}]
+        may_favor &= self.satisfy_requirements(pokemon, may_favor)
+
+        return tuple(score), keep, may_try_evolve, may_try_upgrade, may_buddy, may_favor
+
+    def satisfy_requirements(self, pokemon, req):
+        if type(req) is bool:
+            return req
+
+        satisfy = True
+
+        for a, v in req.items():
+            value = getattr(pokemon, a, 0)
+
+            if (type(v) is str) or (type(v) is unicode):
+                v = float(v)
+
+            if type(v) is list:
+                if type(v[0]) is list:
+                    satisfy_range = False
+
+                    for r in v:
+                        satisfy_range |= (value >= r[0]) and (value <= r[1])
+
+                    satisfy &= satisfy_range
+                else:
+                    satisfy &= (value >= v[0]) and (value <= v[1])
+            elif v < 0:
+                satisfy &= (value <= abs(v))
+            else:
+                satisfy &= (value >= v)
+
+        return satisfy
+
+    def get_best_pokemon_for_rule(self, pokemon_list, rule):
+        pokemon_list = list(pokemon_list)
+
+        if len(pokemon_list) == 0:
+            return ([], [], [], [])
+
+        top = max(rule.get("top", 0), 0)
+        index = int(math.ceil(top)) - 1
+
+        if 0 < top < 1:
+            worst = Worst()
+
+            for a in rule.get("sort", []):
+                a = a.lstrip("-")
+                best_attribute = getattr(pokemon_list[0], a)
+                setattr(worst, a, best_attribute * (1 - top))
+
+            setattr(worst, "__score__", self.get_score(worst, rule))
+        elif 0 <= index < len(pokemon_list):
+            worst = pokemon_list[index]
+        else:
+            worst = pokemon_list[-1]
+
+        return self.get_better_pokemon(pokemon_list, worst)
+
+    def get_multi_best_pokemon_for_rule(self, family_list, rule, nb_branch):
+        family_list = list(family_list)
+
+        if len(family_list) == 0:
+            return ([], [], [], [])
+
+        # Handle each group of senior independently
+        senior_pokemon_list = [p for p in family_list if not p.has_next_evolution()]
+        other_family_list = [p for p in family_list if p.has_next_evolution()]
+        senior_pids = set(p.pokemon_id for p in senior_pokemon_list)
+
+        keep_all = []
+        try_evolve_all = []
+        try_upgrade_all = []
+        buddy_all = []
+        favor_all = []
+
+        if not self.config_evolve:
+            # Player handle evolution manually = Fall-back to per Pokemon behavior
+            for _, pokemon_list in self.group_by_pokemon_id(family_list):
+                keep, try_evolve, try_upgrade, buddy, favor = self.get_best_pokemon_for_rule(pokemon_list, rule)
+                keep_all += keep
+                try_evolve_all += try_evolve
+                try_upgrade_all += try_upgrade
+                buddy_all += buddy
+                favor_all += favor
+        else:
+            for _, pokemon_list in self.group_by_pokemon_id(senior_pokemon_list):
+                keep, try_evolve, try_upgrade, buddy, favor = self.get_best_pokemon_for_rule(pokemon_list, rule)
+                keep_all += keep
+                try_evolve_all += try_evolve
+                try_upgrade_all += try_upgrade
+                buddy_all += buddy
+                favor_all += favor
+
+            if len(other_family_list) > 0:
+                best = keep_all + try_evolve_all + try_upgrade_all
+
+                if len(senior_pids) < nb_branch or len(best) == 0:
+                    # We did not get every combination yet = All other Pokemon are potentially good to keep
+                    worst = other_family_list[-1]
+                else:
+                    best.sort(key=lambda p: p.__score__[0], reverse=True)
+                    worst = best[-1]
+
+                keep, try_evolve, try_upgrade, buddy, favor = self.get_better_pokemon(other_family_list, worst, 12)
+                keep_all += keep
+                try_evolve_all += try_evolve
+                try_upgrade_all += try_upgrade
+                buddy_all += buddy
+                favor_all += favor
+
+        return keep_all, try_evolve_all, try_upgrade_all, buddy_all, favor_all
+
+    def get_better_pokemon(self, pokemon_list, worst, limit=1000):
+        keep = [p for p in pokemon_list if p.__score__[0] >= worst.__score__[0]][:limit]
+        try_evolve = [p for p in keep if p.__score__[2] is True]
+        try_upgrade = [p for p in keep if (p.__score__[2] is False) and (p.__score__[3] is True)]
+        buddy = [p for p in keep if p.__score__[4] is True]
+        favor = [p for p in keep if p.__score__[5] is True]
+
+        return keep, try_evolve, try_upgrade, buddy, favor
+
+
+class Worst(object):
+    in_fort = False
+
+
+def inventory_pokemons(box):
+    # inventory.pokemons().all() in the original
+    return list(box)
+
+
+def make_optimizer(rules, evolve):
+    optimizer = PokemonOptimizer.__new__(PokemonOptimizer)
+    optimizer.debug = False
+    optimizer.logger = MagicMock()
+    optimizer.config_rules = rules
+    optimizer.config_evolve = evolve
+    optimizer.get_colorlist = lambda names: ([n for n in names if n[0] != '!'], [n[1:] for n in names if n[0] == '!'])
+    optimizer.get_family_names = lambda family_id: [s[0] for s in SPECIES.values() if s[1] == family_id]
+    optimizer.rules = optimizer.compile_rules()
+    return optimizer
+
+
+class PokemonOptimizerRulesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.patch = patch('pokemongo_bot.cell_workers.pokemon_optimizer.inventory')
+        inventory = self.patch.start()
+        inventory.pokemons.return_value.name_for.side_effect = lambda pokemon_id: SPECIES[pokemon_id][0]
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def optimizer(self, rules, evolve):
+        return make_optimizer(rules, evolve)
+
+    def box(self, rnd, size):
+        return [FakePokemon(i, rnd.choice(list(SPECIES)), rnd) for i in range(size)]
+
+    def decisions(self, optimizer, box):
+        return [[p.unique_id for p in part] for part in optimizer.apply_rules(box)]
+
+    def original(self, optimizer, box):
+        return [[p.unique_id for p in part] for part in OriginalOptimizer(optimizer).apply_rules(box)]
+
+    def testDecidesLikeTheOriginalOptimizer(self):
+        rnd = random.Random(42)
+
+        for _ in range(200):
+            rules = [random_rule(rnd) for _ in range(rnd.randint(1, 6))]
+            optimizer = self.optimizer(rules, rnd.choice([True, False]))
+            box = self.box(rnd, rnd.randint(0, 60))
+
+            original = self.original(optimizer, box)
+            self.assertEqual(self.decisions(optimizer, box), original, rules)
+            with patch('pokemongo_bot.cell_workers.pokemon_optimizer.ScoreTable', side_effect=TypeError):
+                self.assertEqual(self.decisions(optimizer, box), original, rules)
+
+    def testFullBox(self):
+        rnd = random.Random(1)
+        rules = [random_rule(rnd) for _ in range(10)]
+        optimizer = self.optimizer(rules, True)
+        box = self.box(rnd, 2000)
+
+        original = self.original(optimizer, box)
+        self.assertEqual(self.decisions(optimizer, box), original)
+        with patch('pokemongo_bot.cell_workers.pokemon_optimizer.ScoreTable', side_effect=TypeError):
+            self.assertEqual(self.decisions(optimizer, box), original)
+
+
+class PokemonOptimizerInventoryTestCase(unittest.TestCase):
+    def setUp(self):
+        def static(pokemon_id):
+            name, family_id, has_next = SPECIES[pokemon_id]
+            data = MagicMock(base_attack=100, base_defense=100, base_stamina=100, max_cp=1000,
+                             first_evolution_id=family_id, has_next_evolution=has_next)
+            data.name = name
+            return data
+
+        self.patches = [
+            patch('pokemongo_bot.cell_workers.pokemon_optimizer.inventory'),
+            patch.object(Pokemons, 'data_for', side_effect=static),
+            patch.object(LevelToCPm, 'level_from_cpm', return_value=20),
+            patch.object(FastAttacks, 'data_for', return_value=MagicMock(dps=10)),
+            patch.object(ChargedAttacks, 'data_for', return_value=MagicMock(dps=20)),
+        ]
+        inventory = self.patches[0].start()
+        inventory.pokemons.return_value.name_for.side_effect = lambda pokemon_id: SPECIES[pokemon_id][0]
+        for p in self.patches[1:]:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def pokemon(self, unique_id, pokemon_id, cp, individual_attack):
+        return Pokemon({'id': unique_id, 'pokemon_id': pokemon_id, 'cp': cp, 'cp_multiplier': 0.5,
+                        'stamina_max': 40, 'stamina': 40, 'individual_attack': individual_attack,
+                        'individual_defense': 10, 'individual_stamina': 10,
+                        'move_1': 219, 'move_2': 45, 'pokemon_display': {}})
+
+    def testScoresRealPokemons(self):
+        # Pokemon has __slots__, the scores can not be set on it
+        box = [self.pokemon(1, 16, 100, 5), self.pokemon(2, 16, 200, 15), self.pokemon(3, 16, 150, 10),
+               self.pokemon(4, 143, 900, 0), self.pokemon(5, 143, 800, 15)]
+        rules = [{'mode': 'by_pokemon', 'top': 1, 'sort': ['iv', 'cp'], 'evolve': False},
+                 {'mode': 'by_family', 'top': 1, 'sort': ['cp'], 'evolve': {'iv': 0.5}}]
+        optimizer = make_optimizer(rules, True)
+
+        vectorized = optimizer.apply_rules(box)
+        with patch('pokemongo_bot.cell_workers.pokemon_optimizer.ScoreTable', side_effect=TypeError):
+            reference = optimizer.apply_rules(box)
+
+        for keep, try_evolve, try_upgrade, buddy, favor in (vectorized, reference):
+            self.assertEqual([p.unique_id for p in keep], [2, 5, 2, 4])
+            self.assertEqual([p.unique_id for p in try_evolve], [2])
+            self.assertEqual((try_upgrade, buddy, favor), ([], [], []))
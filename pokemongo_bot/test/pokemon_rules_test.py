@@ -0,0 +1,144 @@
+import unittest
+
+from pokemongo_bot.pokemon_rules import (CatchRule, EvolveRule, NamedRules, OptimizerRule, ReleaseRule,
+                                         Requirement, named_rules)
+from pokemongo_bot.tree_config_builder import ConfigException
+
+
+class FakePokemon(object):
+    def __init__(self, name='Pidgey', cp=100, iv=0.5, ivcp=0.5, cp_percent=0.5, unique_id=1, has_next=True):
+        self.name = name
+        self.cp = cp
+        self.iv = iv
+        self.ivcp = ivcp
+        self.cp_percent = cp_percent
+        self.unique_id = unique_id
+        self.fast_attack = 'Tackle'
+        self.charged_attack = 'Twister'
+        self._has_next = has_next
+
+    def has_next_evolution(self):
+        return self._has_next
+
+
+class RequirementTestCase(unittest.TestCase):
+    def testThresholds(self):
+        pokemon = FakePokemon(cp=500, iv=0.8)
+
+        self.assertTrue(Requirement({'cp': 500, 'iv': '0.8'})(pokemon))
+        self.assertFalse(Requirement({'cp': -499})(pokemon))
+        self.assertTrue(Requirement({'cp': [[0, 100], [400, 600]]})(pokemon))
+        self.assertFalse(Requirement({'cp': [600, 900]})(pokemon))
+        self.assertTrue(Requirement(True)(pokemon))
+        self.assertFalse(Requirement({})(pokemon))
+
+    def testInvalidRequirementFailsOnLoad(self):
+        self.assertRaises(ConfigException, Requirement, {'cp': 'high'})
+        self.assertRaises(ConfigException, Requirement, {'cp': [[1, 2, 3]]})
+        self.assertRaises(ConfigException, Requirement, 'yes')
+
+
+class OptimizerRuleTestCase(unittest.TestCase):
+    def testCompile(self):
+        rule = OptimizerRule({'mode': 'by_pokemon', 'top': 'all', 'sort': ['-candy', 'iv'], 'evolve': {'ncp': 0.9}})
+
+        self.assertEqual(rule.top, 0)
+        self.assertEqual(rule.sort, [('candy', True), ('iv', False)])
+        self.assertEqual(rule.attributes, set(['candy', 'iv', 'ncp']))
+
+    def testInvalidRuleFailsOnLoad(self):
+        self.assertRaises(ConfigException, OptimizerRule, {'mode': 'by_name'})
+        self.assertRaises(ConfigException, OptimizerRule, {'top': 'best'})
+        self.assertRaises(ConfigException, OptimizerRule, {'sort': 'iv'})
+
+
+class CatchRuleTestCase(unittest.TestCase):
+    def testLogic(self):
+        pokemon = FakePokemon(cp=100, iv=0.9, cp_percent=0.2)
+        setting = {'catch_above_cp': 500, 'catch_above_iv': 0.8, 'catch_above_ncp': 0.5}
+
+        for logic, matches in [('or', True), ('and', False), ('orand', False), ('andor', True)]:
+            setting['logic'] = logic
+            rule = CatchRule(setting)
+            self.assertEqual(rule.matches(rule.results(pokemon)), matches, logic)
+
+    def testUnsetChecksCountByLogic(self):
+        rule = CatchRule({'catch_above_cp': 50})
+        self.assertTrue(rule.matches(rule.results(FakePokemon(cp=100))))
+
+        rule = CatchRule({'catch_above_cp': 50}, default_logic='or')
+        self.assertTrue(rule.matches(rule.results(FakePokemon(cp=100))))
+        self.assertFalse(rule.matches(rule.results(FakePokemon(cp=10))))
+
+    def testAttacks(self):
+        rule = CatchRule({'always_catch': False, 'catch_above_cp': 0, 'fast_attack': ['Tackle'], 'charged_attack': ['Hurricane']})
+        self.assertFalse(rule.matches(rule.results(FakePokemon())))
+
+    def testInvalidRuleFailsOnLoad(self):
+        self.assertRaises(ConfigException, CatchRule, {'logic': 'xor'})
+        self.assertRaises(ConfigException, CatchRule, {'catch_above_iv': None})
+
+
+class ReleaseRuleTestCase(unittest.TestCase):
+    def testAndLogic(self):
+        rule = ReleaseRule({'release_below_cp': 500, 'release_below_iv': 0.8})
+
+        self.assertTrue(rule.release(FakePokemon(cp=100, iv=0.5)))
+        self.assertFalse(rule.release(FakePokemon(cp=100, iv=0.9)))
+        # A threshold set to 0 never passes
+        self.assertFalse(ReleaseRule({'release_below_cp': 500, 'release_below_iv': 0}).release(FakePokemon(cp=100)))
+
+    def testOrLogicFromAny(self):
+        rule = ReleaseRule({'release_below_cp': 500, 'release_below_iv': 0.8}, default_logic='or')
+        self.assertTrue(rule.release(FakePokemon(cp=100, iv=0.9)))
+
+    def testNeverAndAlways(self):
+        self.assertFalse(ReleaseRule({'never_release': True, 'release_below_cp': 500}).release(FakePokemon()))
+        self.assertTrue(ReleaseRule({'always_release': True}).release(FakePokemon(cp=5000)))
+        self.assertFalse(ReleaseRule({}).release(FakePokemon()))
+
+    def testKeepBest(self):
+        rule = ReleaseRule({'keep_best_iv': '2', 'keep_best_custom': 'iv, cp', 'amount': 3})
+
+        self.assertTrue(rule.keep_best)
+        self.assertEqual(rule.keep_best_iv, 2)
+        self.assertEqual(rule.keep_best_criteria, ['iv', 'cp'])
+        self.assertEqual(rule.keep_amount, 3)
+
+    def testInvalidRuleFailsOnLoad(self):
+        self.assertRaises(ConfigException, ReleaseRule, {'keep_best_cp': -1})
+        self.assertRaises(ConfigException, ReleaseRule, {'keep_best_custom': 'iv,weight', 'amount': 1})
+        self.assertRaises(ConfigException, ReleaseRule, {'logic': 'orand'})
+
+
+class EvolveRuleTestCase(unittest.TestCase):
+    def testLists(self):
+        rule = EvolveRule({'evolve_list': 'all', 'donot_evolve_list': 'Pidgey, Rattata', 'evolve_above_cp': 10})
+
+        self.assertTrue(rule.should_evolve(FakePokemon(name='Weedle')))
+        self.assertFalse(rule.should_evolve(FakePokemon(name='Pidgey')))
+        self.assertFalse(rule.should_evolve(FakePokemon(name='Weedle', has_next=False)))
+
+        rule = EvolveRule({'evolve_list': ['weedle'], 'logic': 'and'})
+        self.assertFalse(rule.should_evolve(FakePokemon(name='Weedle', cp=1000, iv=0.5)))
+        self.assertTrue(rule.should_evolve(FakePokemon(name='Weedle', cp=1000, iv=0.9)))
+        self.assertFalse(rule.should_evolve(FakePokemon(name='Pidgey', cp=1000, iv=0.9)))
+
+
+class NamedRulesTestCase(unittest.TestCase):
+    def testFallbackToAny(self):
+        setting = {'any': {'always_release': True}, 'Pidgey': {}, 'Snorlax': {'never_release': True}}
+
+        rules = NamedRules(setting, ReleaseRule)
+        self.assertIsNone(rules.get('Pidgey'))
+        self.assertTrue(rules.get('Weedle').always_release)
+
+        rules = NamedRules(setting, ReleaseRule, empty_is_missing=True)
+        self.assertTrue(rules.get('Pidgey').always_release)
+        self.assertTrue(rules.get('Snorlax').never_release)
+
+    def testCompiledOnce(self):
+        setting = {'any': {'catch_above_cp': 10}}
+
+        self.assertIs(named_rules(setting, CatchRule), named_rules(setting, CatchRule))
+        self.assertIsNot(named_rules(setting, CatchRule), named_rules(setting, CatchRule, default_logic='or'))
@@ -1,6 +1,7 @@
 import os
 import pickle
 import unittest
+import requests
 import requests_mock
 from pokemongo_bot.walkers.polyline_generator import Polyline
 
@@ -46,3 +47,11 @@ class PolylineTestCase(unittest.TestCase):
 
     def test_get_last_pos(self):
         self.assertEquals(self.polyline.get_last_pos(), self.polyline._last_pos)
+
+    def test_timeout_walks_straight(self):
+        with requests_mock.Mocker() as m:
+            m.get(requests_mock.ANY, exc=requests.exceptions.Timeout)
+            polyline = Polyline(ex_orig, ex_dest)
+
+        self.assertEqual(polyline._points, [ex_orig, ex_dest])
+        self.assertEqual(polyline.get_alt(), None)
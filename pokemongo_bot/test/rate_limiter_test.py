@@ -0,0 +1,81 @@
+import threading
+import time
+import unittest
+
+from pokemongo_bot.rate_limiter import RateLimiter, TokenBucket, backoff
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimiterTestCase(unittest.TestCase):
+    def testBucketRefills(self):
+        clock = FakeClock()
+        bucket = TokenBucket(2, burst=2, clock=clock)
+
+        bucket.take()
+        bucket.take()
+        self.assertAlmostEqual(bucket.delay(), 0.5)
+
+        clock.now += 0.5
+        self.assertEqual(bucket.delay(), 0.0)
+
+        clock.now += 10
+        bucket.take()
+        bucket.take()
+        self.assertTrue(bucket.delay() > 0)
+
+    def testBudgetPerRequestType(self):
+        clock = FakeClock()
+        limiter = RateLimiter(rate=100, budgets={'get_map_objects': 0.5}, clock=clock)
+
+        limiter.acquire(['GET_MAP_OBJECTS'])
+        clock.now += 1
+
+        self.assertAlmostEqual(limiter.budgets['GET_MAP_OBJECTS'].delay(), 1.0)
+        self.assertEqual(limiter.acquire(['GET_PLAYER']), 0.0)
+
+    def testPriority(self):
+        limiter = RateLimiter()
+
+        self.assertEqual(limiter.priority(['catch_pokemon', 'get_player']), RateLimiter.HIGH)
+        self.assertEqual(limiter.priority(['NICKNAME_POKEMON']), RateLimiter.LOW)
+        self.assertEqual(limiter.priority([]), RateLimiter.NORMAL)
+
+    def testCatchPreemptsNickname(self):
+        limiter = RateLimiter(rate=10)
+        limiter.acquire(['GET_PLAYER'])
+        order = []
+
+        def send(request_type):
+            limiter.acquire([request_type])
+            order.append(request_type)
+
+        low = threading.Thread(target=send, args=('NICKNAME_POKEMON',))
+        high = threading.Thread(target=send, args=('CATCH_POKEMON',))
+        low.start()
+        time.sleep(0.02)
+        high.start()
+        low.join()
+        high.join()
+
+        self.assertEqual(order, ['CATCH_POKEMON', 'NICKNAME_POKEMON'])
+        stats = limiter.stats()
+        self.assertEqual(stats['high']['count'], 1)
+        self.assertTrue(stats['low']['max_wait'] > stats['high']['max_wait'])
+
+    def testThrottledDrainsBucket(self):
+        clock = FakeClock()
+        limiter = RateLimiter(rate=2, clock=clock)
+
+        limiter.throttled()
+
+        self.assertAlmostEqual(limiter.bucket.delay(), 0.5)
+
+    def testBackoff(self):
+        self.assertEqual([backoff(i, base=2, cap=30) for i in range(1, 7)], [2, 4, 8, 16, 30, 30])
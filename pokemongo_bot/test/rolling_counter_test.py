@@ -0,0 +1,49 @@
+import unittest
+
+from mock import patch
+
+from pokemongo_bot.rolling_counter import RollingCounter
+
+
+class RollingCounterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000000.0
+        self.patch = patch('pokemongo_bot.rolling_counter.time.time', side_effect=lambda: self.now)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def testExpires(self):
+        counter = RollingCounter(window=600, bucket=60)
+
+        counter.add()
+        self.now += 300
+        counter.add(2)
+        self.assertEqual(counter.count(), 3)
+
+        # Up to a bucket more than the window
+        self.now += 300
+        self.assertEqual(counter.count(), 3)
+        self.now += 60
+        self.assertEqual(counter.count(), 2)
+        self.now += 300
+        self.assertEqual(counter.count(), 0)
+
+    def testLongIdle(self):
+        counter = RollingCounter(window=600, bucket=60)
+
+        counter.add(5)
+        self.now += 100000
+        counter.add()
+        self.assertEqual(counter.count(), 1)
+
+    def testSeed(self):
+        counter = RollingCounter(window=600, bucket=60)
+
+        counter.add(4, at=self.now - 590)
+        counter.add(7, at=self.now - 700)
+        counter.add(1, at=self.now + 60)
+        self.assertEqual(counter.count(), 5)
+        self.now += 60
+        self.assertEqual(counter.count(), 1)
@@ -0,0 +1,103 @@
+import time
+import unittest
+
+from mock import MagicMock
+
+from pokemongo_bot.cell_workers.sniper import Sniper, SniperCache
+
+
+def target(pokemon_id, latitude, longitude, expiration):
+    return {'pokemon_id': pokemon_id, 'latitude': latitude, 'longitude': longitude,
+            'expiration_timestamp_ms': expiration}
+
+
+class SlowSource(object):
+    def __init__(self, url, pokemons, delay=0.2, timeout=5):
+        self.url = url
+        self.enabled = True
+        self.timeout = timeout
+        self.pokemons = pokemons
+        self.delay = delay
+
+    def fetch(self):
+        time.sleep(self.delay)
+        return self.pokemons
+
+
+class SniperCacheTestCase(unittest.TestCase):
+    def testTargetsExpire(self):
+        cache = SniperCache(10)
+        cache.add('gone', time.time() - 1)
+        cache.add('here', time.time() + 60)
+        cache.add('default')
+
+        self.assertNotIn('gone', cache)
+        self.assertIn('here', cache)
+        self.assertIn('default', cache)
+
+    def testOldestIsDroppedWhenFull(self):
+        cache = SniperCache(2)
+        for uniqueid in ('a', 'b', 'c'):
+            cache.add(uniqueid)
+
+        self.assertEqual(len(cache), 2)
+        self.assertNotIn('a', cache)
+
+
+class SniperFetchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.sniper = Sniper.__new__(Sniper)
+        self.sniper.bot = MagicMock()
+        self.sniper.debug = False
+        self.sniper._pool = None
+        self.sniper.last_data_request_time = 0
+        self.sniper._parse_pokemons = lambda pokemons: list(pokemons)
+        self.sniper._error = MagicMock()
+
+    def tearDown(self):
+        self.sniper.close()
+
+    def testSourcesAreFetchedConcurrently(self):
+        expiration = 1500000000000
+        self.sniper.sources = [
+            SlowSource('a', [target(1, 10.00001, 20.0, expiration), target(2, 10.0, 20.0, expiration)]),
+            SlowSource('b', [target(1, 10.0, 20.00002, expiration + 1000)]),
+            SlowSource('c', [target(1, 10.0, 20.0, expiration + 3600000)]),
+        ]
+
+        start = time.time()
+        targets = self.sniper._get_pokemons_from_url()
+
+        self.assertLess(time.time() - start, 0.5)
+        # The same target from two sources is kept once, another one at the same spot stays
+        self.assertEqual(sorted((t['pokemon_id'], t['expiration_timestamp_ms']) for t in targets),
+                         [(1, expiration), (1, expiration + 3600000), (2, expiration)])
+
+    def testSlowSourceIsSkipped(self):
+        self.sniper.SOURCE_FETCH_MARGIN = 0
+        self.sniper.sources = [
+            SlowSource('fast', [target(1, 10.0, 20.0, 0)], delay=0),
+            SlowSource('slow', [target(2, 10.0, 20.0, 0)], delay=1, timeout=0.1),
+        ]
+
+        targets = self.sniper._get_pokemons_from_url()
+
+        self.assertEqual([t['pokemon_id'] for t in targets], [1])
+        self.assertTrue(self.sniper._error.called)
+
+
+    def testPoolIsSizedByEnabledSources(self):
+        self.sniper.MAX_FETCH_THREADS = 3
+        self.sniper.sources = [SlowSource(str(i), [], delay=0) for i in range(5)]
+        self.sniper.sources[0].enabled = False
+        self.sniper._trace = MagicMock()
+
+        self.sniper._get_pokemons_from_url()
+        pool = self.sniper._pool
+        self.assertEqual(len(pool._pool), 3)
+
+        self.sniper.close()
+        self.assertIsNone(self.sniper._pool)
+        for worker in pool._pool:
+            worker.join(5)
+            self.assertFalse(worker.is_alive())
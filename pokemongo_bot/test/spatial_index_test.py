@@ -0,0 +1,47 @@
+import os
+import pickle
+import unittest
+
+from pokemongo_bot.cell_workers.utils import distance
+from pokemongo_bot.spatial_index import SpatialIndex
+
+
+class SpatialIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        forts_path = os.path.join(os.path.dirname(__file__), 'resources', 'example_forts.pickle')
+        with open(forts_path, 'rb') as forts:
+            self.forts = pickle.load(forts)
+        self.index = SpatialIndex(self.forts)
+        self.position = (37.396787, -5.994587)
+
+    def by_distance(self):
+        return sorted(self.forts, key=lambda f: distance(
+            self.position[0], self.position[1], f['latitude'], f['longitude']))
+
+    def testNearestMatchesSort(self):
+        expected = self.by_distance()
+
+        self.assertEqual(self.index.nearest(*self.position), expected)
+        self.assertEqual(self.index.nearest(self.position[0], self.position[1], k=5), expected[:5])
+
+    def testWithin(self):
+        expected = [f for f in self.by_distance()
+                    if distance(self.position[0], self.position[1], f['latitude'], f['longitude']) <= 150]
+
+        self.assertEqual(self.index.within(self.position[0], self.position[1], 150), expected)
+
+    def testAlongSegment(self):
+        end = (37.398013, -5.993626)
+        forts = self.index.along_segment(self.position, end, 40)
+
+        self.assertTrue(len(forts) > 0)
+        self.assertTrue(all(distance(self.position[0], self.position[1], f['latitude'], f['longitude']) <=
+                            distance(self.position[0], self.position[1], end[0], end[1]) + 40 for f in forts))
+
+    def testEmpty(self):
+        index = SpatialIndex([])
+
+        self.assertEqual(index.nearest(0, 0), [])
+        self.assertEqual(index.nearest(0, 0, k=3), [])
+        self.assertEqual(index.within(0, 0, 100), [])
+        self.assertEqual(index.along_segment((0, 0), (1, 1), 100), [])
@@ -0,0 +1,54 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import patch
+
+from pokemongo_bot import inventory
+from pokemongo_bot.inventory import LevelToCPm, Pokemons, load_static_data
+
+
+class StaticDataTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'data.json')
+        with open(self.path, 'w') as f:
+            json.dump([{'name': 'Pidgey', 'id': 16}], f)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testCacheIsWrittenAndReused(self):
+        cache_dir = os.path.join(self.dir, 'cache')
+        with patch.object(inventory, 'STATIC_CACHE_DIR', cache_dir):
+            self.assertEqual(load_static_data(self.path), [{'name': 'Pidgey', 'id': 16}])
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+            with patch.object(inventory.json, 'load') as json_load:
+                self.assertEqual(load_static_data(self.path), [{'name': 'Pidgey', 'id': 16}])
+                self.assertFalse(json_load.called)
+
+    def testCacheFollowsSource(self):
+        cache_dir = os.path.join(self.dir, 'cache')
+        with patch.object(inventory, 'STATIC_CACHE_DIR', cache_dir):
+            load_static_data(self.path)
+            with open(self.path, 'w') as f:
+                json.dump([{'name': 'Rattata', 'id': 19}, {'name': 'Spearow', 'id': 21}], f)
+
+            self.assertEqual(len(load_static_data(self.path)), 2)
+
+    def testLevelFromCpm(self):
+        data = LevelToCPm.STATIC_DATA
+
+        for i, cpm in enumerate(data):
+            self.assertEqual(LevelToCPm.level_from_cpm(cpm), i * 0.5 + 1)
+            self.assertEqual(LevelToCPm.level_from_cpm(cpm + 1e-4), i * 0.5 + 1)
+        self.assertEqual(LevelToCPm.level_from_cpm(0), 1)
+        self.assertEqual(LevelToCPm.level_from_cpm(2), (len(data) - 1) * 0.5 + 1)
+
+    def testIdForIgnoresCase(self):
+        self.assertEqual(Pokemons.id_for('bulbasaur'), 1)
+        self.assertEqual(Pokemons.id_for('BULBASAUR'), 1)
+        self.assertRaises(Exception, Pokemons.id_for, 'Missingno')
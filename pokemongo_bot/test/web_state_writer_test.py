@@ -0,0 +1,111 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from pokemongo_bot.web_state_writer import WebStateWriter
+
+
+class WebStateWriterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'location.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self):
+        with open(self.path) as f:
+            return json.load(f)
+
+    def testWritesAreCoalesced(self):
+        writer = WebStateWriter(debounce=60)
+        for i in range(10):
+            writer.write_json(self.path, {'step': i})
+
+        self.assertEqual(writer.stats()['depth'], 1)
+        self.assertFalse(os.path.exists(self.path))
+
+        writer.flush()
+
+        self.assertEqual(self.read(), {'step': 9})
+        self.assertEqual(writer.stats()['written'], 1)
+        self.assertEqual(os.listdir(self.dir), ['location.json'])
+
+    def testUnchangedContentIsSkipped(self):
+        writer = WebStateWriter(debounce=60)
+        writer.write_json(self.path, [1, 2])
+        writer.flush()
+        writer.write_json(self.path, [1, 2])
+        writer.flush()
+
+        stats = writer.stats()
+        self.assertEqual(stats['written'], 1)
+        self.assertEqual(stats['unchanged'], 1)
+
+    def testBackgroundWrite(self):
+        writer = WebStateWriter(debounce=0.01)
+        writer.write_json(self.path, {'lat': 1})
+
+        for _ in range(200):
+            if writer.stats()['written']:
+                break
+            time.sleep(0.01)
+
+        self.assertEqual(self.read(), {'lat': 1})
+        self.assertEqual(writer.stats()['depth'], 0)
+
+    def testWriteErrorsAreCounted(self):
+        writer = WebStateWriter(debounce=60)
+        writer.write_json(os.path.join(self.dir, 'missing', 'file.json'), {})
+        writer.flush()
+
+        self.assertEqual(writer.stats()['errors'], 1)
+
+    def testChangedWhileSerializedIsRetriedLater(self):
+        calls = []
+
+        def state():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError('dictionary changed size during iteration')
+            return {'step': len(calls)}
+
+        writer = WebStateWriter(debounce=60)
+        writer.write_json(self.path, state)
+        flushed_at = time.time()
+        writer.flush()
+
+        # Waits another debounce period rather than being due right away
+        self.assertEqual(len(calls), 1)
+        self.assertGreaterEqual(writer._pending[self.path][1], flushed_at)
+        self.assertFalse(os.path.exists(self.path))
+
+        writer.flush()
+        self.assertEqual(self.read(), {'step': 2})
+
+    def testFlushWaitsForTheWriterThread(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return {'step': 1}
+
+        writer = WebStateWriter(debounce=0.01)
+        writer.write_json(self.path, slow)
+        self.assertTrue(started.wait(5))
+
+        writer.write_json(self.path, {'step': 2})
+        flusher = threading.Thread(target=writer.flush)
+        flusher.start()
+        flusher.join(0.1)
+        self.assertTrue(flusher.is_alive())
+
+        release.set()
+        flusher.join(5)
+        self.assertEqual(self.read(), {'step': 2})
+        self.assertEqual(os.listdir(self.dir), ['location.json'])
@@ -7,6 +7,17 @@ import polyline
 import requests
 from geopy.distance import great_circle
 
+from pokemongo_bot import http_client
+
+
+def get_json(url, default):
+    # A maps api too slow to answer is walked without, in a straight line
+    # or on flat ground
+    try:
+        return http_client.get(url).json()
+    except requests.exceptions.Timeout:
+        return default
+
 
 def distance(point1, point2):
     return Geodesic.WGS84.Inverse(point1[0], point1[1], point2[0], point2[1])["s12"]  # @UndefinedVariable
@@ -68,7 +79,7 @@ class Polyline(object):
                 '{},{}'.format(*self.destination))
         if google_map_api_key:
             self.DIRECTIONS_URL = '{}&key={}'.format(self.DIRECTIONS_URL, google_map_api_key)
-        self._directions_response = requests.get(self.DIRECTIONS_URL).json()
+        self._directions_response = get_json(self.DIRECTIONS_URL, {'routes': []})
         try:
             self._directions_encoded_points = [x['polyline']['points'] for x in
                                                self._directions_response['routes'][0]['legs'][0]['steps']]
@@ -99,7 +110,7 @@ class Polyline(object):
                                                       self._polyline, self._nr_samples)
         if google_map_api_key:
             self.ELEVATION_URL = '{}&key={}'.format(self.ELEVATION_URL, google_map_api_key)
-        self._elevation_response = requests.get(self.ELEVATION_URL).json()
+        self._elevation_response = get_json(self.ELEVATION_URL, {'results': []})
         self._elevation_at_point = dict((tuple(x['location'].values()),
                                          x['elevation']) for x in
                                         self._elevation_response['results'])
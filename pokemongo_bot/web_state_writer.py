@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+
+class WebStateWriter(object):
+    """
+    Background writer for the json state files read by the web UI.
+
+    write_json() only records the latest data for a file and returns. A
+    writer thread picks pending files up once they were left alone for
+    DEBOUNCE seconds, so a file updated on every tick is written at most
+    once per period, with its last content. Content which did not change
+    since the last write is not written again, and files are replaced
+    atomically so readers never see half a file. A file is written by one
+    thread at a time, so flush() waits for the files the writer thread is
+    busy with instead of racing it on the same temporary file.
+
+    Data is serialized on the writer thread. Callers hand over data they
+    do not mutate afterwards, or accept that a later state gets written.
+    Data can also be a callable returning the data, which is then only
+    called when the file is actually written.
+    """
+
+    DEBOUNCE = 1.0  # seconds
+
+    def __init__(self, debounce=DEBOUNCE):
+        self.debounce = debounce
+        self.logger = logging.getLogger(type(self).__name__)
+
+        self._cond = threading.Condition(threading.Lock())
+        # path -> (data, first enqueue time)
+        self._pending = {}
+        self._hashes = {}
+        # Paths being written, by one thread at a time
+        self._writing = set()
+        self._thread = None
+
+        self._stats = {'queued': 0, 'written': 0, 'unchanged': 0, 'errors': 0,
+                       'total_latency': 0.0, 'max_latency': 0.0}
+
+    def write_json(self, path, data):
+        """
+        Schedules data to be written as json to path.
+        :param path: The file to write.
+        :type path: str
+        :param data: Anything json can serialize, or a callable returning it.
+        """
+        with self._cond:
+            queued_at = self._pending[path][1] if path in self._pending else time.time()
+            self._pending[path] = (data, queued_at)
+            self._stats['queued'] += 1
+            self._start()
+            self._cond.notify_all()
+
+    def flush(self):
+        """
+        Writes every pending file now, on the calling thread.
+        """
+        with self._cond:
+            # Files the writer thread took are older than the pending ones
+            while self._writing:
+                self._cond.wait()
+            pending, self._pending = self._pending, {}
+            self._writing.update(pending)
+
+        for path, (data, queued_at) in pending.items():
+            self._write(path, data, queued_at)
+
+    def stats(self):
+        """
+        Returns the writer metrics: depth (files waiting), queued, written,
+        unchanged (skipped as identical), errors, and the mean and max
+        latency in seconds from the first update of a file to its write.
+        :rtype: dict
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats['depth'] = len(self._pending)
+        done = stats['written'] + stats['unchanged']
+        stats['mean_latency'] = stats['total_latency'] / done if done else 0.0
+        return stats
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='WebStateWriter')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._idle_paths():
+                    self._cond.wait()
+
+                due = min(self._pending[path][1] for path in self._idle_paths()) + self.debounce
+                delay = due - time.time()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+
+                now = time.time()
+                ready = dict((path, self._pending[path]) for path in self._idle_paths()
+                             if self._pending[path][1] + self.debounce <= now)
+                for path in ready:
+                    del self._pending[path]
+                self._writing.update(ready)
+
+            for path, (data, queued_at) in ready.items():
+                self._write(path, data, queued_at)
+
+    def _idle_paths(self):
+        return [path for path in self._pending if path not in self._writing]
+
+    def _write(self, path, data, queued_at):
+        try:
+            self._write_file(path, data, queued_at)
+        finally:
+            with self._cond:
+                self._writing.discard(path)
+                self._cond.notify_all()
+
+    def _write_file(self, path, data, queued_at):
+        try:
+            content = json.dumps(data() if callable(data) else data)
+        except RuntimeError:
+            # Changed while being serialized, try again with what is there
+            # once it was left alone for another debounce period
+            with self._cond:
+                self._pending.setdefault(path, (data, time.time()))
+            return
+        except (TypeError, ValueError) as e:
+            self.logger.warning('[x] Error while serializing %s: %s', path, e)
+            self._count('errors')
+            return
+
+        if not isinstance(content, bytes):
+            content = content.encode('utf-8')
+        digest = hashlib.md5(content).hexdigest()
+
+        if self._hashes.get(path) == digest:
+            self._count('unchanged', queued_at)
+            return
+
+        temp_path = path + '.tmp'
+        try:
+            with open(temp_path, 'wb') as outfile:
+                outfile.write(content)
+            _replace(temp_path, path)
+        except (IOError, OSError) as e:
+            self.logger.warning('[x] Error while writing %s: %s', path, e)
+            self._count('errors')
+            return
+
+        self._hashes[path] = digest
+        self._count('written', queued_at)
+
+    def _count(self, key, queued_at=None):
+        with self._cond:
+            self._stats[key] += 1
+            if queued_at is not None:
+                latency = time.time() - queued_at
+                self._stats['total_latency'] += latency
+                self._stats['max_latency'] = max(self._stats['max_latency'], latency)
+
+
+def _replace(source, destination):
+    if hasattr(os, 'replace'):
+        os.replace(source, destination)
+    else:
+        # Python 2 on Windows can not rename over an existing file
+        if os.name == 'nt' and os.path.exists(destination):
+            os.remove(destination)
+        os.rename(source, destination)
+
+
+_writer = WebStateWriter()
+atexit.register(_writer.flush)
+
+
+def write_json(path, data):
+    """
+    Schedules a json state file write on the shared writer, see
+    WebStateWriter.
+    """
+    _writer.write_json(path, data)
+
+
+def writer():
+    """
+    Returns the shared writer.
+    :rtype: WebStateWriter
+    """
+    return _writer